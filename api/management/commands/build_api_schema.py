@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api.schema import API_SCHEMA_FILE, write_schema
+
+
+class Command(BaseCommand):
+    help = 'Generates the OpenAPI schema once at deploy time; the API serves this file instead of building it per process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(API_SCHEMA_FILE), help='Default: settings.API_SCHEMA_FILE')
+
+    def handle(self, *args, **options):
+        path, content = write_schema(options['output'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {len(content)} bytes to {path}'))
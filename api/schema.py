@@ -0,0 +1,68 @@
+# api/schema.py
+"""
+Prebuilt OpenAPI document.
+
+Generating the schema walks every viewset and serializer, so it is built at
+deploy time (``manage.py build_api_schema``) into ``API_SCHEMA_FILE``. The
+default location is in the api app's static files, so collectstatic
+publishes it and the web server can serve it directly. ``schema_view``
+serves the prebuilt file. It only generates the schema (once per process)
+when the file is missing, e.g. in development. drf_yasg is imported only
+for that.
+"""
+import hashlib
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import etag, require_GET
+
+logger = logging.getLogger(__name__)
+
+API_SCHEMA_FILE = Path(getattr(
+    settings, 'API_SCHEMA_FILE', Path(settings.BASE_DIR) / 'api' / 'static' / 'api' / 'openapi.json'
+))
+API_SCHEMA_MAX_AGE = getattr(settings, 'API_SCHEMA_MAX_AGE', 60 * 60)
+API_TITLE = 'IT Asset Register API'
+
+_schema = None
+
+
+def generate_schema():
+    """The OpenAPI document for every API route, as JSON bytes"""
+    from drf_yasg import openapi
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    generator = OpenAPISchemaGenerator(openapi.Info(title=API_TITLE, default_version='v1'))
+    return OpenAPICodecJson(validators=[]).encode(generator.get_schema(request=None, public=True))
+
+
+def write_schema(path=None):
+    path = Path(path or API_SCHEMA_FILE)
+    content = generate_schema()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path, content
+
+
+def get_schema():
+    """``(content, etag)`` of the prebuilt schema, generated on first use if missing"""
+    global _schema
+    if _schema is None:
+        try:
+            content = API_SCHEMA_FILE.read_bytes()
+        except FileNotFoundError:
+            logger.warning('%s is missing; run manage.py build_api_schema at deploy', API_SCHEMA_FILE)
+            content = generate_schema()
+        _schema = content, hashlib.sha1(content).hexdigest()
+    return _schema
+
+
+@require_GET
+@etag(lambda request: get_schema()[1])
+def schema_view(request):
+    response = HttpResponse(get_schema()[0], content_type='application/json')
+    response['Cache-Control'] = f'public, max-age={API_SCHEMA_MAX_AGE}'
+    return response
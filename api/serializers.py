@@ -0,0 +1,15 @@
+# api/serializers.py
+from rest_framework import serializers
+from core.batch import BATCH_MAX_REQUESTS
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    requests = serializers.DictField(
+        child=serializers.CharField(max_length=2000), allow_empty=False,
+        help_text='Name -> GET path of a list or detail route, e.g. "/api/assets/12/"'
+    )
+
+    def validate_requests(self, value):
+        if len(value) > BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f'At most {BATCH_MAX_REQUESTS} requests per batch')
+        return value
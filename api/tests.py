@@ -1,3 +1,147 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from assets.models import Asset, AssetCategory, AssetModel, AssetStatus, Manufacturer
+from companies.models import Company
+from core.batch import BATCH_MAX_REQUESTS
+from . import schema
+
+# Imported only by the code paths that need them
+HEAVY_MODULES = ('celery', 'drf_yasg.generators', 'msgpack', 'pyarrow', 'twilio')
+
+
+class ColdStartTests(SimpleTestCase):
+    def imported(self, code):
+        result = subprocess.run(
+            [sys.executable, '-c', f'import sys; {code}; print(",".join(sorted(sys.modules)))'],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return set(result.stdout.strip().split(','))
+
+    def test_setup_and_url_loading_skip_heavy_modules(self):
+        modules = self.imported(
+            'import django; django.setup(); from django.urls import get_resolver; get_resolver().url_patterns'
+        )
+        self.assertIn('assets.views', modules)
+        self.assertEqual(modules & set(HEAVY_MODULES), set())
+
+
+class SchemaTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = Path(directory) / 'openapi.json'
+        for patcher in (
+            mock.patch.object(schema, 'API_SCHEMA_FILE', self.path),
+            mock.patch.object(schema, '_schema', None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_build_writes_every_route_without_errors(self):
+        with self.assertNoLogs(level='ERROR'):
+            call_command('build_api_schema', output=str(self.path), stdout=StringIO())
+
+        document = json.loads(self.path.read_bytes())
+        self.assertEqual(document['info']['title'], schema.API_TITLE)
+        for path in ('/assets/', '/assets/{id}/', '/reports/jobs/', '/batch/'):
+            self.assertIn(path, document['paths'])
+
+    def test_prebuilt_file_is_served_with_an_etag(self):
+        self.path.write_bytes(b'{"swagger": "2.0"}')
+
+        response = self.client.get('/api/schema/')
+
+        self.assertEqual(response.content, b'{"swagger": "2.0"}')
+        self.assertIn('max-age', response['Cache-Control'])
+        cached = self.client.get('/api/schema/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='Acme')
+        self.status = AssetStatus.objects.create(name='Deployed')
+        manufacturer = Manufacturer.objects.create(name='Dell')
+        category = AssetCategory.objects.create(name='Laptops')
+        self.models = [
+            AssetModel.objects.create(manufacturer=manufacturer, category=category, name=f'Latitude {number}')
+            for number in range(3)
+        ]
+        self.first = self.add_assets(3)[0]
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('acme-user', company=self.company))
+
+    def add_assets(self, count):
+        start = Asset.objects.count()
+        return [
+            Asset.objects.create(
+                asset_tag=f'A{start + number:03d}', company=self.company,
+                model=self.models[number % len(self.models)], status=self.status,
+            )
+            for number in range(count)
+        ]
+
+    def batch(self, requests):
+        response = self.client.post('/api/batch/', {'requests': requests}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_each_sub_request_answers_like_its_route(self):
+        results = self.batch({
+            'asset': f'/api/assets/{self.first.pk}/',
+            'models': '/api/models/?manufacturer=' + str(self.models[0].manufacturer_id),
+            'statuses': '/api/statuses/',
+        })
+
+        self.assertEqual(results['asset']['data'], self.client.get(f'/api/assets/{self.first.pk}/').json())
+        self.assertEqual(results['models']['data'], self.client.get(
+            '/api/models/', {'manufacturer': self.models[0].manufacturer_id}
+        ).json())
+        self.assertEqual(results['statuses']['status'], 200)
+
+    def test_failures_are_reported_per_sub_request(self):
+        results = self.batch({
+            'missing': '/api/assets/999999/',
+            'unknown': '/api/nowhere/',
+            'not_a_list': '/api/dashboard/',
+            'bad_filter': '/api/assets/?status=abc',
+            'fine': '/api/statuses/',
+        })
+
+        self.assertEqual({name: result['status'] for name, result in results.items()}, {
+            'missing': 404, 'unknown': 404, 'not_a_list': 404, 'bad_filter': 400, 'fine': 200,
+        })
+        self.assertIn('status', results['bad_filter']['data'])
+
+    def test_batch_size_is_limited(self):
+        requests = {f'r{number}': '/api/statuses/' for number in range(BATCH_MAX_REQUESTS + 1)}
+        response = self.client.post('/api/batch/', {'requests': requests}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_queries_do_not_grow_with_the_rows_returned(self):
+        requests = {'assets': '/api/assets/', 'models': '/api/models/', 'statuses': '/api/statuses/'}
+        with CaptureQueriesContext(connection) as few:
+            self.batch(requests)
+        self.add_assets(12)
+        with CaptureQueriesContext(connection) as many:
+            results = self.batch(requests)
+
+        self.assertEqual(len(results['assets']['data']['results']), 15)
+        self.assertEqual(len(many), len(few))
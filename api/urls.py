@@ -0,0 +1,40 @@
+# api/urls.py
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+from assets.views import (
+    AssetCategoryViewSet, ManufacturerViewSet, AssetModelViewSet,
+    AssetStatusViewSet, AssetViewSet, MaintenanceRecordViewSet,
+    DuplicateCandidateViewSet, AuditPlanViewSet
+)
+from core.views import DashboardViewSet
+from reports.views import (
+    ChargebackViewSet, FleetTrendViewSet, ReplacementForecastViewSet, ReportJobViewSet, SiteRollupViewSet,
+    TCOReportViewSet
+)
+from users.views import UserViewSet
+from .schema import schema_view
+from .views import BatchView
+
+router = DefaultRouter()
+router.register('categories', AssetCategoryViewSet)
+router.register('manufacturers', ManufacturerViewSet)
+router.register('models', AssetModelViewSet)
+router.register('statuses', AssetStatusViewSet)
+router.register('assets', AssetViewSet)
+router.register('maintenance-records', MaintenanceRecordViewSet, basename='maintenancerecord')
+router.register('duplicate-candidates', DuplicateCandidateViewSet)
+router.register('audit-plan', AuditPlanViewSet)
+router.register('users', UserViewSet)
+router.register('dashboard', DashboardViewSet, basename='dashboard')
+router.register('reports/tco', TCOReportViewSet, basename='report-tco')
+router.register('reports/replacement-forecast', ReplacementForecastViewSet, basename='report-replacement-forecast')
+router.register('reports/fleet-trend', FleetTrendViewSet, basename='report-fleet-trend')
+router.register('reports/sites', SiteRollupViewSet, basename='report-sites')
+router.register('reports/chargeback', ChargebackViewSet, basename='report-chargeback')
+router.register('reports/jobs', ReportJobViewSet, basename='report-job')
+
+urlpatterns = [
+    path('schema/', schema_view, name='api-schema'),
+    path('batch/', BatchView.as_view(), name='api-batch'),
+    path('', include(router.urls)),
+]
@@ -0,0 +1,23 @@
+# api/views.py
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core.batch import run_batch
+from .serializers import BatchRequestSerializer
+
+
+class BatchView(APIView):
+    """
+    Several reads in one round trip, e.g. everything an asset form needs:
+
+        {"requests": {"asset": "/api/assets/12/", "models": "/api/models/?category=3",
+                      "statuses": "/api/statuses/", "users": "/api/users/"}}
+
+    Answers `{name: {"status": ..., "data": ...}}` with each `data` as the
+    route would return it. Related objects are fetched once for the whole
+    batch (see core.batch).
+    """
+
+    def post(self, request):
+        params = BatchRequestSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        return Response(run_batch(request, params.validated_data['requests']))
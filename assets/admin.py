@@ -1,12 +1,17 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.http import HttpResponseRedirect
 from django.utils.html import format_html
 from django.urls import reverse
 from django.db.models import Count, Q
 from .models import (
     AssetCategory, Manufacturer, AssetModel,
-    AssetStatus, Asset, MaintenanceRecord, MaintenanceType
+    AssetStatus, Asset, MaintenanceRecord, MaintenanceType,
+    DuplicateCandidate, AuditorCapacity, AuditPlanEntry,
+    ArchivedAsset, ArchivedMaintenanceRecord
 )
 from django.contrib.auth import get_user_model
+from core.concurrency import VersionConflict
 from datetime import date
 
 User = get_user_model()
@@ -132,33 +137,61 @@ class MaintenanceRecordInline(admin.TabularInline):
     def has_change_permission(self, request, obj=None):
         return False
 
+class AssetAdminForm(forms.ModelForm):
+    """Carries the version the page was rendered at, so a stale save is refused"""
+    loaded_version = forms.IntegerField(widget=forms.HiddenInput, required=False)
+
+    class Meta:
+        model = Asset
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['loaded_version'].initial = self.instance.version
+
+    def clean(self):
+        cleaned_data = super().clean()
+        version = cleaned_data.get('loaded_version')
+        if self.instance.pk and version is not None and version != self.instance.version:
+            raise forms.ValidationError(
+                'This asset was changed by someone else while you were editing it. '
+                'Reload the page to see the current values.'
+            )
+        if cleaned_data.get('site') is not None:
+            cleaned_data['location'] = cleaned_data['site'].name
+        return cleaned_data
+
 @admin.register(Asset)
 class AssetAdmin(admin.ModelAdmin):
+    form = AssetAdminForm
     list_display = (
         'asset_tag', 'model_with_manufacturer', 'status_with_color',
         'assigned_to', 'location', 'purchase_info', 'warranty_status',
         'maintenance_count'
     )
     list_filter = (
-        'status', 'model__manufacturer', 'model__category',
+        'status', 'model__manufacturer', 'model__category', 'company', 'site',
         'assigned_to', ('purchase_date', admin.DateFieldListFilter)
     )
     search_fields = ('asset_tag', 'serial_number', 'notes', 'ip_address', 'mac_address')
     list_select_related = ('model__manufacturer', 'status', 'assigned_to')
     inlines = [MaintenanceRecordInline]
+    raw_id_fields = ('parent',)
+    readonly_fields = ('last_seen',)
     list_per_page = 50
     fieldsets = (
         ('Identification', {
-            'fields': ('asset_tag', 'serial_number', 'model')
+            'fields': ('asset_tag', 'serial_number', 'model', 'loaded_version')
         }),
         ('Status', {
-            'fields': ('status', 'assigned_to', 'location')
+            'fields': ('status', 'company', 'assigned_to', 'site', 'location', 'parent')
         }),
         ('Purchase Info', {
             'fields': ('purchase_date', 'purchase_cost', 'warranty_months')
         }),
         ('Network Info', {
-            'fields': ('ip_address', 'mac_address'),
+            'fields': ('ip_address', 'mac_address', 'last_seen'),
             'classes': ('collapse',)
         }),
         ('Audit Info', {
@@ -167,6 +200,18 @@ class AssetAdmin(admin.ModelAdmin):
         }),
     )
     
+    def save_model(self, request, obj, form, change):
+        if change and form.cleaned_data.get('loaded_version') is not None:
+            obj.version = form.cleaned_data['loaded_version']
+        super().save_model(request, obj, form, change)
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except VersionConflict as conflict:
+            messages.error(request, f'{conflict}. Your changes were not saved.')
+            return HttpResponseRedirect(request.path)
+
     def model_with_manufacturer(self, obj):
         return f"{obj.model.manufacturer.name} {obj.model.name}"
     model_with_manufacturer.short_description = 'Model'
@@ -241,7 +286,7 @@ class MaintenanceRecordAdmin(admin.ModelAdmin):
         'created_by', 'created_at', 'completed_at', 'days_open', 'cost_display'
     )
     list_filter = (
-        IsCompletedFilter, 'priority', 'maintenance_type', 
+        IsCompletedFilter, 'priority', 'maintenance_type', 'company',
         'created_by', ('created_at', admin.DateFieldListFilter)
     )
     search_fields = ('title', 'description', 'resolution', 'asset__asset_tag')
@@ -298,4 +343,57 @@ class MaintenanceRecordAdmin(admin.ModelAdmin):
         if obj.cost:
             return f"${obj.cost}"
         return "-"
-    cost_display.short_description = 'Cost'
\ No newline at end of file
+    cost_display.short_description = 'Cost'
+
+# ==================== DuplicateCandidate Admin ====================
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    list_display = ('asset', 'duplicate', 'score', 'reasons', 'status', 'detected_at')
+    list_filter = ('status', 'reasons')
+    search_fields = ('asset__asset_tag', 'duplicate__asset_tag')
+    list_select_related = ('asset__model__manufacturer', 'duplicate__model__manufacturer')
+    raw_id_fields = ('asset', 'duplicate')
+    list_per_page = 50
+
+# ==================== Audit Planning Admin ====================
+@admin.register(AuditorCapacity)
+class AuditorCapacityAdmin(admin.ModelAdmin):
+    list_display = ('auditor', 'weekly_capacity', 'is_active')
+    list_filter = ('is_active',)
+    list_editable = ('weekly_capacity', 'is_active')
+    search_fields = ('auditor__username', 'auditor__first_name', 'auditor__last_name')
+    raw_id_fields = ('auditor',)
+
+@admin.register(AuditPlanEntry)
+class AuditPlanEntryAdmin(admin.ModelAdmin):
+    list_display = ('asset', 'auditor', 'week', 'due_date', 'location', 'last_audit')
+    list_filter = ('week', 'auditor')
+    search_fields = ('asset__asset_tag', 'location')
+    list_select_related = ('asset__model', 'auditor')
+    readonly_fields = ('asset', 'auditor', 'week', 'due_date', 'location', 'last_audit', 'planned_at')
+    list_per_page = 50
+
+# ==================== Archive Admin ====================
+class ArchivedRowAdmin(admin.ModelAdmin):
+    """Read-only view of an archive table"""
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedAsset)
+class ArchivedAssetAdmin(ArchivedRowAdmin):
+    list_display = ('asset_tag', 'serial_number', 'status_id', 'site_id', 'archived_at')
+    search_fields = ('=asset_tag', '=serial_number')
+    date_hierarchy = 'archived_at'
+    readonly_fields = ('id', 'asset_tag', 'serial_number', 'status_id', 'site_id', 'archived_at', 'data')
+
+@admin.register(ArchivedMaintenanceRecord)
+class ArchivedMaintenanceRecordAdmin(ArchivedRowAdmin):
+    list_display = ('id', 'asset_id', 'status', 'created_at', 'completed_date', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('=asset_id',)
+    readonly_fields = ('id', 'asset_id', 'status', 'created_at', 'completed_date', 'archived_at', 'data')
@@ -0,0 +1,131 @@
+# assets/archive.py
+"""
+Hot/cold split for retired assets and old maintenance history.
+
+Retired assets (inactive status) untouched for ``ARCHIVE_ASSET_RETENTION_DAYS``
+and closed maintenance records completed more than
+``ARCHIVE_MAINTENANCE_RETENTION_DAYS`` ago are moved into the
+``ArchivedAsset`` / ``ArchivedMaintenanceRecord`` tables. The hot tables,
+their indexes and everything that scans them shrink accordingly; the
+archive keeps each row's column values as JSON plus the few columns it is
+looked up by (see ``core.archive`` for reading it back).
+
+An archived asset takes its whole maintenance history with it (records of
+any age and legacy maintenance logs). Assets that still contain other
+assets or have open maintenance are left alone. Work is done in batches of
+``ARCHIVE_BATCH_SIZE``, one transaction each: the rows are copied, then
+deleted through the outbox, which publishes an ``archived`` event per row.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from maintenance.models import MaintenanceLog
+from .models import Asset, ArchivedAsset, ArchivedMaintenanceRecord, MaintenanceRecord
+
+ARCHIVE_ASSET_RETENTION_DAYS = getattr(settings, 'ARCHIVE_ASSET_RETENTION_DAYS', 365)
+ARCHIVE_MAINTENANCE_RETENTION_DAYS = getattr(settings, 'ARCHIVE_MAINTENANCE_RETENTION_DAYS', 730)
+ARCHIVE_BATCH_SIZE = getattr(settings, 'ARCHIVE_BATCH_SIZE', 500)
+
+
+def archivable_assets(now, retention_days=None):
+    cutoff = now - timedelta(days=ARCHIVE_ASSET_RETENTION_DAYS if retention_days is None else retention_days)
+    return Asset.objects.filter(status__is_active=False, updated_at__lt=cutoff).exclude(
+        Exists(Asset.objects.filter(parent=OuterRef('pk')))
+    ).exclude(
+        Exists(MaintenanceRecord.objects.filter(asset=OuterRef('pk')).exclude(
+            status__in=MaintenanceRecord.CLOSED_STATUSES
+        ))
+    )
+
+
+def archivable_maintenance(now, retention_days=None):
+    cutoff = now - timedelta(
+        days=ARCHIVE_MAINTENANCE_RETENTION_DAYS if retention_days is None else retention_days
+    )
+    return MaintenanceRecord.objects.filter(status__in=MaintenanceRecord.CLOSED_STATUSES).filter(
+        Q(completed_date__lt=cutoff.date()) | Q(completed_date__isnull=True, updated_at__lt=cutoff)
+    )
+
+
+def _move_maintenance(records, now):
+    """Copy and delete the maintenance records in ``records``; returns how many moved"""
+    rows = list(records.order_by().values())
+    ArchivedMaintenanceRecord.objects.bulk_create(
+        [
+            ArchivedMaintenanceRecord(
+                id=row['id'], asset_id=row['asset_id'], status=row['status'],
+                created_at=row['created_at'], completed_date=row['completed_date'],
+                company_id=row['company_id'], archived_at=now, data=row,
+            )
+            for row in rows
+        ],
+        ignore_conflicts=True,
+    )
+    MaintenanceRecord.objects.filter(pk__in=[row['id'] for row in rows]).delete_with_event('archived')
+    return len(rows)
+
+
+def _move_assets(assets, now):
+    """Copy and delete ``assets`` with their maintenance history; returns (assets, records) moved"""
+    rows = list(assets.select_for_update(of=('self',)).order_by().values())
+    ids = [row['id'] for row in rows]
+    records = _move_maintenance(MaintenanceRecord.objects.filter(asset_id__in=ids), now)
+    logs = defaultdict(list)
+    for log in MaintenanceLog.objects.filter(asset_id__in=ids).values():
+        logs[log['asset_id']].append(log)
+    ArchivedAsset.objects.bulk_create(
+        [
+            ArchivedAsset(
+                id=row['id'], asset_tag=row['asset_tag'], serial_number=row['serial_number'],
+                status_id=row['status_id'], site_id=row['site_id'], company_id=row['company_id'],
+                archived_at=now, data={**row, 'maintenance_logs': logs[row['id']]},
+            )
+            for row in rows
+        ],
+        ignore_conflicts=True,
+    )
+    Asset.objects.filter(pk__in=ids).delete_with_event('archived')
+    return len(rows), records
+
+
+def archive_cold_data(batch_size=ARCHIVE_BATCH_SIZE, asset_days=None, maintenance_days=None, dry_run=False):
+    """
+    Archive retired assets, then the remaining old closed maintenance
+    records. Returns ``{'assets': n, 'maintenance_records': n}``.
+    """
+    now = timezone.now()
+    if dry_run:
+        assets = archivable_assets(now, asset_days)
+        return {
+            'assets': assets.count(),
+            'maintenance_records': archivable_maintenance(now, maintenance_days).exclude(
+                asset__in=assets
+            ).count() + MaintenanceRecord.objects.filter(asset__in=assets).count(),
+        }
+
+    moved = {'assets': 0, 'maintenance_records': 0}
+    while True:
+        with transaction.atomic():
+            ids = list(archivable_assets(now, asset_days).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            assets, records = _move_assets(archivable_assets(now, asset_days).filter(pk__in=ids), now)
+        moved['assets'] += assets
+        moved['maintenance_records'] += records
+
+    while True:
+        with transaction.atomic():
+            ids = list(
+                archivable_maintenance(now, maintenance_days).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            moved['maintenance_records'] += _move_maintenance(
+                archivable_maintenance(now, maintenance_days).filter(pk__in=ids).select_for_update(), now
+            )
+    return moved
@@ -0,0 +1,230 @@
+# assets/audits.py
+"""
+Load-leveled audit planning.
+
+Every active asset gets one ``AuditPlanEntry`` naming the week (and the
+auditor) of its next audit. An asset is due ``AUDIT_CYCLE_DAYS`` after its
+last audit; it may be planned up to ``AUDIT_LEVELING_WEEKS`` early so busy
+weeks spill into quieter ones, and the overdue backlog is spread over the
+next ``AUDIT_BACKLOG_WEEKS``. Each company is planned on its own, with the
+auditors of that company. Assets at the same location stick to one
+auditor, grouped into weeks where that location is already being visited,
+as long as that auditor has room in the asset's window; otherwise, and for
+assets without a location, the auditor with the lightest load in the
+window takes the asset.
+
+``plan_audits`` is incremental: one left-join scan finds assets whose entry
+is missing, in the past, or out of date (audited or moved since it was
+planned), and only those are placed, around the load of the entries that
+stay. ``full=True`` replans everything. ``replan_asset`` places a single
+asset with a few queries against the existing plan.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Asset, AuditorCapacity, AuditPlanEntry
+
+AUDIT_CYCLE_DAYS = getattr(settings, 'AUDIT_CYCLE_DAYS', 180)
+AUDIT_LEVELING_WEEKS = getattr(settings, 'AUDIT_LEVELING_WEEKS', 4)
+AUDIT_BACKLOG_WEEKS = getattr(settings, 'AUDIT_BACKLOG_WEEKS', 12)
+# Weekly capacity used when no auditors are configured
+AUDIT_DEFAULT_CAPACITY = getattr(settings, 'AUDIT_DEFAULT_CAPACITY', 50)
+WRITE_BATCH_SIZE = 1000
+
+_ALL = object()
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def due_date(last_audit, today):
+    if last_audit is None:
+        return today
+    return max(last_audit + timedelta(days=AUDIT_CYCLE_DAYS), today)
+
+
+class AuditPlanner:
+    """Places assets into (auditor, week) slots around an existing load"""
+
+    def __init__(self, today, capacities):
+        self.today = today
+        self.this_week = week_start(today)
+        # auditor id -> weekly capacity; None plans without auditors
+        self.capacities = capacities or {None: AUDIT_DEFAULT_CAPACITY}
+        self.load = defaultdict(int)
+        self.sites = defaultdict(set)
+        self.totals = defaultdict(int)
+        self.location_auditor = {}
+
+    def add(self, auditor, week, location):
+        self.load[auditor, week] += 1
+        self.sites[auditor, week].add(location)
+        self.totals[auditor] += 1
+        if location:
+            self.location_auditor.setdefault(location, auditor)
+
+    def has_room(self, auditor, weeks):
+        return any(self.load[auditor, week] < self.capacities[auditor] for week in weeks)
+
+    def auditor_for(self, location, weeks):
+        """The location's auditor while they have room in ``weeks``, else the least loaded one"""
+        auditor = self.location_auditor.get(location) if location else None
+        if auditor in self.capacities and self.has_room(auditor, weeks):
+            return auditor
+
+        def share(candidate):
+            capacity = self.capacities[candidate]
+            booked = sum(self.load[candidate, week] for week in weeks)
+            return booked / (capacity * len(weeks)), self.totals[candidate] / capacity, str(candidate)
+
+        auditor = min(self.capacities, key=share)
+        if location and self.location_auditor.get(location) not in self.capacities:
+            self.location_auditor[location] = auditor
+        return auditor
+
+    def window(self, due):
+        due_week = week_start(due)
+        if due_week <= self.this_week:
+            return [self.this_week + timedelta(weeks=n) for n in range(AUDIT_BACKLOG_WEEKS)]
+        first = max(self.this_week, due_week - timedelta(weeks=AUDIT_LEVELING_WEEKS))
+        return [first + timedelta(weeks=n) for n in range((due_week - first).days // 7 + 1)]
+
+    def place(self, location, due):
+        """Pick the slot for one asset and count it; returns ``(auditor, week)``"""
+        weeks = self.window(due)
+        auditor = self.auditor_for(location, weeks)
+        capacity = self.capacities[auditor]
+
+        def cost(week):
+            load = self.load[auditor, week]
+            full = load >= capacity
+            # Prefer weeks with room, then weeks already visiting the site,
+            # then the quietest week, then the earliest. Once every week is
+            # full only the load counts, so the overflow is spread evenly.
+            visiting = not location or location in self.sites[auditor, week]
+            return (full, full or not visiting, load, week)
+
+        week = min(weeks, key=cost)
+        self.add(auditor, week, location)
+        return auditor, week
+
+
+def _capacities(company_id=_ALL):
+    """{company id: {auditor id: weekly capacity}}, or one company's auditors"""
+    auditors = AuditorCapacity.objects.filter(is_active=True, auditor__is_active=True, weekly_capacity__gt=0)
+    if company_id is not _ALL:
+        auditors = auditors.filter(auditor__company_id=company_id)
+    capacities = defaultdict(dict)
+    for company, auditor, capacity in auditors.values_list('auditor__company_id', 'auditor_id', 'weekly_capacity'):
+        capacities[company][auditor] = capacity
+    return capacities if company_id is _ALL else capacities[company_id]
+
+
+def plan_audits(today=None, full=False, asset_ids=None):
+    """
+    Bring the audit plan up to date. ``asset_ids`` limits the replanning to
+    those assets (the load of all other entries is still respected).
+    Returns counts of planned and removed entries.
+    """
+    today = today or date.today()
+    capacities = _capacities()
+    planners = {}
+    rows = Asset.objects.filter(status__is_active=True).order_by().values_list(
+        'id', 'company_id', 'location', 'last_audit',
+        'audit_plan__id', 'audit_plan__week', 'audit_plan__auditor_id',
+        'audit_plan__location', 'audit_plan__last_audit',
+    )
+    selected = set(asset_ids) if asset_ids is not None else None
+
+    stale = []
+    for (
+        asset_id, company_id, location, last_audit, entry_id, week, auditor, planned_location, planned_audit,
+    ) in rows.iterator(chunk_size=WRITE_BATCH_SIZE):
+        planner = planners.get(company_id)
+        if planner is None:
+            planner = planners[company_id] = AuditPlanner(today, capacities.get(company_id))
+        replan = (
+            full
+            or entry_id is None
+            or week < planner.this_week
+            or planned_audit != last_audit
+            or planned_location != location
+            or auditor not in planner.capacities
+        )
+        if replan and (selected is None or asset_id in selected):
+            stale.append((due_date(last_audit, today), location, asset_id, last_audit, company_id))
+        elif entry_id is not None:
+            planner.add(auditor, week, planned_location)
+
+    # Earliest deadlines choose first; sorting by location keeps sites together
+    stale.sort(key=lambda item: item[:3])
+    entries = []
+    for due, location, asset_id, last_audit, company_id in stale:
+        auditor, week = planners[company_id].place(location, due)
+        entries.append(AuditPlanEntry(
+            asset_id=asset_id, auditor_id=auditor, week=week,
+            due_date=due, location=location, last_audit=last_audit,
+        ))
+
+    with transaction.atomic():
+        removed, _ = AuditPlanEntry.objects.exclude(asset__status__is_active=True).delete()
+        AuditPlanEntry.objects.bulk_create(
+            entries,
+            batch_size=WRITE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['asset'],
+            update_fields=['auditor', 'week', 'due_date', 'location', 'last_audit', 'planned_at'],
+        )
+    return {'planned': len(entries), 'removed': removed}
+
+
+def replan_asset(asset, today=None):
+    """
+    Replan one asset, e.g. right after it was audited or moved, around the
+    entries already planned: only its company's load in the asset's window
+    and its location's auditor are read, not the whole fleet. Returns the
+    entry, or None when the asset is not active.
+    """
+    today = today or date.today()
+    if not Asset.objects.filter(pk=asset.pk, status__is_active=True).exists():
+        AuditPlanEntry.objects.filter(asset=asset).delete()
+        return None
+    planner = AuditPlanner(today, _capacities(asset.company_id))
+    others = AuditPlanEntry.objects.filter(
+        week__gte=planner.this_week, asset__company_id=asset.company_id
+    ).exclude(asset=asset)
+
+    location = asset.location
+    if location:
+        planned = others.filter(location=location).values_list('auditor_id', flat=True).first()
+        if planned in planner.capacities:
+            planner.location_auditor[location] = planned
+
+    due = due_date(asset.last_audit, today)
+    booked = others.filter(week__in=planner.window(due)).order_by().values_list(
+        'auditor_id', 'week', 'location'
+    ).annotate(count=Count('id'))
+    for auditor, week, planned_location, count in booked:
+        planner.load[auditor, week] += count
+        planner.sites[auditor, week].add(planned_location)
+
+    auditor, week = planner.place(location, due)
+    entry, _ = AuditPlanEntry.objects.update_or_create(asset=asset, defaults={
+        'auditor_id': auditor, 'week': week, 'due_date': due, 'location': location, 'last_audit': asset.last_audit,
+    })
+    return entry
+
+
+def workload(queryset, start, weeks):
+    """Planned audits of ``queryset`` per auditor and week, for checking the leveling"""
+    end = start + timedelta(weeks=weeks)
+    return list(
+        queryset.filter(week__gte=start, week__lt=end)
+        .order_by('week', 'auditor_id').values('week', 'auditor_id')
+        .annotate(audits=Count('id'), locations=Count('location', distinct=True))
+    )
@@ -0,0 +1,211 @@
+# assets/dedup.py
+"""
+Duplicate and near-duplicate asset detection.
+
+Rather than comparing every asset with every other one, assets are grouped
+into blocks that share a cheap key (normalized serial, MAC, asset tag, or
+model plus the start or end of the serial). Only pairs inside the same block
+are compared, with a fuzzy serial match, so the work grows with the block
+sizes rather than with the square of the register. Every key includes the
+owning company, so a pair never spans two companies.
+
+Blocks above ``MAX_BLOCK_SIZE`` are not compared all with all:
+
+- in an exact block (same serial, MAC or tag) every member already matches,
+  so each is paired with the lowest id only;
+- a model-prefix or model-suffix block is sorted on its serials read from
+  the other end, and each member is compared with its next
+  ``NEIGHBOURHOOD_WINDOW`` neighbours (sorted neighbourhood), which is
+  where a serial with a typo lands.
+"""
+import re
+from collections import defaultdict
+from itertools import combinations
+from difflib import SequenceMatcher
+
+from django.db import transaction
+
+from maintenance.models import MaintenanceLog
+from .models import Asset, DuplicateCandidate, MaintenanceRecord
+
+NON_ALNUM_RE = re.compile(r'[^0-9A-Z]')
+
+# Serial fragment length used for the model-scoped blocking keys
+AFFIX_LENGTH = 5
+# Blocks larger than this are not compared all with all (see above)
+MAX_BLOCK_SIZE = 50
+NEIGHBOURHOOD_WINDOW = 10
+EXACT_KEYS = ('serial', 'mac', 'tag')
+FUZZY_THRESHOLD = 0.85
+MIN_SERIAL_LENGTH = 4
+SCAN_CHUNK_SIZE = 5000
+WRITE_BATCH_SIZE = 1000
+
+# Fields copied from a duplicate onto the kept asset when the kept one is blank
+MERGE_FILL_FIELDS = (
+    'serial_number', 'purchase_date', 'purchase_cost', 'assigned_to_id',
+    'location', 'ip_address', 'mac_address', 'last_audit', 'notes',
+)
+
+
+def normalize_serial(value):
+    """Upper-case a serial number and drop everything but letters and digits"""
+    return NON_ALNUM_RE.sub('', (value or '').upper())
+
+
+def _blocking_keys(company_id, tag, serial, mac, model_id):
+    # Very short serials are placeholders like 'NA' or '0' and would only
+    # produce noise
+    if len(serial) >= MIN_SERIAL_LENGTH:
+        yield ('serial', company_id, serial)
+        if len(serial) >= AFFIX_LENGTH * 2:
+            yield ('model-prefix', company_id, model_id, serial[:AFFIX_LENGTH])
+            yield ('model-suffix', company_id, model_id, serial[-AFFIX_LENGTH:])
+    if mac:
+        yield ('mac', company_id, mac)
+    if tag:
+        yield ('tag', company_id, tag)
+
+
+def _numbered_apart(left, right):
+    """
+    True for serials that only differ in digits at the same positions, like
+    consecutive serials of one purchase, which a typo cannot be told apart from
+    """
+    return len(left) == len(right) and all(
+        a.isdigit() and b.isdigit() for a, b in zip(left, right) if a != b
+    )
+
+
+def _compare(left, right):
+    """Score a pair of (tag, serial, mac, model_id) tuples, or return None"""
+    left_tag, left_serial, left_mac, left_model = left
+    right_tag, right_serial, right_mac, right_model = right
+    reasons = []
+    score = 0.0
+    if left_mac and left_mac == right_mac:
+        reasons.append('mac')
+        score = 0.95
+    if left_tag and left_tag == right_tag:
+        reasons.append('tag')
+        score = max(score, 0.9)
+    if len(left_serial) >= MIN_SERIAL_LENGTH and len(right_serial) >= MIN_SERIAL_LENGTH:
+        if left_serial == right_serial:
+            reasons.append('serial')
+            score = max(score, 1.0 if left_model == right_model else 0.9)
+        elif left_model == right_model and not _numbered_apart(left_serial, right_serial):
+            ratio = SequenceMatcher(None, left_serial, right_serial).ratio()
+            if ratio >= FUZZY_THRESHOLD:
+                reasons.append('fuzzy-serial')
+                score = max(score, ratio * 0.9)
+    if not reasons:
+        return None
+    if len(reasons) > 1:
+        score = min(1.0, score + 0.05 * (len(reasons) - 1))
+    return round(score, 3), ','.join(reasons)
+
+
+def _block_pairs(key, members, rows):
+    """The (lower id, higher id) pairs to compare inside one block"""
+    members.sort()
+    if len(members) <= MAX_BLOCK_SIZE:
+        return combinations(members, 2)
+    if key[0] in EXACT_KEYS:
+        return ((members[0], other) for other in members[1:])
+    # Prefix blocks share the start of the serial, so sort on the serial;
+    # suffix blocks share the end, so sort on the serial reversed
+    if key[0] == 'model-prefix':
+        ordered = sorted(members, key=lambda asset_id: rows[asset_id][1])
+    else:
+        ordered = sorted(members, key=lambda asset_id: rows[asset_id][1][::-1])
+    return (
+        (min(left_id, right_id), max(left_id, right_id))
+        for i, left_id in enumerate(ordered)
+        for right_id in ordered[i + 1:i + 1 + NEIGHBOURHOOD_WINDOW]
+    )
+
+
+def find_duplicates(queryset=None):
+    """
+    Return ``{(asset_id, duplicate_id): (score, reasons)}`` for the assets in
+    ``queryset`` (all assets by default). The lower id is always first.
+    """
+    queryset = Asset.objects.all() if queryset is None else queryset
+    rows = {}
+    blocks = defaultdict(list)
+    values = queryset.order_by().values_list(
+        'id', 'company_id', 'asset_tag', 'serial_number', 'mac_normalized', 'model_id'
+    )
+    for asset_id, company_id, tag, serial, mac, model_id in values.iterator(chunk_size=SCAN_CHUNK_SIZE):
+        record = (normalize_serial(tag), normalize_serial(serial), mac, model_id)
+        rows[asset_id] = record
+        for key in _blocking_keys(company_id, *record):
+            blocks[key].append(asset_id)
+
+    pairs = {}
+    for key, members in blocks.items():
+        if len(members) < 2:
+            continue
+        for pair in _block_pairs(key, members, rows):
+            if pair in pairs:
+                continue
+            match = _compare(rows[pair[0]], rows[pair[1]])
+            if match:
+                pairs[pair] = match
+    return pairs
+
+
+def refresh_candidates(queryset=None):
+    """
+    Run the detection and replace the open candidates with the new result.
+    Pairs a user already dismissed are left alone.
+    """
+    pairs = find_duplicates(queryset)
+    reviewed = set(
+        DuplicateCandidate.objects.exclude(status='open').values_list('asset_id', 'duplicate_id')
+    )
+    candidates = [
+        DuplicateCandidate(asset_id=left, duplicate_id=right, score=score, reasons=reasons)
+        for (left, right), (score, reasons) in pairs.items()
+        if (left, right) not in reviewed
+    ]
+    with transaction.atomic():
+        DuplicateCandidate.objects.filter(status='open').delete()
+        DuplicateCandidate.objects.bulk_create(candidates, batch_size=WRITE_BATCH_SIZE)
+    return len(candidates)
+
+
+def merge_assets(keep, duplicates):
+    """
+    Fold ``duplicates`` into ``keep``: repoint their maintenance history and
+    contents with one UPDATE per table, fill blank fields on ``keep`` from the
+    duplicates and delete them. Returns the number of maintenance rows moved.
+    """
+    duplicates = [asset for asset in duplicates if asset.pk != keep.pk]
+    duplicate_ids = [asset.pk for asset in duplicates]
+    if not duplicate_ids:
+        return 0
+
+    with transaction.atomic():
+        moved = MaintenanceRecord.objects.filter(asset_id__in=duplicate_ids).update(asset=keep)
+        moved += MaintenanceLog.objects.filter(asset_id__in=duplicate_ids).update(asset=keep)
+        # Whatever was installed in a duplicate now sits in ``keep``
+        Asset.objects.filter(parent_id__in=duplicate_ids).exclude(
+            descendant_links__descendant=keep
+        ).update(parent=keep)
+
+        filled = []
+        for field in MERGE_FILL_FIELDS:
+            if getattr(keep, field) in (None, ''):
+                for asset in duplicates:
+                    value = getattr(asset, field)
+                    if value not in (None, ''):
+                        setattr(keep, field, value)
+                        filled.append(field)
+                        break
+        if filled:
+            keep.save(update_fields=filled + ['updated_at'])
+
+        # Candidate rows of the duplicates go with them (on_delete=CASCADE)
+        Asset.objects.filter(pk__in=duplicate_ids).delete()
+    return moved
@@ -0,0 +1,50 @@
+# assets/depreciation.py
+"""
+Straight-line depreciation, shared by ``Asset.current_value`` and the
+chargeback report so a book value and the charges behind it agree.
+
+An asset loses ``depreciation_rate`` percent of its purchase cost a year,
+charged a full month at a time from the month of purchase, and stops once
+its book value reaches ``residual_value``. ``book_value`` is the value at
+the start of a month: the purchase cost less every month charged before
+it. ``monthly_charge_expression`` computes one month's charge in SQL.
+"""
+from decimal import Decimal
+
+from django.db.models import ExpressionWrapper, F, FloatField, Value
+from django.db.models.functions import Cast, ExtractMonth, ExtractYear, Greatest, Least
+
+CENT = Decimal('0.01')
+
+
+def months_charged(purchase_date, period):
+    """Months charged before the month of ``period``, from the month of purchase"""
+    return max(0, (period.year * 12 + period.month) - (purchase_date.year * 12 + purchase_date.month))
+
+
+def monthly_depreciation(purchase_cost, depreciation_rate):
+    return Decimal(purchase_cost) * Decimal(depreciation_rate) / 1200
+
+
+def book_value(purchase_cost, depreciation_rate, residual_value, purchase_date, period):
+    """Book value at the start of the month of ``period``"""
+    purchase_cost = Decimal(purchase_cost)
+    floor = min(Decimal(residual_value or 0), purchase_cost)
+    charged = monthly_depreciation(purchase_cost, depreciation_rate) * months_charged(purchase_date, period)
+    return max(purchase_cost - charged, floor).quantize(CENT)
+
+
+def monthly_charge_expression(period):
+    """One asset's depreciation for the month starting at ``period``, as an expression"""
+    # Cast first so SQLite does not fall back to integer division
+    monthly = ExpressionWrapper(
+        Cast('purchase_cost', FloatField()) * F('depreciation_rate') / Value(1200), output_field=FloatField()
+    )
+    months_before = (
+        Value(period.year * 12 + period.month) - ExtractYear('purchase_date') * 12 - ExtractMonth('purchase_date')
+    )
+    remaining = ExpressionWrapper(
+        Cast('purchase_cost', FloatField()) - F('residual_value') - monthly * months_before,
+        output_field=FloatField()
+    )
+    return Least(monthly, Greatest(remaining, Value(0.0)), output_field=FloatField())
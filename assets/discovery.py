@@ -0,0 +1,196 @@
+# assets/discovery.py
+"""
+Network discovery ingestion.
+
+Takes DHCP lease, ARP table or generic scan exports, matches the reported
+MAC addresses against ``Asset.mac_normalized`` and writes back the observed
+IP address and ``last_seen`` timestamp in batches.
+"""
+import csv
+import io
+import re
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.db import bulk_update_values
+from core.outbox import record_events
+from .models import Asset
+from .network import clean_ip, format_mac, ip_to_key, normalize_mac
+
+ARP_PROC_RE = re.compile(r'^(?P<ip>\S+)\s+0x\S+\s+0x\S+\s+(?P<mac>[0-9a-fA-F:]{17})\s')
+ARP_BSD_RE = re.compile(r'\((?P<ip>[^)]+)\)\s+at\s+(?P<mac>[0-9a-fA-F:.-]+)')
+
+LOOKUP_CHUNK_SIZE = 2000
+WRITE_BATCH_SIZE = 1000
+# Above this many distinct sighting times, per-timestamp UPDATEs cost more
+# than a single joined bulk update.
+MAX_GROUPED_TIMESTAMPS = 20
+
+SCAN_FORMATS = ('csv', 'json', 'dnsmasq', 'arp')
+
+
+def _parse_timestamp(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        value = str(value).strip()
+        if value.isdigit():
+            return datetime.fromtimestamp(int(value), tz=dt_timezone.utc)
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def _parse_csv(text):
+    for row in csv.DictReader(io.StringIO(text)):
+        row = {(k or '').strip().lower(): v for k, v in row.items()}
+        yield (
+            row.get('mac') or row.get('mac_address'),
+            row.get('ip') or row.get('ip_address'),
+            row.get('seen') or row.get('last_seen') or row.get('timestamp'),
+        )
+
+
+def _parse_json(rows):
+    for row in rows:
+        yield (
+            row.get('mac') or row.get('mac_address'),
+            row.get('ip') or row.get('ip_address'),
+            row.get('seen') or row.get('last_seen') or row.get('timestamp'),
+        )
+
+
+def _parse_dnsmasq(text):
+    # <expiry epoch> <mac> <ip> <hostname> <client-id>
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 3:
+            yield parts[1], parts[2], None
+
+
+def _parse_arp(text):
+    # Accepts both /proc/net/arp and `arp -an` output
+    for line in text.splitlines():
+        match = ARP_PROC_RE.match(line) or ARP_BSD_RE.search(line)
+        if match:
+            yield match.group('mac'), match.group('ip'), None
+
+
+def parse_scan(data, fmt='csv'):
+    """
+    Parse a scan export into (mac, ip, seen) tuples.
+
+    ``data`` is text for csv/dnsmasq/arp and a list of dicts for json.
+    """
+    if fmt == 'csv':
+        return _parse_csv(data)
+    if fmt == 'json':
+        return _parse_json(data)
+    if fmt == 'dnsmasq':
+        return _parse_dnsmasq(data)
+    if fmt == 'arp':
+        return _parse_arp(data)
+    raise ValueError(f"Unknown scan format '{fmt}', expected one of {', '.join(SCAN_FORMATS)}")
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def ingest_scan(entries, seen_at=None, report_unknown_limit=1000, queryset=None):
+    """
+    Match scan entries to assets by MAC and record what was observed. Only
+    assets in ``queryset`` (all assets by default) are matched.
+
+    Entries are de-duplicated by MAC (the newest sighting wins) and matched
+    against the indexed ``mac_normalized`` column one chunk at a time, so the
+    number of queries depends on the scan size divided by the chunk size,
+    not on the number of rows. Assets whose IP changed are written with
+    ``bulk_update_values``; assets that were merely seen again get a single
+    ``UPDATE ... WHERE id IN (...)`` per chunk and sighting time.
+    """
+    seen_at = seen_at or timezone.now()
+    invalid = 0
+    sightings = {}
+    for mac, ip, seen in entries:
+        normalized = normalize_mac(mac)
+        if normalized is None:
+            invalid += 1
+            continue
+        seen = _parse_timestamp(seen) or seen_at
+        previous = sightings.get(normalized)
+        if previous is None or seen >= previous[1]:
+            # IPs are validated only for the sightings that are kept
+            sightings[normalized] = (ip or (previous and previous[0]), seen)
+
+    assets = Asset.objects.all() if queryset is None else queryset
+    assets_by_mac = defaultdict(list)
+    for chunk in _chunks(list(sightings), LOOKUP_CHUNK_SIZE):
+        rows = assets.filter(mac_normalized__in=chunk).values_list(
+            'id', 'mac_normalized', 'ip_address'
+        )
+        for asset_id, normalized, current_ip in rows:
+            assets_by_mac[normalized].append((asset_id, current_ip))
+
+    changed = []
+    seen_only = defaultdict(list)
+    unknown = []
+    now = timezone.now()
+    for normalized, (ip, seen) in sightings.items():
+        matches = assets_by_mac.get(normalized)
+        if not matches:
+            if len(unknown) < report_unknown_limit:
+                unknown.append({'mac': format_mac(normalized), 'ip': clean_ip(ip), 'seen': seen})
+            continue
+        ip = clean_ip(ip)
+        for asset_id, current_ip in matches:
+            if ip and ip != current_ip:
+                changed.append(Asset(
+                    id=asset_id, ip_address=ip, ip_key=ip_to_key(ip), last_seen=seen, updated_at=now
+                ))
+            else:
+                seen_only[seen].append(asset_id)
+
+    with transaction.atomic():
+        bulk_update_values(
+            Asset, changed, ['ip_address', 'ip_key', 'last_seen', 'updated_at'],
+            batch_size=WRITE_BATCH_SIZE, increment=['version']
+        )
+        # Sightings alone are not published; IP changes are
+        record_events(asset.outbox_event('updated', ['ip_address']) for asset in changed)
+        if len(seen_only) > MAX_GROUPED_TIMESTAMPS:
+            bulk_update_values(
+                Asset,
+                [
+                    Asset(id=asset_id, last_seen=seen)
+                    for seen, asset_ids in seen_only.items()
+                    for asset_id in asset_ids
+                ],
+                ['last_seen'],
+                batch_size=WRITE_BATCH_SIZE
+            )
+        else:
+            for seen, asset_ids in seen_only.items():
+                for chunk in _chunks(asset_ids, WRITE_BATCH_SIZE):
+                    Asset.objects.filter(id__in=chunk).update(last_seen=seen)
+
+    matched = sum(len(matches) for matches in assets_by_mac.values())
+    return {
+        'devices': len(sightings),
+        'invalid': invalid,
+        'matched': matched,
+        'ip_changed': len(changed),
+        'seen_only': matched - len(changed),
+        'unknown_count': len(sightings) - len(assets_by_mac),
+        'unknown': unknown,
+    }
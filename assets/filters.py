@@ -0,0 +1,67 @@
+# assets/filters.py
+import django_filters
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from .models import Asset, MaintenanceRecord
+from .network import parse_ip_range
+
+
+class AssetFilter(django_filters.FilterSet):
+    ip_in = django_filters.CharFilter(method='filter_ip_in')
+    within = django_filters.NumberFilter(method='filter_within')
+    location = django_filters.CharFilter(method='filter_location')
+
+    class Meta:
+        model = Asset
+        fields = {
+            'asset_tag': ['exact'],
+            'serial_number': ['exact'],
+            'status': ['exact'],
+            'model': ['exact'],
+            'model__manufacturer': ['exact'],
+            'model__category': ['exact'],
+            'assigned_to': ['exact', 'isnull'],
+            'parent': ['exact', 'isnull'],
+            'site': ['exact', 'isnull'],
+            'site__company': ['exact'],
+            'company': ['exact'],
+            'purchase_date': ['gte', 'lte'],
+        }
+
+    def filter_ip_in(self, queryset, name, value):
+        """
+        Comma-separated CIDR blocks, ``first-last`` ranges or addresses,
+        e.g. ``10.20.0.0/16,2001:db8::/32``. Each term is a range scan on
+        the ``ip_key`` index.
+        """
+        condition = Q()
+        for term in filter(None, (part.strip() for part in value.split(','))):
+            try:
+                low, high = parse_ip_range(term)
+            except ValueError as exc:
+                raise ValidationError({name: [str(exc)]})
+            condition |= Q(ip_key__gte=low, ip_key__lte=high)
+        return queryset.filter(condition) if condition else queryset
+
+    def filter_within(self, queryset, name, value):
+        """Everything inside the given asset, at any depth"""
+        return queryset.subtree(int(value))
+
+    def filter_location(self, queryset, name, value):
+        """Site name, or the location text of assets not linked to a site yet"""
+        return queryset.filter(Q(site__name__iexact=value) | Q(site__isnull=True, location__iexact=value))
+
+
+class MaintenanceRecordFilter(django_filters.FilterSet):
+    # By id, so the history of an archived asset can still be asked for
+    asset = django_filters.NumberFilter(field_name='asset_id')
+
+    class Meta:
+        model = MaintenanceRecord
+        fields = {
+            'priority': ['exact'],
+            'created_by': ['exact'],
+            'company': ['exact'],
+            'created_at': ['gte', 'lte'],
+            'completed_date': ['isnull'],
+        }
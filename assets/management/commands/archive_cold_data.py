@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from assets.archive import ARCHIVE_BATCH_SIZE, archive_cold_data
+
+
+class Command(BaseCommand):
+    help = 'Moves retired assets and old closed maintenance records into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Rows per transaction')
+        parser.add_argument('--asset-days', type=int, help='Retention of retired assets (default: ARCHIVE_ASSET_RETENTION_DAYS)')
+        parser.add_argument(
+            '--maintenance-days', type=int,
+            help='Retention of closed maintenance records (default: ARCHIVE_MAINTENANCE_RETENTION_DAYS)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+
+    def handle(self, *args, **options):
+        moved = archive_cold_data(
+            batch_size=options['batch_size'],
+            asset_days=options['asset_days'],
+            maintenance_days=options['maintenance_days'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {moved['assets']} assets and {moved['maintenance_records']} maintenance records"
+        ))
@@ -0,0 +1,14 @@
+import time
+from django.core.management.base import BaseCommand
+from assets.dedup import refresh_candidates
+
+
+class Command(BaseCommand):
+    help = 'Detects duplicate and near-duplicate assets and stores them as merge candidates'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = refresh_candidates()
+        self.stdout.write(self.style.SUCCESS(
+            f'Found {count} open duplicate candidates in {time.monotonic() - started:.1f}s'
+        ))
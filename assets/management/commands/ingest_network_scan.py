@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from assets.discovery import SCAN_FORMATS, ingest_scan, parse_scan
+
+
+class Command(BaseCommand):
+    help = 'Matches a DHCP lease / ARP / network scan export to assets by MAC address'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the export file')
+        parser.add_argument(
+            '--format', dest='fmt', choices=SCAN_FORMATS, default='csv',
+            help='Export format (default: csv)'
+        )
+        parser.add_argument(
+            '--show-unknown', action='store_true',
+            help='List devices that did not match any asset'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8') as fh:
+                data = json.load(fh) if options['fmt'] == 'json' else fh.read()
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read {options['path']}: {exc}")
+
+        result = ingest_scan(parse_scan(data, options['fmt']))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['devices']} devices: {result['matched']} matched, "
+            f"{result['ip_changed']} IP changes, {result['unknown_count']} unknown, "
+            f"{result['invalid']} invalid entries"
+        ))
+        if options['show_unknown']:
+            for device in result['unknown']:
+                self.stdout.write(f"  {device['mac']}  {device['ip'] or '-'}")
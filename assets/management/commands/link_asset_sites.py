@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from assets.models import Asset
+from assets.sites import BACKFILL_BATCH_SIZE, backfill_asset_sites
+from companies.models import Site
+
+
+class Command(BaseCommand):
+    help = 'Links assets that only have a free-text location to the site it names'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='Assets per UPDATE')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be linked')
+
+    def handle(self, *args, **options):
+        linked, unmatched = backfill_asset_sites(
+            Asset, Site, batch_size=options['batch_size'], dry_run=options['dry_run']
+        )
+        verb = 'Would link' if options['dry_run'] else 'Linked'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {linked} assets to sites'))
+        for location, count in sorted(unmatched.items(), key=lambda item: -item[1]):
+            self.stdout.write(self.style.WARNING(f'  no site matches "{location}" ({count} assets)'))
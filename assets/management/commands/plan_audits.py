@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from assets.audits import plan_audits
+
+
+class Command(BaseCommand):
+    help = 'Plans new and changed assets into the load-leveled audit schedule'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Replan every asset from scratch')
+
+    def handle(self, *args, **options):
+        result = plan_audits(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Planned {result['planned']} audits, removed {result['removed']} entries"
+        ))
@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-19 04:47
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_mac_normalized(apps, schema_editor):
+    Asset = apps.get_model('assets', 'Asset')
+    rows = Asset.objects.exclude(mac_address__isnull=True).exclude(mac_address='')
+    batch = []
+    for asset_id, mac in rows.values_list('id', 'mac_address').iterator(chunk_size=2000):
+        digits = re.sub(r'[^0-9a-f]', '', mac.lower())
+        if len(digits) == 12 and digits != '000000000000':
+            batch.append(Asset(id=asset_id, mac_normalized=digits))
+        if len(batch) >= 1000:
+            Asset.objects.bulk_update(batch, ['mac_normalized'])
+            batch = []
+    if batch:
+        Asset.objects.bulk_update(batch, ['mac_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, help_text='Last time the device was reported by a network scan', null=True),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='mac_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Lower-case hex digits of mac_address, used for discovery matching', max_length=12),
+        ),
+        migrations.RunPython(backfill_mac_normalized, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 04:51
+
+from django.db import migrations, models
+
+from assets.network import ip_to_key
+
+
+def backfill_ip_key(apps, schema_editor):
+    Asset = apps.get_model('assets', 'Asset')
+    rows = Asset.objects.exclude(ip_address__isnull=True)
+    batch = []
+    for asset_id, ip in rows.values_list('id', 'ip_address').iterator(chunk_size=2000):
+        batch.append(Asset(id=asset_id, ip_key=ip_to_key(ip)))
+        if len(batch) >= 1000:
+            Asset.objects.bulk_update(batch, ['ip_key'])
+            batch = []
+    if batch:
+        Asset.objects.bulk_update(batch, ['ip_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0003_asset_discovery_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='ip_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Fixed-width hex form of ip_address, used for subnet queries', max_length=32),
+        ),
+        migrations.RunPython(backfill_ip_key, migrations.RunPython.noop),
+    ]
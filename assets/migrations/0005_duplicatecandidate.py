@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-19 04:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0004_asset_ip_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('reasons', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('dismissed', 'Dismissed')], default='open', max_length=10)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='assets.asset')),
+                ('duplicate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='assets.asset')),
+            ],
+            options={
+                'verbose_name': 'Duplicate Candidate',
+                'verbose_name_plural': 'Duplicate Candidates',
+                'ordering': ['-score', 'asset'],
+                'indexes': [models.Index(fields=['status', '-score'], name='assets_dupl_status_99a13d_idx')],
+                'unique_together': {('asset', 'duplicate')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-19 04:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0005_duplicatecandidate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenancerecord',
+            index=models.Index(fields=['asset', 'completed_date'], name='assets_main_asset_i_923bea_idx'),
+        ),
+    ]
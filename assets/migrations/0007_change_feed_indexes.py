@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-19 05:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    MaintenanceRecord = apps.get_model('assets', 'MaintenanceRecord')
+    MaintenanceRecord.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0006_maintenancerecord_asset_completed_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenancerecord',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['updated_at', 'id'], name='assets_asse_updated_8eccb3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerecord',
+            index=models.Index(fields=['updated_at', 'id'], name='assets_main_updated_6ce279_idx'),
+        ),
+    ]
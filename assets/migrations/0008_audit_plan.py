@@ -0,0 +1,72 @@
+# Generated by Django 5.2 on 2026-10-19 05:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0007_change_feed_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditorCapacity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekly_capacity', models.PositiveIntegerField(default=50)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Auditor Capacity',
+                'verbose_name_plural': 'Auditor Capacities',
+                'ordering': ['auditor'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditPlanEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField(help_text='Monday of the planned week')),
+                ('due_date', models.DateField()),
+                ('location', models.CharField(blank=True, max_length=100)),
+                ('last_audit', models.DateField(blank=True, help_text="The asset's last audit when this entry was planned", null=True)),
+                ('planned_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Audit Plan Entry',
+                'verbose_name_plural': 'Audit Plan Entries',
+                'ordering': ['week', 'location', 'asset'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['last_audit'], name='assets_asse_last_au_de108b_idx'),
+        ),
+        migrations.AddField(
+            model_name='auditorcapacity',
+            name='auditor',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='audit_capacity', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='auditplanentry',
+            name='asset',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='audit_plan', to='assets.asset'),
+        ),
+        migrations.AddField(
+            model_name='auditplanentry',
+            name='auditor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='planned_audits', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='auditplanentry',
+            index=models.Index(fields=['auditor', 'week'], name='assets_audi_auditor_193362_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditplanentry',
+            index=models.Index(fields=['week', 'location'], name='assets_audi_week_20099d_idx'),
+        ),
+    ]
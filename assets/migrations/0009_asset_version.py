@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 05:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0008_audit_plan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
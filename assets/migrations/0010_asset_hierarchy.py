@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-19 05:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_self_links(apps, schema_editor):
+    # Existing assets have no parent yet, so each is only its own depth-0 link
+    Asset = apps.get_model('assets', 'Asset')
+    AssetClosure = apps.get_model('assets', 'AssetClosure')
+    batch = []
+    for asset_id in Asset.objects.values_list('id', flat=True).iterator(chunk_size=2000):
+        batch.append(AssetClosure(ancestor_id=asset_id, descendant_id=asset_id, depth=0))
+        if len(batch) >= 1000:
+            AssetClosure.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        AssetClosure.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0009_asset_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='parent',
+            field=models.ForeignKey(blank=True, help_text='Asset this one is installed in or travels with, e.g. the rack holding a server', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children', to='assets.asset'),
+        ),
+        migrations.CreateModel(
+            name='AssetClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='assets.asset')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='assets.asset')),
+            ],
+            options={
+                'verbose_name': 'Asset Hierarchy Link',
+                'verbose_name_plural': 'Asset Hierarchy Links',
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='assets_asse_descend_26b7f3_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_asset_closure_pair')],
+            },
+        ),
+        migrations.RunPython(backfill_self_links, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2 on 2026-10-19 05:58
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def _normalize(value):
+    return ' '.join((value or '').split()).casefold()
+
+
+def link_sites(apps, schema_editor):
+    """
+    Set ``site`` from the location string, matched by site name or as
+    "Company - Site". A name several companies use is resolved with the
+    company of the asset's user. Kept here rather than imported from
+    assets.sites so later changes there cannot alter this migration.
+    """
+    Asset = apps.get_model('assets', 'Asset')
+    Site = apps.get_model('companies', 'Site')
+
+    index = defaultdict(dict)
+    for site_id, name, company_id, company_name in Site.objects.values_list(
+        'id', 'name', 'company_id', 'company__name'
+    ):
+        index[_normalize(name)].setdefault(company_id, site_id)
+        index[_normalize(f'{company_name} - {name}')].setdefault(company_id, site_id)
+
+    pending = Asset.objects.filter(site__isnull=True).exclude(location='')
+    groups = pending.order_by().values_list('location', 'assigned_to__company_id').distinct()
+    for location, company_id in groups:
+        candidates = index.get(_normalize(location))
+        if not candidates:
+            continue
+        site_id = next(iter(candidates.values())) if len(candidates) == 1 else candidates.get(company_id)
+        if site_id is None:
+            continue
+        ids = list(pending.filter(
+            location=location,
+            **({'assigned_to__company_id': company_id} if company_id else {'assigned_to__company__isnull': True})
+        ).values_list('id', flat=True))
+        for start in range(0, len(ids), BATCH_SIZE):
+            Asset.objects.filter(id__in=ids[start:start + BATCH_SIZE]).update(site_id=site_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0010_asset_hierarchy'),
+        ('companies', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='site',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assets', to='companies.site'),
+        ),
+        migrations.AlterField(
+            model_name='asset',
+            name='location',
+            field=models.CharField(blank=True, help_text="Free-text location; follows the site's name when a site is set", max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['site', 'status'], name='assets_asse_site_id_a50776_idx'),
+        ),
+        migrations.RunPython(link_sites, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-19 06:01
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0011_asset_site'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAsset',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('archived_at', models.DateTimeField(db_index=True)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('asset_tag', models.CharField(db_index=True, max_length=50)),
+                ('serial_number', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('status_id', models.BigIntegerField(null=True)),
+                ('site_id', models.BigIntegerField(db_index=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Asset',
+                'verbose_name_plural': 'Archived Assets',
+                'ordering': ['-archived_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedMaintenanceRecord',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('archived_at', models.DateTimeField(db_index=True)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('asset_id', models.BigIntegerField()),
+                ('status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('completed_date', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Maintenance Record',
+                'verbose_name_plural': 'Archived Maintenance Records',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['asset_id', 'created_at'], name='assets_arch_asset_i_7581da_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2 on 2026-10-19 06:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_companies(apps, schema_editor):
+    Asset = apps.get_model('assets', 'Asset')
+    MaintenanceRecord = apps.get_model('assets', 'MaintenanceRecord')
+    ArchivedAsset = apps.get_model('assets', 'ArchivedAsset')
+    ArchivedMaintenanceRecord = apps.get_model('assets', 'ArchivedMaintenanceRecord')
+    Site = apps.get_model('companies', 'Site')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    Asset.objects.filter(company__isnull=True, site__isnull=False).update(
+        company_id=Subquery(Site.objects.filter(pk=OuterRef('site_id')).values('company_id')[:1])
+    )
+    Asset.objects.filter(company__isnull=True, assigned_to__company__isnull=False).update(
+        company_id=Subquery(User.objects.filter(pk=OuterRef('assigned_to_id')).values('company_id')[:1])
+    )
+    MaintenanceRecord.objects.update(
+        company_id=Subquery(Asset.objects.filter(pk=OuterRef('asset_id')).values('company_id')[:1])
+    )
+
+    sites = dict(Site.objects.values_list('pk', 'company_id'))
+    users = dict(User.objects.filter(company__isnull=False).values_list('pk', 'company_id'))
+    archived = list(ArchivedAsset.objects.filter(company_id__isnull=True))
+    for row in archived:
+        row.company_id = sites.get(row.site_id) or users.get(row.data.get('assigned_to_id'))
+    ArchivedAsset.objects.bulk_update(archived, ['company_id'], batch_size=1000)
+
+    companies = dict(Asset.objects.filter(company__isnull=False).values_list('pk', 'company_id'))
+    companies.update(ArchivedAsset.objects.filter(company_id__isnull=False).values_list('pk', 'company_id'))
+    records = list(ArchivedMaintenanceRecord.objects.filter(company_id__isnull=True))
+    for row in records:
+        row.company_id = companies.get(row.asset_id)
+    ArchivedMaintenanceRecord.objects.bulk_update(records, ['company_id'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0012_cold_archive'),
+        ('companies', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedasset',
+            name='company_id',
+            field=models.BigIntegerField(db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedmaintenancerecord',
+            name='company_id',
+            field=models.BigIntegerField(db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='company',
+            field=models.ForeignKey(blank=True, help_text="Owning company, used for row-level scoping; defaults to the site's company, else the assigned user's", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assets', to='companies.company'),
+        ),
+        migrations.AddField(
+            model_name='maintenancerecord',
+            name='company',
+            field=models.ForeignKey(blank=True, editable=False, help_text="The asset's company, copied for row-level scoping", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='maintenance_records', to='companies.company'),
+        ),
+        migrations.RunPython(backfill_companies, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,16 @@
-from django.db import models
+from collections import defaultdict
+from django.db import connections, models, router, transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.utils.translation import gettext_lazy as _
+from core.concurrency import VersionedModel, VersionedQuerySet
+from core.feed import record_rehomed
+from core.models import ArchivedRow
+from core.outbox import OutboxModel, OutboxQuerySet
+from .depreciation import book_value
+from .network import ip_to_key, normalize_mac
 
 User = get_user_model()
 
@@ -65,7 +74,182 @@ class AssetStatus(models.Model):
     def __str__(self):
         return self.name
 
-class Asset(models.Model):
+# Indexed lookup columns and the field each one is derived from
+DERIVED_FIELDS = {
+    'mac_address': 'mac_normalized',
+    'ip_address': 'ip_key',
+}
+DERIVE = {
+    'mac_normalized': normalize_mac,
+    'ip_key': ip_to_key,
+}
+
+def warranty_expiry_q(start, end):
+    """
+    Condition for assets whose warranty ends between ``start`` and ``end``.
+
+    ``warranty_expiry`` is purchase_date + warranty_months, so for each
+    warranty length in use this becomes a purchase_date range that the
+    database can evaluate directly.
+    """
+    from dateutil.relativedelta import relativedelta
+    lengths = Asset.objects.order_by().values_list('warranty_months', flat=True).distinct()
+    condition = models.Q(pk__in=[])
+    for months in lengths:
+        condition |= models.Q(
+            warranty_months=months,
+            purchase_date__gte=start - relativedelta(months=months),
+            purchase_date__lte=end - relativedelta(months=months),
+        )
+    return condition
+
+_UNSET = object()
+
+class AssetQuerySet(VersionedQuerySet, OutboxQuerySet):
+    """
+    Keeps the derived lookup columns, the hierarchy closure table and the
+    company of maintenance records in sync on the bulk write paths
+    """
+
+    def _bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.sync_derived_fields()
+        self._fill_companies(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        fields = list(fields)
+        objs = list(objs)
+        derived = [DERIVED_FIELDS[name] for name in fields if name in DERIVED_FIELDS]
+        if derived:
+            for obj in objs:
+                obj.sync_derived_fields()
+            fields += [name for name in derived if name not in fields]
+        moving = 'parent' in fields or 'parent_id' in fields
+        rehoming = 'company' in fields or 'company_id' in fields
+        if not (moving or rehoming):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        closure = AssetClosure.objects.using(self.db)
+        # Checked before the transaction so a rejected move leaves the caller's usable
+        if moving:
+            for obj in objs:
+                closure.check_move(obj.pk, obj.parent_id)
+        with transaction.atomic(using=self.db, savepoint=False):
+            if rehoming:
+                previous = self._companies([obj.pk for obj in objs])
+            updated = super().bulk_update(objs, fields, *args, **kwargs)
+            if moving:
+                for obj in objs:
+                    closure.move_subtree(obj.pk, obj.parent_id)
+                    obj._loaded_parent_id = obj.parent_id
+            if rehoming:
+                self._rehome_maintenance(previous)
+                for obj in objs:
+                    obj._loaded_company_id = obj.company_id
+        return updated
+
+    def _companies(self, asset_ids):
+        return dict(Asset.objects.using(self.db).filter(pk__in=asset_ids).values_list('pk', 'company_id'))
+
+    def _rehome_maintenance(self, previous):
+        """
+        Copy the company of the assets onto their maintenance records, and
+        leave tombstones for the companies they left. ``previous`` maps the
+        asset ids to their company before the write.
+        """
+        MaintenanceRecord.objects.using(self.db).filter(asset_id__in=previous).update(
+            company_id=Subquery(Asset.objects.filter(pk=OuterRef('asset_id')).values('company_id')[:1])
+        )
+        current = self._companies(previous)
+        left = {
+            pk: company_id for pk, company_id in previous.items()
+            if company_id is not None and current.get(pk) != company_id
+        }
+        if left:
+            record_rehomed(Asset.outbox_aggregate, left.items())
+            record_rehomed(MaintenanceRecord.outbox_aggregate, (
+                (pk, left[asset_id])
+                for pk, asset_id in MaintenanceRecord.objects.using(self.db).filter(
+                    asset_id__in=left
+                ).values_list('pk', 'asset_id')
+            ))
+
+    def _fill_companies(self, objs):
+        """Default company of new assets without one, with a query per related model"""
+        pending = [obj for obj in objs if obj.company_id is None and (obj.site_id or obj.assigned_to_id)]
+        if not pending:
+            return
+        site_model = self.model._meta.get_field('site').related_model
+        sites = dict(site_model.objects.using(self.db).filter(
+            pk__in={obj.site_id for obj in pending if obj.site_id}
+        ).values_list('pk', 'company_id'))
+        users = dict(User.objects.using(self.db).filter(
+            pk__in={obj.assigned_to_id for obj in pending if obj.assigned_to_id}
+        ).values_list('pk', 'company_id'))
+        for obj in pending:
+            obj.company_id = sites.get(obj.site_id) or users.get(obj.assigned_to_id)
+
+    def warranty_expiring(self, start, end):
+        return self.filter(warranty_expiry_q(start, end))
+
+    def subtree(self, asset, include_self=False):
+        """Everything inside ``asset`` at any depth, via the closure table"""
+        return self.filter(ancestor_links__ancestor=asset, ancestor_links__depth__gte=0 if include_self else 1)
+
+    def ancestors(self, asset, include_self=False):
+        """The assets ``asset`` sits in, outermost first"""
+        return self.filter(
+            descendant_links__descendant=asset, descendant_links__depth__gte=0 if include_self else 1
+        ).order_by('-descendant_links__depth')
+
+    def with_rollup(self):
+        """
+        Annotate ``contents_count`` (assets inside, at any depth) and
+        ``total_cost`` (purchase cost of the asset and its contents)
+        """
+        return self.annotate(
+            contents_count=Count('descendant_links', filter=Q(descendant_links__depth__gt=0)),
+            total_cost=Sum('descendant_links__descendant__purchase_cost'),
+        )
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            created = self._bulk_create(objs, *args, **kwargs)
+            AssetClosure.objects.using(self.db).insert_nodes(created)
+        return created
+
+    def update(self, **kwargs):
+        # Only literal values can be converted; expressions must set both columns
+        for source, derived in DERIVED_FIELDS.items():
+            value = kwargs.get(source)
+            if source in kwargs and derived not in kwargs and not hasattr(value, 'resolve_expression'):
+                kwargs[derived] = DERIVE[derived](value) or ''
+        parent = kwargs.get('parent', kwargs.get('parent_id', _UNSET))
+        rehoming = 'company' in kwargs or 'company_id' in kwargs
+        if parent is _UNSET and not rehoming:
+            return super().update(**kwargs)
+        parent_id = getattr(parent, 'pk', parent)
+        previous = dict(self.values_list('pk', 'company_id'))
+        moved = list(previous)
+        closure = AssetClosure.objects.using(self.db)
+        # Checked before the transaction so a rejected move leaves the caller's usable
+        if parent is not _UNSET:
+            for pk in moved:
+                closure.check_move(pk, parent_id)
+        with transaction.atomic(using=self.db, savepoint=False):
+            updated = super().update(**kwargs)
+            if parent is not _UNSET:
+                for pk in moved:
+                    closure.move_subtree(pk, parent_id)
+            if rehoming:
+                self._rehome_maintenance(previous)
+        return updated
+
+class Asset(VersionedModel, OutboxModel):
+    outbox_aggregate = 'asset'
+    outbox_ignored_fields = ('last_seen',)
+
     asset_tag = models.CharField(max_length=50, unique=True)
     serial_number = models.CharField(max_length=100, blank=True)
     model = models.ForeignKey(AssetModel, on_delete=models.PROTECT, related_name='assets')
@@ -89,9 +273,55 @@ class Asset(models.Model):
         blank=True, 
         related_name='assigned_assets'
     )
-    location = models.CharField(max_length=100, blank=True)
+    location = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text=_("Free-text location; follows the site's name when a site is set")
+    )
+    site = models.ForeignKey(
+        'companies.Site',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='assets'
+    )
+    company = models.ForeignKey(
+        'companies.Company',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='assets',
+        help_text=_("Owning company, used for row-level scoping; defaults to the site's company, else the assigned user's")
+    )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='children',
+        help_text=_("Asset this one is installed in or travels with, e.g. the rack holding a server")
+    )
     ip_address = models.GenericIPAddressField(blank=True, null=True)
+    ip_key = models.CharField(
+        max_length=32,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text=_("Fixed-width hex form of ip_address, used for subnet queries")
+    )
     mac_address = models.CharField(max_length=17, blank=True, null=True)
+    mac_normalized = models.CharField(
+        max_length=12,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text=_("Lower-case hex digits of mac_address, used for discovery matching")
+    )
+    last_seen = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_("Last time the device was reported by a network scan")
+    )
     last_audit = models.DateField(null=True, blank=True)
     depreciation_rate = models.DecimalField(
         max_digits=5, 
@@ -105,14 +335,94 @@ class Asset(models.Model):
         default=0.00
     )
 
+    objects = AssetQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Asset")
         verbose_name_plural = _("Assets")
         ordering = ['asset_tag']
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),
+            models.Index(fields=['last_audit']),
+            models.Index(fields=['site', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.asset_tag} - {self.model}"
 
+    def sync_derived_fields(self):
+        """Refresh the indexed lookup columns derived from MAC and IP"""
+        self.mac_normalized = normalize_mac(self.mac_address) or ''
+        self.ip_key = ip_to_key(self.ip_address)
+
+    def clean(self):
+        super().clean()
+        if self.pk and self.parent_id and AssetClosure.objects.filter(
+            ancestor_id=self.pk, descendant_id=self.parent_id
+        ).exists():
+            raise ValidationError({'parent': _('An asset cannot be placed inside itself or its own contents')})
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets save() tell a move from any other edit
+        instance._loaded_parent_id = instance.__dict__.get('parent_id', _UNSET)
+        instance._loaded_company_id = instance.__dict__.get('company_id', _UNSET)
+        return instance
+
+    def default_company_id(self):
+        """The site's company, else the assigned user's"""
+        if self.site_id:
+            return self.site.company_id
+        if self.assigned_to_id:
+            return self.assigned_to.company_id
+        return None
+
+    def save(self, *args, **kwargs):
+        self.sync_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            for source, derived in DERIVED_FIELDS.items():
+                if source in update_fields:
+                    update_fields.add(derived)
+            kwargs['update_fields'] = update_fields
+        if self.company_id is None:
+            self.company_id = self.default_company_id()
+            if self.company_id is not None and update_fields is not None:
+                update_fields.add('company')
+
+        adding = self._state.adding
+        moved = (
+            not adding
+            and self.parent_id != getattr(self, '_loaded_parent_id', self.parent_id)
+            and (update_fields is None or {'parent', 'parent_id'} & update_fields)
+        )
+        rehomed = (
+            not adding
+            and self.company_id != getattr(self, '_loaded_company_id', self.company_id)
+            and (update_fields is None or {'company', 'company_id'} & update_fields)
+        )
+        if not (adding or moved or rehomed):
+            return super().save(*args, **kwargs)
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        closure = AssetClosure.objects.using(using)
+        if moved:
+            closure.check_move(self.pk, self.parent_id)
+        with transaction.atomic(using=using, savepoint=False):
+            assets = Asset.objects.using(using)
+            if rehomed:
+                previous = assets._companies([self.pk])
+            super().save(*args, **kwargs)
+            if adding:
+                closure.insert_nodes([self])
+            elif moved:
+                closure.move_subtree(self.pk, self.parent_id)
+            if rehomed:
+                assets._rehome_maintenance(previous)
+        self._loaded_parent_id = self.parent_id
+        self._loaded_company_id = self.company_id
+
     @property
     def warranty_expiry(self):
         if self.purchase_date:
@@ -131,12 +441,110 @@ class Asset(models.Model):
 
     @property
     def current_value(self):
+        """Book value at the start of this month, net of the months chargeback has charged"""
         if not self.purchase_cost:
             return 0
-        years = self.age_in_months / 12
-        depreciation_factor = (1 - (float(self.depreciation_rate) / 100) ** years)
-        current_val = float(self.purchase_cost) * depreciation_factor
-        return max(current_val, float(self.residual_value))
+        if not self.purchase_date:
+            return self.purchase_cost
+        from datetime import date
+        return book_value(
+            self.purchase_cost, self.depreciation_rate, self.residual_value, self.purchase_date, date.today()
+        )
+
+class AssetClosureQuerySet(models.QuerySet):
+    """Maintains the closure rows; Asset.save and AssetQuerySet call these"""
+
+    def insert_nodes(self, assets):
+        """Rows for new assets; their parents are existing assets or come earlier in the batch"""
+        batch = {asset.pk: asset for asset in assets if asset.pk is not None}
+        outside = {asset.parent_id for asset in batch.values() if asset.parent_id and asset.parent_id not in batch}
+        known = defaultdict(list)
+        for ancestor_id, descendant_id, depth in self.filter(descendant_id__in=outside).values_list(
+            'ancestor_id', 'descendant_id', 'depth'
+        ):
+            known[descendant_id].append((ancestor_id, depth))
+
+        def path(pk, trail=()):
+            if pk not in batch:
+                return known[pk]
+            if pk not in known:
+                if pk in trail:
+                    raise ValidationError(_('Asset hierarchy cycle'))
+                parent_id = batch[pk].parent_id
+                above = path(parent_id, trail + (pk,)) if parent_id else []
+                known[pk] = [(pk, 0)] + [(ancestor_id, depth + 1) for ancestor_id, depth in above]
+            return known[pk]
+
+        self.bulk_create(
+            [
+                AssetClosure(ancestor_id=ancestor_id, descendant_id=pk, depth=depth)
+                for pk in batch for ancestor_id, depth in path(pk)
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+    def check_move(self, asset_id, parent_id):
+        if parent_id is not None and self.filter(ancestor_id=asset_id, descendant_id=parent_id).exists():
+            raise ValidationError(_('An asset cannot be placed inside itself or its own contents'))
+
+    def detach_subtree(self, asset_id):
+        """Cut the links from the asset's ancestors to it and its contents"""
+        subtree = self.filter(ancestor_id=asset_id).values('descendant_id')
+        self.filter(descendant_id__in=subtree).exclude(ancestor_id__in=subtree).delete()
+
+    def move_subtree(self, asset_id, parent_id):
+        """Re-hang the asset and everything inside it; two statements whatever its size"""
+        self.detach_subtree(asset_id)
+        if parent_id is None:
+            return
+        opts = self.model._meta
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        table = quote(opts.db_table)
+        ancestor, descendant, depth = (
+            quote(opts.get_field(name).column) for name in ('ancestor', 'descendant', 'depth')
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({ancestor}, {descendant}, {depth}) '
+                f'SELECT a.{ancestor}, d.{descendant}, a.{depth} + d.{depth} + 1 '
+                f'FROM {table} a, {table} d WHERE a.{descendant} = %s AND d.{ancestor} = %s',
+                [parent_id, asset_id]
+            )
+
+    def rollup(self, asset_ids):
+        """``{asset id: {'contents_count', 'total_cost'}}`` in one query"""
+        rows = self.filter(ancestor_id__in=asset_ids).values('ancestor_id').annotate(
+            contents_count=Count('pk', filter=Q(depth__gt=0)),
+            total_cost=Sum('descendant__purchase_cost'),
+        ).order_by()
+        return {row.pop('ancestor_id'): row for row in rows}
+
+class AssetClosure(models.Model):
+    """
+    Every (ancestor, descendant) pair of the asset hierarchy, each asset
+    paired with itself at depth 0, so subtree and ancestor lookups are one
+    indexed join.
+    """
+    ancestor = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveSmallIntegerField()
+
+    objects = AssetClosureQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Asset Hierarchy Link")
+        verbose_name_plural = _("Asset Hierarchy Links")
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_asset_closure_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth']),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} > {self.descendant_id} ({self.depth})"
 
 class MaintenanceType(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -156,7 +564,42 @@ class MaintenanceType(models.Model):
     def __str__(self):
         return self.name
 
-class MaintenanceRecord(models.Model):
+class MaintenanceRecordQuerySet(OutboxQuerySet):
+    """Keeps ``company`` equal to the asset's on the bulk write paths"""
+
+    def _fill_companies(self, objs):
+        companies = dict(Asset.objects.using(self.db).filter(
+            pk__in={obj.asset_id for obj in objs}
+        ).values_list('pk', 'company_id'))
+        for obj in objs:
+            obj.company_id = companies.get(obj.asset_id)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        self._fill_companies(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if ('asset' in fields or 'asset_id' in fields) and 'company' not in fields:
+            self._fill_companies(objs)
+            fields.append('company')
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        asset = kwargs.get('asset', kwargs.get('asset_id', _UNSET))
+        if asset is not _UNSET and 'company' not in kwargs and not hasattr(asset, 'resolve_expression'):
+            kwargs['company_id'] = Subquery(
+                Asset.objects.filter(pk=getattr(asset, 'pk', asset)).values('company_id')[:1]
+            )
+        return super().update(**kwargs)
+
+class MaintenanceRecord(OutboxModel):
+    outbox_aggregate = 'maintenance_record'
+    outbox_ordering_field = 'asset_id'
+    outbox_ordering_aggregate = 'asset'
+
     PRIORITY_CHOICES = [
         ('low', _('Low')),
         ('medium', _('Medium')),
@@ -172,6 +615,8 @@ class MaintenanceRecord(models.Model):
         ('cancelled', _('Cancelled')),
     ]
 
+    CLOSED_STATUSES = ('completed', 'cancelled')
+
     asset = models.ForeignKey(
         Asset, 
         on_delete=models.CASCADE, 
@@ -203,6 +648,7 @@ class MaintenanceRecord(models.Model):
         related_name='created_maintenance'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     scheduled_date = models.DateField()
     completed_date = models.DateField(null=True, blank=True)
     technician = models.CharField(max_length=100, blank=True)
@@ -213,17 +659,166 @@ class MaintenanceRecord(models.Model):
         blank=True
     )
     resolution = models.TextField(blank=True)
+    company = models.ForeignKey(
+        'companies.Company',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='maintenance_records',
+        help_text=_("The asset's company, copied for row-level scoping")
+    )
+
+    objects = MaintenanceRecordQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Maintenance Record")
         verbose_name_plural = _("Maintenance Records")
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['asset', 'completed_date']),
+            models.Index(fields=['updated_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.asset.asset_tag} - {self.title}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'asset', 'asset_id'} & set(update_fields):
+            self.company_id = self.asset.company_id
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'company'}
+        super().save(*args, **kwargs)
+
+    @property
+    def is_open(self):
+        return self.status not in self.CLOSED_STATUSES
+
     @property
     def is_overdue(self):
         from datetime import date
         return (self.status not in ['completed', 'cancelled'] and 
-                date.today() > self.scheduled_date)
\ No newline at end of file
+                date.today() > self.scheduled_date)
+
+class ArchivedAsset(ArchivedRow):
+    """A retired asset moved out of the hot table by assets.archive"""
+    asset_tag = models.CharField(max_length=50, db_index=True)
+    serial_number = models.CharField(max_length=100, blank=True, db_index=True)
+    status_id = models.BigIntegerField(null=True)
+    site_id = models.BigIntegerField(null=True, db_index=True)
+    company_id = models.BigIntegerField(null=True, db_index=True)
+
+    class Meta:
+        verbose_name = _("Archived Asset")
+        verbose_name_plural = _("Archived Assets")
+        ordering = ['-archived_at', '-id']
+
+    def __str__(self):
+        return f"{self.asset_tag} (archived {self.archived_at:%Y-%m-%d})"
+
+class ArchivedMaintenanceRecord(ArchivedRow):
+    """A closed maintenance record moved out of the hot table by assets.archive"""
+    asset_id = models.BigIntegerField()
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    completed_date = models.DateField(null=True, blank=True)
+    company_id = models.BigIntegerField(null=True, db_index=True)
+
+    class Meta:
+        verbose_name = _("Archived Maintenance Record")
+        verbose_name_plural = _("Archived Maintenance Records")
+        ordering = ['-created_at', '-id']
+        indexes = [models.Index(fields=['asset_id', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.data.get('title', '')} on asset {self.asset_id} (archived)"
+
+class DuplicateCandidate(models.Model):
+    STATUS_CHOICES = [
+        ('open', _('Open')),
+        ('dismissed', _('Dismissed')),
+    ]
+
+    asset = models.ForeignKey(
+        Asset,
+        on_delete=models.CASCADE,
+        related_name='duplicate_candidates'
+    )
+    duplicate = models.ForeignKey(
+        Asset,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+    reasons = models.CharField(max_length=100)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='open'
+    )
+    detected_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Duplicate Candidate")
+        verbose_name_plural = _("Duplicate Candidates")
+        ordering = ['-score', 'asset']
+        unique_together = ('asset', 'duplicate')
+        indexes = [models.Index(fields=['status', '-score'])]
+
+    def __str__(self):
+        return f"{self.asset_id} ~ {self.duplicate_id} ({self.score:.2f})"
+
+class AuditorCapacity(models.Model):
+    """How many assets a user can audit per week"""
+    auditor = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='audit_capacity'
+    )
+    weekly_capacity = models.PositiveIntegerField(default=50)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = _("Auditor Capacity")
+        verbose_name_plural = _("Auditor Capacities")
+        ordering = ['auditor']
+
+    def __str__(self):
+        return f"{self.auditor} ({self.weekly_capacity}/week)"
+
+class AuditPlanEntry(models.Model):
+    """The week and auditor an asset's next audit is planned for"""
+    asset = models.OneToOneField(
+        Asset,
+        on_delete=models.CASCADE,
+        related_name='audit_plan'
+    )
+    auditor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='planned_audits'
+    )
+    week = models.DateField(help_text=_("Monday of the planned week"))
+    due_date = models.DateField()
+    location = models.CharField(max_length=100, blank=True)
+    last_audit = models.DateField(
+        null=True,
+        blank=True,
+        help_text=_("The asset's last audit when this entry was planned")
+    )
+    planned_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Audit Plan Entry")
+        verbose_name_plural = _("Audit Plan Entries")
+        ordering = ['week', 'location', 'asset']
+        indexes = [
+            models.Index(fields=['auditor', 'week']),
+            models.Index(fields=['week', 'location']),
+        ]
+
+    def __str__(self):
+        return f"{self.asset_id} in week of {self.week}"
@@ -0,0 +1,76 @@
+# assets/network.py
+"""
+MAC and IP address helpers shared by the models, filters and discovery.
+
+IP addresses are indexed through ``Asset.ip_key``: the 128-bit address as
+32 fixed-width hex digits, with IPv4 stored in its IPv4-mapped IPv6 form
+(``::ffff:a.b.c.d``). Fixed width makes string order equal numeric order, so
+a CIDR block or address range becomes a single index range scan.
+"""
+import ipaddress
+import re
+
+MAC_HEX_RE = re.compile(r'[^0-9a-f]')
+IPV4_MAPPED_OFFSET = 0xFFFF << 32
+
+
+def normalize_mac(value):
+    """Return the 12 lower-case hex digits of a MAC address, or None"""
+    if not value:
+        return None
+    digits = MAC_HEX_RE.sub('', str(value).lower())
+    if len(digits) != 12 or digits == '000000000000':
+        return None
+    return digits
+
+
+def format_mac(normalized):
+    """Render a normalized MAC as aa:bb:cc:dd:ee:ff"""
+    return ':'.join(normalized[i:i + 2] for i in range(0, 12, 2))
+
+
+def clean_ip(value):
+    """Return the canonical text form of an IP address, or None"""
+    if not value:
+        return None
+    try:
+        return str(ipaddress.ip_address(str(value).strip()))
+    except ValueError:
+        return None
+
+
+def _int_to_key(number, version):
+    if version == 4:
+        number += IPV4_MAPPED_OFFSET
+    return f'{number:032x}'
+
+
+def ip_to_key(value):
+    """Return the sortable ``ip_key`` for an address, or '' if there is none"""
+    if not value:
+        return ''
+    try:
+        address = ipaddress.ip_address(str(value).strip())
+    except ValueError:
+        return ''
+    return _int_to_key(int(address), address.version)
+
+
+def parse_ip_range(value):
+    """
+    Turn a CIDR block, ``first-last`` range or single address into an
+    inclusive ``(low_key, high_key)`` pair. Raises ValueError on bad input.
+    """
+    value = value.strip()
+    if '-' in value:
+        first, last = (ipaddress.ip_address(part.strip()) for part in value.split('-', 1))
+        if first.version != last.version:
+            raise ValueError(f"'{value}' mixes IPv4 and IPv6 addresses")
+        if int(first) > int(last):
+            first, last = last, first
+        return _int_to_key(int(first), first.version), _int_to_key(int(last), last.version)
+    network = ipaddress.ip_network(value, strict=False)
+    return (
+        _int_to_key(int(network.network_address), network.version),
+        _int_to_key(int(network.broadcast_address), network.version),
+    )
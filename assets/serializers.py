@@ -2,9 +2,14 @@
 from rest_framework import serializers
 from .models import (
     AssetCategory, Manufacturer, AssetModel, 
-    AssetStatus, Asset, MaintenanceRecord
+    AssetStatus, Asset, AssetClosure, MaintenanceRecord, DuplicateCandidate, AuditPlanEntry
 )
+from .sites import resolve_site
 from django.contrib.auth import get_user_model
+from companies.models import Company, Site
+from core.feed import CHANGE_FEED_MAX_PAGE_SIZE, CHANGE_FEED_PAGE_SIZE
+from core.scoping import in_scope, scoped_company_id
+from core.serializers import ChangedFieldsUpdateMixin, CurrentPrimaryKeyRelatedField, VersionedSerializerMixin
 
 User = get_user_model()
 
@@ -47,40 +52,104 @@ class AssetStatusSerializer(serializers.ModelSerializer):
         model = AssetStatus
         fields = '__all__'
 
-class AssetSerializer(serializers.ModelSerializer):
+class AssetSerializer(VersionedSerializerMixin, ChangedFieldsUpdateMixin, serializers.ModelSerializer):
     model = AssetModelSerializer(read_only=True)
-    model_id = serializers.PrimaryKeyRelatedField(
+    model_id = CurrentPrimaryKeyRelatedField(
         queryset=AssetModel.objects.all(),
         source='model',
         write_only=True
     )
     
     status = AssetStatusSerializer(read_only=True)
-    status_id = serializers.PrimaryKeyRelatedField(
+    status_id = CurrentPrimaryKeyRelatedField(
         queryset=AssetStatus.objects.all(),
         source='status',
         write_only=True
     )
     
     assigned_to = UserSerializer(read_only=True)
-    assigned_to_id = serializers.PrimaryKeyRelatedField(
+    assigned_to_id = CurrentPrimaryKeyRelatedField(
         queryset=User.objects.all(),
         source='assigned_to',
         write_only=True,
         allow_null=True
     )
     
+    site = CurrentPrimaryKeyRelatedField(
+        queryset=Site.objects.all(),
+        allow_null=True,
+        required=False
+    )
+    parent = CurrentPrimaryKeyRelatedField(
+        queryset=Asset.objects.all(),
+        allow_null=True,
+        required=False
+    )
+    company = CurrentPrimaryKeyRelatedField(
+        queryset=Company.objects.all(),
+        allow_null=True,
+        required=False
+    )
+
     warranty_expiry = serializers.DateField(read_only=True)
     age_in_months = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Asset
         fields = '__all__'
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'last_seen']
+
+    def validate(self, attrs):
+        # Keep location and site in step while clients move over to site
+        if attrs.get('site') is not None:
+            attrs['location'] = attrs['site'].name
+        elif 'site' not in attrs and attrs.get('location'):
+            assigned_to = attrs.get('assigned_to', getattr(self.instance, 'assigned_to', None))
+            site = resolve_site(attrs['location'], getattr(assigned_to, 'company_id', None))
+            attrs['site'] = site if self._visible(site) else None
+        request = self.context.get('request')
+        if request is not None:
+            self._check_company(request.user, attrs)
+        return attrs
+
+    def _visible(self, value):
+        request = self.context.get('request')
+        return value is None or request is None or in_scope(request.user, value.company_id)
+
+    def _scoped(self, value):
+        """Related rows of another company are answered as if they did not exist"""
+        if not self._visible(value):
+            raise serializers.ValidationError(f'Invalid pk "{value.pk}" - object does not exist.')
+        return value
+
+    def validate_assigned_to_id(self, value):
+        return self._scoped(value)
+
+    def validate_site(self, value):
+        return self._scoped(value)
 
-class MaintenanceRecordSerializer(serializers.ModelSerializer):
+    def _check_company(self, user, attrs):
+        """Users limited to their company can only write assets of that company"""
+        company = attrs['company'] if 'company' in attrs else getattr(self.instance, 'company', None)
+        if company is not None:
+            scoped_company_id(user, company.pk)
+            return
+        site = attrs['site'] if 'site' in attrs else getattr(self.instance, 'site', None)
+        assigned_to = attrs['assigned_to'] if 'assigned_to' in attrs else getattr(self.instance, 'assigned_to', None)
+        default = getattr(site, 'company_id', None) or getattr(assigned_to, 'company_id', None)
+        if scoped_company_id(user, default) != default:
+            attrs['company'] = user.company
+
+    def validate_parent(self, value):
+        value = self._scoped(value)
+        if value is not None and self.instance is not None and getattr(self.instance, 'pk', None):
+            if AssetClosure.objects.filter(ancestor=self.instance, descendant=value).exists():
+                raise serializers.ValidationError("An asset cannot be placed inside itself or its own contents.")
+        return value
+
+class MaintenanceRecordSerializer(ChangedFieldsUpdateMixin, serializers.ModelSerializer):
     asset = serializers.StringRelatedField()
-    asset_id = serializers.PrimaryKeyRelatedField(
+    asset_id = CurrentPrimaryKeyRelatedField(
         queryset=Asset.objects.all(),
         source='asset'
     )
@@ -91,4 +160,67 @@ class MaintenanceRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = MaintenanceRecord
         fields = '__all__'
-        read_only_fields = ['created_at', 'created_by']
\ No newline at end of file
+        read_only_fields = ['created_at', 'updated_at', 'created_by']
+
+    def validate_asset_id(self, value):
+        request = self.context.get('request')
+        if request is not None and not in_scope(request.user, value.company_id):
+            raise serializers.ValidationError(f'Invalid pk "{value.pk}" - object does not exist.')
+        return value
+
+class DuplicateAssetSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Asset
+        fields = ['id', 'asset_tag', 'serial_number', 'mac_address', 'model', 'location']
+
+class DuplicateCandidateSerializer(serializers.ModelSerializer):
+    asset = DuplicateAssetSerializer(read_only=True)
+    duplicate = DuplicateAssetSerializer(read_only=True)
+
+    class Meta:
+        model = DuplicateCandidate
+        fields = '__all__'
+        read_only_fields = ['score', 'reasons', 'detected_at']
+
+class AssetMergeSerializer(serializers.Serializer):
+    keep = serializers.ChoiceField(choices=['asset', 'duplicate'], default='asset')
+
+class AssetChangeSerializer(serializers.ModelSerializer):
+    """Flat asset row for the change feed"""
+    class Meta:
+        model = Asset
+        fields = '__all__'
+
+class MaintenanceRecordChangeSerializer(serializers.ModelSerializer):
+    """Flat maintenance row for the change feed"""
+    class Meta:
+        model = MaintenanceRecord
+        fields = '__all__'
+
+class ChangeFeedParamsSerializer(serializers.Serializer):
+    updated_since = serializers.CharField(required=False, allow_blank=True)
+    limit = serializers.IntegerField(
+        required=False, min_value=1, max_value=CHANGE_FEED_MAX_PAGE_SIZE, default=CHANGE_FEED_PAGE_SIZE
+    )
+
+class AuditPlanEntrySerializer(serializers.ModelSerializer):
+    asset_tag = serializers.CharField(source='asset.asset_tag', read_only=True)
+    auditor = UserSerializer(read_only=True)
+
+    class Meta:
+        model = AuditPlanEntry
+        fields = ['id', 'asset', 'asset_tag', 'location', 'auditor', 'week', 'due_date', 'last_audit', 'planned_at']
+
+class AuditRecordSerializer(serializers.Serializer):
+    audited_on = serializers.DateField(required=False)
+
+class AuditWeekParamsSerializer(serializers.Serializer):
+    week = serializers.DateField(required=False)
+    weeks = serializers.IntegerField(required=False, min_value=1, max_value=52, default=12)
+
+class CascadeStatusSerializer(serializers.Serializer):
+    status_id = serializers.PrimaryKeyRelatedField(queryset=AssetStatus.objects.all(), source='status')
+
+class AssetBulkUpdateSerializer(serializers.Serializer):
+    """One bulk update item; the other keys are validated by AssetSerializer"""
+    id = serializers.IntegerField()
@@ -0,0 +1,96 @@
+# assets/sites.py
+"""
+Linking assets to ``companies.Site``.
+
+``Asset.location`` used to be the only record of where an asset is, as free
+text that is usually a site name. ``Asset.site`` replaces it for reporting;
+``location`` is kept in step with the site so clients and filters that
+still use it go on working.
+
+Location strings are matched to sites by name, ignoring case and extra
+whitespace, or in the ``Company - Site`` form sites are displayed in. A
+name several companies use is resolved with the company of the asset's
+user. The backfill works per distinct (location, company) pair rather than
+per asset, and writes in batches of ``pk__in`` updates.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, Q
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def normalize_location(value):
+    return ' '.join((value or '').split()).casefold()
+
+
+def site_index(sites):
+    """{normalized name: {company id: site id}} for a Site queryset"""
+    index = defaultdict(dict)
+    for site_id, name, company_id, company_name in sites.values_list(
+        'id', 'name', 'company_id', 'company__name'
+    ):
+        index[normalize_location(name)].setdefault(company_id, site_id)
+        index[normalize_location(f'{company_name} - {name}')].setdefault(company_id, site_id)
+    return index
+
+
+def match_site(index, location, company_id=None):
+    """Site id for a location string, or None when unknown or ambiguous"""
+    candidates = index.get(normalize_location(location))
+    if not candidates:
+        return None
+    if len(candidates) == 1:
+        return next(iter(candidates.values()))
+    return candidates.get(company_id)
+
+
+def resolve_site(location, company_id=None):
+    """The Site a single location string names, if any"""
+    from companies.models import Site
+
+    name = ' '.join((location or '').split())
+    if not name:
+        return None
+    # Sites the bare name could be, and those of every "Company - Site" split
+    # of it (either part may itself contain " - ")
+    candidates = Q(name__iexact=name)
+    parts = name.split(' - ')
+    for split in range(1, len(parts)):
+        candidates |= Q(
+            company__name__iexact=' - '.join(parts[:split]), name__iexact=' - '.join(parts[split:])
+        )
+    site_id = match_site(site_index(Site.objects.filter(candidates)), name, company_id)
+    return Site.objects.get(pk=site_id) if site_id else None
+
+
+def backfill_asset_sites(asset_model, site_model, batch_size=BACKFILL_BATCH_SIZE, dry_run=False):
+    """
+    Set ``site`` on assets that only have a location string. Takes the
+    model classes, so historical models work as well.
+
+    Returns ``(linked, unmatched)``; ``unmatched`` maps location strings
+    with no site to their asset count.
+    """
+    index = site_index(site_model.objects.all())
+    pending = asset_model.objects.filter(site__isnull=True).exclude(location='')
+    groups = pending.order_by().values('location', 'assigned_to__company_id').annotate(count=Count('id'))
+
+    linked = 0
+    unmatched = defaultdict(int)
+    for group in groups:
+        location, company_id = group['location'], group['assigned_to__company_id']
+        site_id = match_site(index, location, company_id)
+        if site_id is None:
+            unmatched[location] += group['count']
+            continue
+        linked += group['count']
+        if dry_run:
+            continue
+        ids = list(pending.filter(
+            location=location,
+            **({'assigned_to__company_id': company_id} if company_id else {'assigned_to__company__isnull': True})
+        ).values_list('id', flat=True))
+        for start in range(0, len(ids), batch_size):
+            asset_model.objects.filter(id__in=ids[start:start + batch_size]).update(site_id=site_id)
+    return linked, dict(unmatched)
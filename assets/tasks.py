@@ -0,0 +1,17 @@
+# assets/tasks.py
+from config.celery import app
+
+from .archive import archive_cold_data
+from .audits import plan_audits
+
+
+@app.task
+def plan_audits_task():
+    """Incremental audit plan refresh"""
+    return plan_audits()
+
+
+@app.task
+def archive_cold_data_task():
+    """Move retired assets and old maintenance history to the archive"""
+    return archive_cold_data()
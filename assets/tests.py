@@ -1,3 +1,767 @@
+import json
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from companies.models import Company, Site
+from core.concurrency import VersionConflict
+from core.models import OutboxEvent
+from .archive import archive_cold_data
+from .audits import AUDIT_CYCLE_DAYS, plan_audits, replan_asset, week_start
+from .discovery import ingest_scan, parse_scan
+from .dedup import MAX_BLOCK_SIZE, find_duplicates, merge_assets
+from .models import (
+    ArchivedAsset, Asset, AssetCategory, AssetClosure, AssetModel, AssetStatus, AuditorCapacity, AuditPlanEntry,
+    DuplicateCandidate, MaintenanceRecord, Manufacturer,
+)
+from .sites import resolve_site
+from .views import AssetViewSet
+
+
+class AssetFixtureMixin:
+    def setUp(self):
+        self.model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'),
+            category=AssetCategory.objects.create(name='Laptops'),
+            name='Latitude',
+        )
+        self.status = AssetStatus.objects.create(name='Deployed')
+
+    def asset(self, tag, parent=None, **fields):
+        fields.setdefault('status', self.status)
+        return Asset.objects.create(asset_tag=tag, model=self.model, parent=parent, **fields)
+
+
+class ClosureTableTests(AssetFixtureMixin, TestCase):
+    """The closure rows always equal the paths given by the parent pointers"""
+
+    def setUp(self):
+        super().setUp()
+        # rack > server > disk, rack > switch
+        self.rack = self.asset('RACK')
+        self.server = self.asset('SRV', self.rack)
+        self.disk = self.asset('DISK', self.server)
+        self.switch = self.asset('SW', self.rack)
+
+    def assertClosureMatchesParents(self):
+        parents = dict(Asset.objects.values_list('pk', 'parent_id'))
+        expected = set()
+        for pk in parents:
+            ancestor, depth = pk, 0
+            while ancestor is not None:
+                expected.add((ancestor, pk, depth))
+                ancestor, depth = parents[ancestor], depth + 1
+        self.assertEqual(set(AssetClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')), expected)
+
+    def tags(self, queryset):
+        return sorted(queryset.values_list('asset_tag', flat=True))
+
+    def test_insert(self):
+        self.assertClosureMatchesParents()
+        self.assertEqual(self.tags(Asset.objects.subtree(self.rack)), ['DISK', 'SRV', 'SW'])
+        self.assertEqual(
+            list(Asset.objects.ancestors(self.disk).values_list('asset_tag', flat=True)), ['RACK', 'SRV']
+        )
+
+    def test_move_by_save(self):
+        self.server.parent = self.switch
+        self.server.save()
+        self.assertClosureMatchesParents()
+        self.assertEqual(self.tags(Asset.objects.subtree(self.switch)), ['DISK', 'SRV'])
+
+    def test_move_to_top_level(self):
+        self.server.parent = None
+        self.server.save()
+        self.assertClosureMatchesParents()
+        self.assertEqual(self.tags(Asset.objects.subtree(self.rack)), ['SW'])
+
+    def test_move_by_queryset_update_and_bulk_update(self):
+        other = self.asset('RACK2')
+        Asset.objects.filter(pk=self.server.pk).update(parent=other)
+        self.assertClosureMatchesParents()
+
+        self.switch.parent = other
+        self.disk.parent = self.switch
+        Asset.objects.bulk_update([self.switch, self.disk], ['parent'])
+        self.assertClosureMatchesParents()
+        self.assertEqual(self.tags(Asset.objects.subtree(other)), ['DISK', 'SRV', 'SW'])
+
+    def test_cycles_are_rejected_on_every_write_path(self):
+        self.rack.parent = self.disk
+        with self.assertRaises(ValidationError):
+            self.rack.save()
+        with self.assertRaises(ValidationError):
+            Asset.objects.filter(pk=self.server.pk).update(parent=self.server)
+        self.server.parent = self.disk
+        with self.assertRaises(ValidationError):
+            Asset.objects.bulk_update([self.server], ['parent'])
+        self.assertClosureMatchesParents()
+
+    def test_delete_makes_the_contents_top_level(self):
+        self.server.delete()
+        self.assertClosureMatchesParents()
+        self.assertIsNone(Asset.objects.get(pk=self.disk.pk).parent_id)
+        self.assertEqual(self.tags(Asset.objects.subtree(self.rack)), ['SW'])
+
+    def test_bulk_create_with_parents_inside_the_batch(self):
+        shelf = Asset(asset_tag='SHELF', model=self.model, status=self.status, parent=self.rack)
+        Asset.objects.bulk_create([shelf])
+        Asset.objects.bulk_create([
+            Asset(asset_tag=f'BLADE{index}', model=self.model, status=self.status, parent=shelf)
+            for index in range(3)
+        ])
+        self.assertClosureMatchesParents()
+        self.assertEqual(len(Asset.objects.subtree(self.rack)), 7)
+
+    def test_merge_rehangs_the_duplicates_contents(self):
+        duplicate = self.asset('SRV-DUP', self.rack)
+        fan = self.asset('FAN', duplicate)
+        self.asset('PSU', self.asset('CAGE', duplicate))
+
+        merge_assets(self.server, [duplicate])
+
+        self.assertClosureMatchesParents()
+        self.assertEqual(Asset.objects.get(pk=fan.pk).parent_id, self.server.pk)
+        self.assertEqual(self.tags(Asset.objects.subtree(self.server)), ['CAGE', 'DISK', 'FAN', 'PSU'])
+
+    def test_merge_does_not_hang_an_asset_inside_itself(self):
+        # The kept asset sits inside its duplicate
+        merge_assets(self.server, [self.rack])
+
+        self.assertClosureMatchesParents()
+        self.assertIsNone(Asset.objects.get(pk=self.server.pk).parent_id)
+        self.assertEqual(Asset.objects.get(pk=self.switch.pk).parent_id, self.server.pk)
+
+
+class CompanyScopingTests(AssetFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Company.objects.create(name='Acme')
+        self.beta = Company.objects.create(name='Beta')
+        self.rack = self.asset('RACK', company=self.acme, purchase_cost=1000)
+        self.own = self.asset('OWN', self.rack, company=self.acme, purchase_cost=100)
+        self.foreign = self.asset('FOREIGN', self.rack, company=self.beta, purchase_cost=900)
+        self.user = get_user_model().objects.create_user('acme-user', company=self.acme)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_and_detail_only_show_the_users_company(self):
+        tags = [row['asset_tag'] for row in self.client.get('/api/assets/').json()['results']]
+        self.assertEqual(sorted(tags), ['OWN', 'RACK'])
+        self.assertEqual(self.client.get(f'/api/assets/{self.foreign.pk}/').status_code, 404)
+
+    def test_anonymous_requests_see_nothing(self):
+        self.assertEqual(APIClient().get('/api/assets/').json()['count'], 0)
+
+    def test_cascade_status_leaves_other_companies_alone(self):
+        retired = AssetStatus.objects.create(name='Retired')
+        response = self.client.post(f'/api/assets/{self.rack.pk}/cascade-status/', {'status_id': retired.pk})
+
+        self.assertEqual(response.json(), {'updated': 2})
+        self.assertEqual(Asset.objects.get(pk=self.foreign.pk).status, self.status)
+
+    def test_rollup_only_counts_the_users_company(self):
+        response = self.client.get(f'/api/assets/{self.rack.pk}/rollup/').json()
+
+        self.assertEqual([child['asset_tag'] for child in response['children']], ['OWN'])
+        self.assertEqual(response['contents_count'], 1)
+        self.assertEqual(float(response['total_cost']), 1100)
+
+    def test_related_rows_of_other_companies_are_rejected(self):
+        beta_site = Site.objects.create(company=self.beta, name='HQ')
+        beta_user = get_user_model().objects.create_user('beta-user', company=self.beta)
+        url = f'/api/assets/{self.own.pk}/'
+
+        for field, value in (('parent', self.foreign.pk), ('site', beta_site.pk), ('assigned_to_id', beta_user.pk)):
+            with self.subTest(field=field):
+                response = self.client.patch(url, {field: value}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('does not exist', response.json()[field][0])
+
+        response = self.client.patch(url, {'company': self.beta.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Asset.objects.get(pk=self.own.pk).company, self.acme)
+
+    def tags(self, response):
+        data = response.json()
+        return sorted(row['asset_tag'] for row in data.get('results', data) if isinstance(row, dict))
+
+    def test_list_actions_only_show_the_users_company(self):
+        today = date.today()
+        Asset.objects.update(purchase_date=today.replace(year=today.year - 1) + timedelta(days=10), warranty_months=12)
+
+        self.assertEqual(self.tags(self.client.get('/api/assets/warranty_expiring/')), ['OWN', 'RACK'])
+        self.assertEqual(self.tags(self.client.get('/api/assets/needs_audit/')), ['OWN', 'RACK'])
+        self.assertEqual(self.tags(self.client.get(f'/api/assets/{self.rack.pk}/contents/')), ['OWN'])
+        self.assertEqual(self.client.get(f'/api/assets/{self.foreign.pk}/ancestors/').status_code, 404)
+
+    def test_detail_actions_on_another_companys_asset_are_not_found(self):
+        for method, url in (
+            ('post', f'/api/assets/{self.foreign.pk}/audited/'),
+            ('get', f'/api/assets/{self.foreign.pk}/contents/'),
+            ('get', f'/api/assets/{self.foreign.pk}/rollup/'),
+            ('post', f'/api/assets/{self.foreign.pk}/cascade-status/'),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(getattr(self.client, method)(url, {}, format='json').status_code, 404)
+        self.assertIsNone(Asset.objects.get(pk=self.foreign.pk).last_audit)
+
+    def test_bulk_update_cannot_reach_another_company(self):
+        response = self.client.patch(
+            '/api/assets/bulk/', [{'id': self.foreign.pk, 'notes': 'mine now'}], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Asset.objects.get(pk=self.foreign.pk).notes, '')
+
+    def test_maintenance_records_are_scoped(self):
+        theirs = MaintenanceRecord.objects.create(
+            asset=self.foreign, title='Fan', description='Noisy', scheduled_date=date(2025, 1, 1),
+        )
+        ours = MaintenanceRecord.objects.create(
+            asset=self.own, title='Fan', description='Noisy', scheduled_date=date(2025, 1, 1),
+        )
+
+        rows = self.client.get('/api/maintenance-records/').json()['results']
+        self.assertEqual([row['id'] for row in rows], [ours.pk])
+        self.assertEqual(self.client.get(f'/api/maintenance-records/{theirs.pk}/').status_code, 404)
+        response = self.client.post('/api/maintenance-records/', {
+            'asset_id': self.foreign.pk, 'title': 'Sneaky', 'description': '-', 'scheduled_date': '2025-02-01',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_audit_plan_is_scoped(self):
+        plan_audits()
+        entries = self.client.get('/api/audit-plan/').json()['results']
+        self.assertEqual(sorted(entry['asset_tag'] for entry in entries), ['OWN', 'RACK'])
+        self.assertIn(APIClient().get('/api/audit-plan/mine/').status_code, (401, 403))
+
+
+class ResolveSiteTests(AssetFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Company.objects.create(name='Acme')
+        self.labs = Company.objects.create(name='Beta - Labs')
+        self.acme_hq = Site.objects.create(company=self.acme, name='HQ')
+        self.labs_hq = Site.objects.create(company=self.labs, name='HQ')
+
+    def test_company_and_site_form(self):
+        self.assertEqual(resolve_site('acme  -  hq'), self.acme_hq)
+        self.assertEqual(resolve_site('Beta - Labs - HQ'), self.labs_hq)
+        self.assertIsNone(resolve_site('Nowhere - HQ'))
+
+    def test_shared_name_needs_the_company(self):
+        self.assertIsNone(resolve_site('HQ'))
+        self.assertEqual(resolve_site('hq', self.labs.pk), self.labs_hq)
+
+    def test_migration_links_sites_from_locations(self):
+        link_sites = import_module('assets.migrations.0011_asset_site').link_sites
+        labs_user = get_user_model().objects.create_user('labs-user', company=self.labs)
+        assets = [
+            self.asset('A1', location='Acme - HQ'),
+            self.asset('A2', location=' hq ', assigned_to=labs_user),
+            self.asset('A3', location='HQ'),
+            self.asset('A4', location='Basement'),
+        ]
+        Asset.objects.update(site=None)
+
+        link_sites(apps, None)
+
+        self.assertEqual(
+            list(Asset.objects.filter(pk__in=[asset.pk for asset in assets]).order_by('asset_tag').values_list(
+                'site_id', flat=True
+            )),
+            [self.acme_hq.pk, self.labs_hq.pk, None, None],
+        )
+
+
+class DuplicateDetectionTests(AssetFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Company.objects.create(name='Acme')
+        self.beta = Company.objects.create(name='Beta')
+
+    def pair(self, left, right):
+        return find_duplicates().get((min(left.pk, right.pk), max(left.pk, right.pk)))
+
+    def test_exact_and_mistyped_serials(self):
+        original = self.asset('A1', serial_number='ABCDEF-12345', company=self.acme)
+        copy = self.asset('A2', serial_number='abcdef12345', company=self.acme)
+        typo = self.asset('A3', serial_number='ABCDEE12345', company=self.acme)
+
+        self.assertEqual(self.pair(original, copy), (1.0, 'serial'))
+        self.assertEqual(self.pair(original, typo)[1], 'fuzzy-serial')
+
+    def test_consecutive_serials_are_not_duplicates(self):
+        first = self.asset('A1', serial_number='ABCDEF12345', company=self.acme)
+        second = self.asset('A2', serial_number='ABCDEF12346', company=self.acme)
+        self.assertIsNone(self.pair(first, second))
+
+    def test_pairs_never_cross_companies(self):
+        ours = self.asset('A1', serial_number='ABCDEF12345', mac_address='00:11:22:33:44:55', company=self.acme)
+        theirs = self.asset('B1', serial_number='ABCDEF12345', mac_address='00:11:22:33:44:55', company=self.beta)
+        self.assertEqual(find_duplicates(), {})
+        self.assertIsNone(self.pair(ours, theirs))
+
+    def test_oversized_exact_block_is_still_compared(self):
+        assets = [
+            self.asset(f'A{index}', serial_number='SAMESERIAL01', company=self.acme)
+            for index in range(MAX_BLOCK_SIZE + 10)
+        ]
+        pairs = find_duplicates()
+        for other in assets[1:]:
+            self.assertEqual(pairs[assets[0].pk, other.pk][1], 'serial')
+
+
+class DuplicateMergeTests(AssetFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Company.objects.create(name='Acme')
+        self.beta = Company.objects.create(name='Beta')
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('acme-user', company=self.acme))
+
+    def candidate(self, company, duplicate_company, **fields):
+        asset = self.asset(f'K{DuplicateCandidate.objects.count()}', serial_number='SN123456', company=company)
+        duplicate = self.asset(
+            f'D{DuplicateCandidate.objects.count()}', serial_number='SN123456', company=duplicate_company
+        )
+        MaintenanceRecord.objects.create(
+            asset=duplicate, title='Battery', description='Replaced', scheduled_date=date(2025, 1, 1),
+        )
+        return DuplicateCandidate.objects.create(asset=asset, duplicate=duplicate, score=1.0, reasons='serial', **fields)
+
+    def test_merge_moves_the_history_onto_the_kept_asset(self):
+        candidate = self.candidate(self.acme, self.acme)
+
+        response = self.client.post(f'/api/duplicate-candidates/{candidate.pk}/merge/')
+
+        self.assertEqual(response.json()['maintenance_records_moved'], 1)
+        self.assertFalse(Asset.objects.filter(pk=candidate.duplicate_id).exists())
+        self.assertEqual(MaintenanceRecord.objects.get().asset_id, candidate.asset_id)
+
+    def test_pair_reaching_into_another_company_is_not_found(self):
+        candidate = self.candidate(self.acme, self.beta)
+
+        for action in ('merge', 'dismiss'):
+            with self.subTest(action=action):
+                response = self.client.post(f'/api/duplicate-candidates/{candidate.pk}/{action}/')
+                self.assertEqual(response.status_code, 404)
+        self.assertTrue(Asset.objects.filter(pk=candidate.duplicate_id).exists())
+        self.assertEqual(MaintenanceRecord.objects.get().asset_id, candidate.duplicate_id)
+        self.assertEqual(self.client.get('/api/duplicate-candidates/').json()['count'], 0)
+
+    def test_reviewed_pair_cannot_be_merged(self):
+        candidate = self.candidate(self.acme, self.acme, status='dismissed')
+
+        response = self.client.post(f'/api/duplicate-candidates/{candidate.pk}/merge/')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(Asset.objects.filter(pk=candidate.duplicate_id).exists())
+
+
+class SubnetFilterTests(AssetFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        company = Company.objects.create(name='Acme')
+        for tag, ip_address in (
+            ('FIRST', '10.0.0.0'), ('LAST', '10.0.0.255'), ('NEXT', '10.0.1.0'),
+            ('BEFORE', '9.255.255.255'), ('V6', '2001:db8::1'), ('NONE', None),
+        ):
+            self.asset(tag, company=company, ip_address=ip_address)
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('acme-user', company=company))
+
+    def tags(self, ip_in):
+        response = self.client.get('/api/assets/', {'ip_in': ip_in})
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(row['asset_tag'] for row in response.json()['results'])
+
+    def test_cidr_blocks_include_both_ends(self):
+        self.assertEqual(self.tags('10.0.0.0/24'), ['FIRST', 'LAST'])
+        self.assertEqual(self.tags('10.0.0.7/24'), ['FIRST', 'LAST'])
+        self.assertEqual(self.tags('10.0.0.0/23'), ['FIRST', 'LAST', 'NEXT'])
+        self.assertEqual(self.tags('10.0.0.255/32'), ['LAST'])
+
+    def test_ranges_addresses_and_ipv6(self):
+        self.assertEqual(self.tags('10.0.1.0-9.255.255.255'), ['BEFORE', 'FIRST', 'LAST', 'NEXT'])
+        self.assertEqual(self.tags('10.0.1.0, 2001:db8::/32'), ['NEXT', 'V6'])
+        # IPv4 is stored IPv4-mapped, so mapped blocks find it too
+        self.assertEqual(self.tags('::ffff:10.0.0.0/120'), ['FIRST', 'LAST'])
+
+    def test_bad_terms_are_rejected(self):
+        for ip_in in ('10.0.0.0/33', '10.0.0.1-2001:db8::1', 'printer'):
+            self.assertEqual(self.client.get('/api/assets/', {'ip_in': ip_in}).status_code, 400)
+
+    def test_ip_key_follows_queryset_updates(self):
+        Asset.objects.filter(asset_tag='NONE').update(ip_address='10.0.0.42')
+        self.assertEqual(self.tags('10.0.0.0/24'), ['FIRST', 'LAST', 'NONE'])
+
+
+class ListActionTests(AssetFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        company = Company.objects.create(name='Acme')
+        # Warranties ending in about two weeks, never audited
+        purchased = date.today() - timedelta(days=350)
+        for number in range(25):
+            self.asset(f'A{number:02d}', company=company, purchase_date=purchased, warranty_months=12)
+        self.asset('AUDITED', company=company, last_audit=date.today())
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('acme-user', company=company))
+
+    def test_list_actions_are_paginated(self):
+        page = self.client.get('/api/assets/needs_audit/').json()
+        self.assertEqual((page['count'], len(page['results'])), (25, 20))
+        self.assertIn('page=2', page['next'])
+        self.assertEqual(len(self.client.get(page['next']).json()['results']), 5)
+
+        page = self.client.get('/api/assets/warranty_expiring/', {'asset_tag': 'A03'}).json()
+        self.assertEqual([row['asset_tag'] for row in page['results']], ['A03'])
+
+    def test_streamed_list_actions_return_every_row_in_chunks(self):
+        with mock.patch.object(AssetViewSet, 'stream_chunk_size', 10):
+            response = self.client.get('/api/assets/warranty_expiring/', {'stream': 'true'})
+            chunks = list(response.streaming_content)
+
+        self.assertEqual(response['Content-Type'], 'application/json')
+        # '[', three chunks of rows, ']'
+        self.assertEqual(len(chunks), 5)
+        rows = json.loads(b''.join(chunks))
+        self.assertEqual([row['asset_tag'] for row in rows], [f'A{number:02d}' for number in range(25)])
+        self.assertEqual(rows[0]['model']['name'], 'Latitude')
+
+    def test_streaming_nothing_is_an_empty_array(self):
+        response = self.client.get('/api/assets/needs_audit/', {'stream': 'true', 'asset_tag': 'AUDITED'})
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+
+class PartialWriteTests(AssetFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        company = Company.objects.create(name='Acme')
+        self.laptop = self.asset('A1', company=company, serial_number='SN1', notes='', mac_address='00:1a:2b:3c:4d:5e')
+        self.url = f'/api/assets/{self.laptop.pk}/'
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('acme-user', company=company))
+        OutboxEvent.objects.all().delete()
+
+    def patch(self, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+
+    def test_unchanged_payload_is_not_written(self):
+        updates = self.patch({'serial_number': 'SN1', 'status_id': self.status.pk, 'model_id': self.model.pk})
+
+        self.assertEqual(updates, [])
+        self.assertFalse(OutboxEvent.objects.exists())
+        stored = Asset.objects.get(pk=self.laptop.pk)
+        self.assertEqual((stored.updated_at, stored.version), (self.laptop.updated_at, self.laptop.version))
+
+    def test_only_changed_columns_are_written(self):
+        updates = self.patch({'serial_number': 'SN1', 'notes': 'Dented lid'})
+
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"notes"', updates[0])
+        self.assertNotIn('"serial_number"', updates[0])
+        event = OutboxEvent.objects.get()
+        self.assertEqual(set(event.payload), {'notes', 'updated_at', 'version'})
+
+    def test_derived_columns_follow_their_source(self):
+        updates = self.patch({'mac_address': '00-1A-2B-3C-4D-99'})
+
+        self.assertIn('"mac_normalized"', updates[0])
+        self.assertEqual(Asset.objects.get(pk=self.laptop.pk).mac_normalized, '001a2b3c4d99')
+
+
+class ConcurrencyTests(AssetFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        company = Company.objects.create(name='Acme')
+        self.laptop = self.asset('A1', company=company)
+        self.desktop = self.asset('A2', company=company)
+        self.url = f'/api/assets/{self.laptop.pk}/'
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('acme-user', company=company))
+
+    def test_detail_responses_carry_the_version_as_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['ETag'], '"1"')
+
+        response = self.client.patch(self.url, {'notes': 'Dented', 'version': 1}, format='json')
+        self.assertEqual((response.status_code, response['ETag'], response.json()['version']), (200, '"2"', 2))
+
+    def test_stale_version_answers_409_with_the_current_state(self):
+        self.client.patch(self.url, {'notes': 'First', 'version': 1}, format='json')
+
+        response = self.client.patch(self.url, {'notes': 'Second', 'version': 1}, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            (response.json()['current']['notes'], response.json()['current']['version']), ('First', 2)
+        )
+        self.assertEqual(Asset.objects.get(pk=self.laptop.pk).notes, 'First')
+
+    def test_if_match_header_is_the_expected_version(self):
+        stale = self.client.patch(self.url, {'notes': 'Late'}, format='json', HTTP_IF_MATCH='"7"')
+        self.assertEqual(stale.status_code, 409)
+
+        fresh = self.client.patch(self.url, {'notes': 'On time'}, format='json', HTTP_IF_MATCH='W/"1"')
+        self.assertEqual(fresh.status_code, 200)
+
+    def test_queryset_updates_make_open_edits_stale(self):
+        Asset.objects.filter(pk=self.laptop.pk).update(notes='Changed in bulk')
+
+        self.laptop.notes = 'Edited in a form'
+        with self.assertRaises(VersionConflict):
+            self.laptop.save()
+
+    def test_bulk_update_is_all_or_nothing(self):
+        Asset.objects.filter(pk=self.desktop.pk).update(notes='Moved')
+
+        response = self.client.patch('/api/assets/bulk/', [
+            {'id': self.laptop.pk, 'version': 1, 'notes': 'A'},
+            {'id': self.desktop.pk, 'version': 1, 'notes': 'B'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([asset['asset_tag'] for asset in response.json()['conflicts']], ['A2'])
+        self.assertEqual(Asset.objects.get(pk=self.laptop.pk).notes, '')
+
+
+class ArchiveTests(AssetFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Company.objects.create(name='Acme')
+        retired = AssetStatus.objects.create(name='Retired', is_active=False)
+        self.old = self.asset('OLD', company=self.acme, status=retired)
+        self.busy = self.asset('BUSY', company=self.acme, status=retired)
+        self.box = self.asset('BOX', company=self.acme, status=retired)
+        self.asset('INSIDE', self.box, company=self.acme)
+        self.live = self.asset('LIVE', company=self.acme)
+        self.foreign = self.asset('FOREIGN', company=Company.objects.create(name='Beta'), status=retired)
+        self.record(self.old, 'completed', date(2025, 1, 5))
+        self.record(self.busy, 'open', None)
+        self.history = self.record(self.live, 'completed', date(2020, 1, 5))
+        self.recent = self.record(self.live, 'completed', date.today())
+        long_ago = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+        Asset._base_manager.update(updated_at=long_ago)
+        MaintenanceRecord._base_manager.update(updated_at=long_ago)
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('acme-user', company=self.acme))
+
+    def record(self, asset, status, completed):
+        return MaintenanceRecord.objects.create(
+            asset=asset, title='Check', description='Routine', scheduled_date=date(2020, 1, 1),
+            completed_date=completed, status=status,
+        )
+
+    def test_retired_assets_move_with_their_history(self):
+        self.assertEqual(archive_cold_data(dry_run=True), {'assets': 2, 'maintenance_records': 2})
+        self.assertEqual(archive_cold_data(), {'assets': 2, 'maintenance_records': 2})
+
+        self.assertEqual(sorted(ArchivedAsset.objects.values_list('asset_tag', flat=True)), ['FOREIGN', 'OLD'])
+        self.assertFalse(Asset.objects.filter(asset_tag__in=['OLD', 'FOREIGN']).exists())
+        self.assertEqual(
+            set(MaintenanceRecord.objects.values_list('asset__asset_tag', flat=True)), {'BUSY', 'LIVE'}
+        )
+        self.assertTrue(MaintenanceRecord.objects.filter(pk=self.recent.pk).exists())
+        self.assertFalse(MaintenanceRecord.objects.filter(pk=self.history.pk).exists())
+        self.assertEqual(OutboxEvent.objects.filter(event_type='archived', aggregate='asset').count(), 2)
+        self.assertEqual(archive_cold_data(), {'assets': 0, 'maintenance_records': 0})
+
+    def test_archived_rows_are_read_only_on_request(self):
+        archive_cold_data()
+        url = f'/api/assets/{self.old.pk}/'
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+        archived = self.client.get(url, {'include_archived': 'true'}).json()
+        self.assertEqual((archived['asset_tag'], archived['archived']), ('OLD', True))
+        self.assertEqual(
+            self.client.get(f'/api/assets/{self.foreign.pk}/', {'include_archived': 'true'}).status_code, 404
+        )
+
+        hot = [row['asset_tag'] for row in self.client.get('/api/assets/').json()['results']]
+        self.assertNotIn('OLD', hot)
+        rows = self.client.get('/api/assets/', {'include_archived': 'true'}).json()
+        self.assertEqual(rows['count'], len(hot) + 1)
+        self.assertEqual(rows['results'][-1]['asset_tag'], 'OLD')
+        filtered = self.client.get('/api/assets/', {'include_archived': 'true', 'asset_tag': 'OLD'}).json()
+        self.assertEqual([row['asset_tag'] for row in filtered['results']], ['OLD'])
+        unsupported = self.client.get('/api/assets/', {'include_archived': 'true', 'search': 'x'})
+        self.assertEqual(unsupported.status_code, 400)
+
+        history = self.client.get(
+            '/api/maintenance-records/', {'include_archived': 'true', 'asset': self.live.pk}
+        ).json()['results']
+        self.assertEqual([row['id'] for row in history], [self.recent.pk, self.history.pk])
+
+
+class DiscoveryTests(AssetFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Company.objects.create(name='Acme')
+        self.beta = Company.objects.create(name='Beta')
+        self.laptop = self.asset('A1', mac_address='00:1A:2B:3C:4D:5E', ip_address='10.0.0.1', company=self.acme)
+        self.printer = self.asset('B1', mac_address='00-1a-2b-3c-4d-99', ip_address='10.0.0.9', company=self.beta)
+
+    def test_parse_formats(self):
+        self.assertEqual(
+            list(parse_scan('MAC,IP,Seen\n001a.2b3c.4d5e,10.0.0.2,2025-01-01T10:00:00Z\n', 'csv')),
+            [('001a.2b3c.4d5e', '10.0.0.2', '2025-01-01T10:00:00Z')],
+        )
+        self.assertEqual(
+            list(parse_scan('1735725600 00:1a:2b:3c:4d:5e 10.0.0.2 laptop *\nbroken\n', 'dnsmasq')),
+            [('00:1a:2b:3c:4d:5e', '10.0.0.2', None)],
+        )
+        arp = (
+            'IP address       HW type     Flags       HW address            Mask     Device\n'
+            '10.0.0.2         0x1         0x2         00:1a:2b:3c:4d:5e     *        eth0\n'
+            '? (10.0.0.3) at 0:1a:2b:3c:4d:99 on en0 ifscope [ethernet]\n'
+        )
+        self.assertEqual(
+            [ip for _, ip, _ in parse_scan(arp, 'arp')], ['10.0.0.2', '10.0.0.3']
+        )
+        with self.assertRaises(ValueError):
+            list(parse_scan('', 'xml'))
+
+    def test_ingest_matches_any_mac_spelling_and_keeps_the_newest_sighting(self):
+        result = ingest_scan([
+            ('001A2B3C4D5E', '10.0.0.5', '2025-01-01T10:00:00Z'),
+            ('00:1a:2b:3c:4d:5e', '10.0.0.6', '2025-01-02T10:00:00Z'),
+            ('not-a-mac', '10.0.0.7', None),
+            ('00:00:00:00:00:00', '10.0.0.8', None),
+            ('aa:bb:cc:dd:ee:ff', '10.0.0.9', None),
+        ])
+
+        self.assertEqual(
+            {key: result[key] for key in ('devices', 'invalid', 'matched', 'ip_changed', 'unknown_count')},
+            {'devices': 2, 'invalid': 2, 'matched': 1, 'ip_changed': 1, 'unknown_count': 1},
+        )
+        self.assertEqual(result['unknown'][0]['mac'], 'aa:bb:cc:dd:ee:ff')
+        laptop = Asset.objects.get(pk=self.laptop.pk)
+        self.assertEqual(laptop.ip_address, '10.0.0.6')
+        self.assertEqual(laptop.last_seen, datetime(2025, 1, 2, 10, tzinfo=dt_timezone.utc))
+
+    def test_unchanged_ip_only_records_the_sighting(self):
+        result = ingest_scan([('00:1a:2b:3c:4d:5e', '10.0.0.1', '2025-01-01T10:00:00Z')])
+
+        self.assertEqual((result['ip_changed'], result['seen_only']), (0, 1))
+        self.assertIsNotNone(Asset.objects.get(pk=self.laptop.pk).last_seen)
+
+    def test_api_needs_a_login_and_only_touches_the_users_company(self):
+        entries = {'entries': [
+            {'mac': '00:1a:2b:3c:4d:5e', 'ip': '10.66.66.1'},
+            {'mac': '00:1a:2b:3c:4d:99', 'ip': '10.66.66.66'},
+        ]}
+        self.assertIn(APIClient().post('/api/assets/discovery/', entries, format='json').status_code, (401, 403))
+
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user('acme-user', company=self.acme))
+        result = client.post('/api/assets/discovery/', entries, format='json').json()
+
+        self.assertEqual((result['matched'], result['ip_changed'], result['unknown_count']), (1, 1, 1))
+        self.assertEqual(Asset.objects.get(pk=self.laptop.pk).ip_address, '10.66.66.1')
+        self.assertEqual(Asset.objects.get(pk=self.printer.pk).ip_address, '10.0.0.9')
+
+
+class AuditPlanningTests(AssetFixtureMixin, TestCase):
+    # A Wednesday; assets audited on LAST_AUDIT are due next week, so their
+    # window is this week and next
+    TODAY = date(2026, 10, 21)
+    LAST_AUDIT = TODAY + timedelta(days=7 - AUDIT_CYCLE_DAYS)
+
+    def setUp(self):
+        super().setUp()
+        self.acme = Company.objects.create(name='Acme')
+        self.beta = Company.objects.create(name='Beta')
+        self.ann = self.auditor('ann', self.acme)
+        self.bob = self.auditor('bob', self.acme)
+
+    def auditor(self, username, company, capacity=2):
+        user = get_user_model().objects.create_user(username, company=company)
+        AuditorCapacity.objects.create(auditor=user, weekly_capacity=capacity)
+        return user
+
+    def assets(self, count, location='', company=None, last_audit=LAST_AUDIT):
+        return [
+            self.asset(
+                f'{company.name if company else "X"}-{location or "none"}-{index}',
+                location=location, company=company or self.acme, last_audit=last_audit,
+            )
+            for index in range(count)
+        ]
+
+    def per_auditor(self, **filters):
+        return Counter(AuditPlanEntry.objects.filter(**filters).values_list('auditor__username', flat=True))
+
+    def test_location_sticks_to_its_auditor_until_they_are_full(self):
+        self.assets(6, 'HQ')
+
+        plan_audits(self.TODAY)
+
+        self.assertEqual(sorted(self.per_auditor().values()), [2, 4])
+        weeks = {week_start(self.TODAY), week_start(self.TODAY) + timedelta(weeks=1)}
+        self.assertEqual(set(AuditPlanEntry.objects.values_list('week', flat=True)), weeks)
+
+    def test_assets_without_a_location_are_spread_over_the_auditors(self):
+        self.assets(8)
+
+        plan_audits(self.TODAY)
+
+        self.assertEqual(self.per_auditor(), {'ann': 4, 'bob': 4})
+
+    def test_companies_are_planned_with_their_own_auditors(self):
+        cat = self.auditor('cat', self.beta)
+        self.assets(4, 'HQ', company=self.beta)
+        self.assets(4, 'HQ')
+
+        plan_audits(self.TODAY)
+
+        self.assertEqual(self.per_auditor(asset__company=self.beta), {'cat': 4})
+        self.assertLessEqual(set(self.per_auditor(asset__company=self.acme)), {'ann', 'bob'})
+        self.assertFalse(AuditPlanEntry.objects.filter(asset__company=self.acme, auditor=cat).exists())
+
+    def test_replanned_asset_leaves_a_full_auditor(self):
+        self.assets(4, 'HQ')
+        plan_audits(self.TODAY)
+        sticky = AuditPlanEntry.objects.values_list('auditor', flat=True).first()
+        audited = self.asset('LATE', location='HQ', company=self.acme, last_audit=self.LAST_AUDIT)
+
+        entry = replan_asset(audited, self.TODAY)
+
+        self.assertEqual(self.per_auditor()[entry.auditor.username], 1)
+        self.assertNotEqual(entry.auditor_id, sticky)
+
+    def test_zero_capacity_auditors_are_skipped(self):
+        AuditorCapacity.objects.filter(auditor=self.bob).update(weekly_capacity=0)
+        self.assets(3)
+
+        plan_audits(self.TODAY)
+
+        self.assertEqual(self.per_auditor(), {'ann': 3})
+
+    def test_workload_needs_a_login_and_is_scoped(self):
+        self.auditor('cat', self.beta)
+        self.assets(2, 'HQ', company=self.beta)
+        self.assets(2, 'HQ')
+        plan_audits()
+        url = '/api/audit-plan/workload/?weeks=20'
+        self.assertIn(APIClient().get(url).status_code, (401, 403))
+
+        client = APIClient()
+        client.force_authenticate(self.ann)
+        rows = client.get(url).json()
 
-# Create your tests here.
+        self.assertEqual(sum(row['audits'] for row in rows), 2)
+        self.assertTrue({row['auditor_id'] for row in rows} <= {self.ann.pk, self.bob.pk})
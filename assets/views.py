@@ -3,18 +3,65 @@ from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import (
     AssetCategory, Manufacturer, AssetModel,
-    AssetStatus, Asset, MaintenanceRecord
+    AssetStatus, Asset, AssetClosure, MaintenanceRecord, DuplicateCandidate, AuditPlanEntry,
+    ArchivedAsset, ArchivedMaintenanceRecord
 )
 from .serializers import (
     AssetCategorySerializer, ManufacturerSerializer,
     AssetModelSerializer, AssetStatusSerializer,
-    AssetSerializer, MaintenanceRecordSerializer
+    AssetSerializer, MaintenanceRecordSerializer,
+    DuplicateCandidateSerializer, AssetMergeSerializer,
+    AssetChangeSerializer, MaintenanceRecordChangeSerializer, ChangeFeedParamsSerializer,
+    AuditPlanEntrySerializer, AuditRecordSerializer, AuditWeekParamsSerializer,
+    AssetBulkUpdateSerializer, CascadeStatusSerializer
 )
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status as http_status
+from .audits import replan_asset, week_start, workload
+from .dedup import merge_assets
+from .discovery import SCAN_FORMATS, ingest_scan, parse_scan
+from .filters import AssetFilter, MaintenanceRecordFilter
+from core.archive import ArchiveReadMixin
+from core.columnar import Column, ColumnarListMixin
+from core.concurrency import VersionConflict, VersionedUpdateMixin
+from core.feed import change_feed
+from core.scoping import CompanyScopedMixin, company_scope
+from core.streaming import StreamingListMixin
 from datetime import date, timedelta
+from django.db import transaction
 from django.db.models import Q
 
+BULK_UPDATE_LIMIT = 500
+
+class ChangeFeedMixin:
+    """
+    Adds a `changes` action: rows updated and deleted since a cursor. For
+    viewsets that also mix in CompanyScopedMixin.
+    """
+    change_serializer_class = None
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Rows changed since `updated_since` plus tombstones for deleted ids"""
+        params = ChangeFeedParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        model = self.change_serializer_class.Meta.model
+        rows, deleted, next_cursor, has_more = change_feed(
+            self.scope(model.objects.all()),
+            model.outbox_aggregate,
+            params.validated_data.get('updated_since'),
+            params.validated_data['limit'],
+            company_scope(request.user),
+        )
+        return Response({
+            'results': self.change_serializer_class(rows, many=True).data,
+            'deleted': deleted,
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+        })
+
 class AssetCategoryViewSet(viewsets.ModelViewSet):
     queryset = AssetCategory.objects.all()
     serializer_class = AssetCategorySerializer
@@ -38,72 +85,348 @@ class AssetStatusViewSet(viewsets.ModelViewSet):
     queryset = AssetStatus.objects.all()
     serializer_class = AssetStatusSerializer
 
-class AssetViewSet(viewsets.ModelViewSet):
+class AssetViewSet(
+    CompanyScopedMixin, VersionedUpdateMixin, ColumnarListMixin, ArchiveReadMixin, ChangeFeedMixin,
+    StreamingListMixin, viewsets.ModelViewSet
+):
     queryset = Asset.objects.select_related(
-        'model', 'status', 'assigned_to', 'model__manufacturer'
+        'model', 'status', 'assigned_to', 'model__manufacturer', 'model__category'
     ).all()
     serializer_class = AssetSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = {
-        'status': ['exact'],
-        'model': ['exact'],
-        'model__manufacturer': ['exact'],
-        'model__category': ['exact'],
-        'assigned_to': ['exact', 'isnull'],
-        'purchase_date': ['gte', 'lte'],
+    archive_model = ArchivedAsset
+    archive_filters = {
+        'asset_tag': 'asset_tag',
+        'serial_number': 'serial_number',
+        'status': 'status_id',
+        'site': 'site_id',
+        'company': 'company_id',
     }
+    change_serializer_class = AssetChangeSerializer
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_class = AssetFilter
     search_fields = ['asset_tag', 'serial_number', 'notes']
-    ordering_fields = ['asset_tag', 'purchase_date', 'purchase_cost']
+    ordering_fields = ['asset_tag', 'purchase_date', 'purchase_cost', 'ip_key']
     ordering = ['asset_tag']
+    columnar_columns = [
+        Column('id', 'int'),
+        Column('asset_tag', 'str'),
+        Column('serial_number', 'str'),
+        Column('model_id', 'int'),
+        Column('model', 'dict', 'model__name'),
+        Column('manufacturer', 'dict', 'model__manufacturer__name'),
+        Column('category', 'dict', 'model__category__name'),
+        Column('status_id', 'int'),
+        Column('status', 'dict', 'status__name'),
+        Column('assigned_to_id', 'int'),
+        Column('assigned_to', 'dict', 'assigned_to__username'),
+        Column('location', 'dict'),
+        Column('site_id', 'int'),
+        Column('company_id', 'int'),
+        Column('parent_id', 'int'),
+        Column('purchase_date', 'date'),
+        Column('purchase_cost', 'decimal'),
+        Column('warranty_months', 'int'),
+        Column('depreciation_rate', 'decimal'),
+        Column('residual_value', 'decimal'),
+        Column('ip_address', 'str'),
+        Column('mac_address', 'str'),
+        Column('last_seen', 'datetime'),
+        Column('last_audit', 'date'),
+        Column('notes', 'str'),
+        Column('created_at', 'datetime'),
+        Column('updated_at', 'datetime'),
+    ]
 
     @action(detail=False, methods=['get'])
     def warranty_expiring(self, request):
         """Assets with warranty expiring in the next 30 days"""
-        threshold = date.today() + timedelta(days=30)
-        assets = self.get_queryset().filter(
-            warranty_expiry__gte=date.today(),
-            warranty_expiry__lte=threshold
+        today = date.today()
+        assets = self.filter_queryset(self.get_queryset()).warranty_expiring(
+            today, today + timedelta(days=30)
         )
-        serializer = self.get_serializer(assets, many=True)
-        return Response(serializer.data)
+        return self.list_response(assets)
 
     @action(detail=False, methods=['get'])
     def needs_audit(self, request):
         """Assets not audited in the last 6 months"""
         threshold = date.today() - timedelta(days=180)
-        assets = self.get_queryset().filter(
+        assets = self.filter_queryset(self.get_queryset()).filter(
             Q(last_audit__isnull=True) | Q(last_audit__lt=threshold)
         )
-        serializer = self.get_serializer(assets, many=True)
-        return Response(serializer.data)
+        return self.list_response(assets)
+
+    @action(detail=True, methods=['post'])
+    def audited(self, request, pk=None):
+        """Record an audit and move the asset's next audit in the plan"""
+        asset = self.get_object()
+        params = AuditRecordSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        asset.last_audit = params.validated_data.get('audited_on', date.today())
+        try:
+            with transaction.atomic():
+                asset.save(update_fields=['last_audit', 'updated_at'])
+        except VersionConflict as conflict:
+            return self.conflict_response(conflict)
+        entry = replan_asset(asset)
+        return Response({
+            'last_audit': asset.last_audit,
+            'next_audit': AuditPlanEntrySerializer(entry).data if entry else None,
+        })
+
+    @action(detail=True, methods=['get'])
+    def contents(self, request, pk=None):
+        """Assets installed in this one, at any depth"""
+        asset = self.get_object()
+        return self.list_response(self.filter_queryset(self.get_queryset()).subtree(asset))
+
+    @action(detail=True, methods=['get'])
+    def ancestors(self, request, pk=None):
+        """The assets this one sits in, outermost first"""
+        asset = self.get_object()
+        return Response(self.get_serializer(self.get_queryset().ancestors(asset), many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def rollup(self, request, pk=None):
+        """Content count and total purchase cost of this asset and of each direct child"""
+        asset = self.get_object()
+        children = list(self.scope(asset.children.order_by('asset_tag')).values_list('pk', 'asset_tag'))
+        totals = self.scope(AssetClosure.objects.all(), 'descendant__company_id').rollup(
+            [asset.pk] + [pk for pk, _ in children]
+        )
+        return Response({
+            'asset': asset.pk,
+            **totals[asset.pk],
+            'children': [{'asset': pk, 'asset_tag': tag, **totals[pk]} for pk, tag in children],
+        })
+
+    @action(detail=True, methods=['post'], url_path='cascade-status')
+    def cascade_status(self, request, pk=None):
+        """Set the status of this asset and everything of your company inside it with one UPDATE"""
+        asset = self.get_object()
+        params = CascadeStatusSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        updated = self.scope(Asset.objects.subtree(asset, include_self=True)).update(
+            status=params.validated_data['status']
+        )
+        return Response({'updated': updated})
+
+    @action(detail=False, methods=['patch'], url_path='bulk')
+    def bulk_update(self, request):
+        """
+        Partial updates for many assets, each a dict with `id` and ideally
+        `version`. Applied all or nothing: any conflict answers 409 with the
+        current state of every conflicting asset.
+        """
+        if not isinstance(request.data, list) or len(request.data) > BULK_UPDATE_LIMIT:
+            return Response(
+                {'detail': f'Expected a list of at most {BULK_UPDATE_LIMIT} objects'},
+                status=http_status.HTTP_400_BAD_REQUEST
+            )
+        items = AssetBulkUpdateSerializer(data=request.data, many=True)
+        items.is_valid(raise_exception=True)
+        ids = [item['id'] for item in items.validated_data]
+        if len(set(ids)) != len(ids):
+            return Response({'id': 'Each asset may appear only once'}, status=http_status.HTTP_400_BAD_REQUEST)
+        assets = self.get_queryset().in_bulk(ids)
+        missing = sorted(set(ids) - set(assets))
+        if missing:
+            return Response({'id': f'Unknown assets: {missing}'}, status=http_status.HTTP_400_BAD_REQUEST)
+
+        updates = [
+            self.get_serializer(assets[item_id], data=data, partial=True)
+            for item_id, data in zip(ids, request.data)
+        ]
+        errors = {item_id: update.errors for item_id, update in zip(ids, updates) if not update.is_valid()}
+        if errors:
+            return Response(errors, status=http_status.HTTP_400_BAD_REQUEST)
 
-class MaintenanceRecordViewSet(viewsets.ModelViewSet):
+        conflicts = []
+        with transaction.atomic():
+            for update in updates:
+                try:
+                    with transaction.atomic():
+                        update.save()
+                except VersionConflict as conflict:
+                    conflicts.append(conflict)
+            if conflicts:
+                transaction.set_rollback(True)
+        if conflicts:
+            return Response(
+                {
+                    'detail': f'{len(conflicts)} assets were changed by someone else; nothing was saved',
+                    'conflicts': self.get_serializer([c.current for c in conflicts], many=True).data,
+                },
+                status=http_status.HTTP_409_CONFLICT
+            )
+        return Response([update.data for update in updates])
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def discovery(self, request):
+        """Ingest a DHCP lease / ARP / network scan export, matched by MAC to assets of your company"""
+        fmt = request.data.get('format', 'json' if 'entries' in request.data else 'csv')
+        if fmt not in SCAN_FORMATS:
+            return Response(
+                {'format': f"Expected one of {', '.join(SCAN_FORMATS)}"},
+                status=http_status.HTTP_400_BAD_REQUEST
+            )
+        if fmt == 'json':
+            data = request.data.get('entries')
+            if not isinstance(data, list):
+                return Response(
+                    {'entries': 'Expected a list of {mac, ip, seen} objects'},
+                    status=http_status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response(
+                    {'file': 'A scan export file is required'},
+                    status=http_status.HTTP_400_BAD_REQUEST
+                )
+            data = upload.read().decode('utf-8', errors='replace')
+        return Response(ingest_scan(parse_scan(data, fmt), queryset=self.scope(Asset.objects.all())))
+
+class MaintenanceRecordViewSet(
+    CompanyScopedMixin, ColumnarListMixin, ArchiveReadMixin, ChangeFeedMixin, viewsets.ModelViewSet
+):
+    queryset = MaintenanceRecord.objects.select_related('asset', 'created_by').all()
     serializer_class = MaintenanceRecordSerializer
+    change_serializer_class = MaintenanceRecordChangeSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = {
-        'asset': ['exact'],
-        'priority': ['exact'],
-        'created_by': ['exact'],
-        'created_at': ['gte', 'lte'],
-        'resolved_at': ['isnull'],
+    filterset_class = MaintenanceRecordFilter
+    archive_model = ArchivedMaintenanceRecord
+    archive_filters = {
+        'asset': 'asset_id',
+        'priority': 'data__priority',
+        'company': 'company_id',
+        'created_by': lambda queryset, value: queryset.filter(data__created_by_id=int(value)),
+        'is_open': lambda queryset, value: queryset.none() if value == 'true' else queryset,
     }
+    archive_ordering = ('-created_at', '-id')
     search_fields = ['title', 'description', 'resolution']
-    ordering_fields = ['created_at', 'resolved_at', 'priority']
+    ordering_fields = ['created_at', 'completed_date', 'priority']
     ordering = ['-created_at']
+    columnar_columns = [
+        Column('id', 'int'),
+        Column('asset_id', 'int'),
+        Column('asset_tag', 'str', 'asset__asset_tag'),
+        Column('maintenance_type', 'dict', 'maintenance_type__name'),
+        Column('title', 'str'),
+        Column('description', 'str'),
+        Column('priority', 'dict'),
+        Column('status', 'dict'),
+        Column('technician', 'dict'),
+        Column('scheduled_date', 'date'),
+        Column('completed_date', 'date'),
+        Column('cost', 'decimal'),
+        Column('resolution', 'str'),
+        Column('created_by_id', 'int'),
+        Column('created_by', 'dict', 'created_by__username'),
+        Column('company_id', 'int'),
+        Column('created_at', 'datetime'),
+        Column('updated_at', 'datetime'),
+    ]
 
     def get_queryset(self):
-        queryset = MaintenanceRecord.objects.select_related(
-            'asset', 'created_by'
-        ).all()
+        queryset = super().get_queryset()
+        # Schema generation (build_api_schema) runs without a request
+        if getattr(self, 'swagger_fake_view', False):
+            return queryset
         
         # Filter for open tickets if requested
         is_open = self.request.query_params.get('is_open', None)
         if is_open == 'true':
-            queryset = queryset.filter(resolved_at__isnull=True)
+            queryset = queryset.exclude(status__in=MaintenanceRecord.CLOSED_STATUSES)
         elif is_open == 'false':
-            queryset = queryset.filter(resolved_at__isnull=False)
+            queryset = queryset.filter(status__in=MaintenanceRecord.CLOSED_STATUSES)
             
         return queryset
 
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
\ No newline at end of file
+        serializer.save(created_by=self.request.user)
+
+class DuplicateCandidateViewSet(CompanyScopedMixin, viewsets.ReadOnlyModelViewSet):
+    """Merge candidates found by the find_duplicate_assets job"""
+    company_field = 'asset__company_id'
+    queryset = DuplicateCandidate.objects.select_related('asset', 'duplicate').all()
+    serializer_class = DuplicateCandidateSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = {
+        'status': ['exact'],
+        'score': ['gte'],
+        'asset': ['exact'],
+    }
+    ordering_fields = ['score', 'detected_at']
+    ordering = ['-score']
+
+    def get_queryset(self):
+        # Both assets of a pair must be in scope (merge deletes one of them)
+        return self.scope(super().get_queryset(), 'duplicate__company_id')
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """Merge the pair, keeping `asset` (default) or `duplicate`"""
+        candidate = self.get_object()
+        params = AssetMergeSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        if candidate.status != 'open':
+            return Response(
+                {'detail': f'The pair is {candidate.status} and cannot be merged'},
+                status=http_status.HTTP_409_CONFLICT
+            )
+        if params.validated_data['keep'] == 'asset':
+            keep, duplicate = candidate.asset, candidate.duplicate
+        else:
+            keep, duplicate = candidate.duplicate, candidate.asset
+        try:
+            moved = merge_assets(keep, [duplicate])
+        except VersionConflict as conflict:
+            return Response(
+                {'detail': str(conflict), 'current': AssetSerializer(conflict.current).data},
+                status=http_status.HTTP_409_CONFLICT
+            )
+        return Response({
+            'kept': keep.pk,
+            'removed': duplicate.pk,
+            'maintenance_records_moved': moved,
+        })
+
+    @action(detail=True, methods=['post'])
+    def dismiss(self, request, pk=None):
+        """Mark the pair as not a duplicate so later runs skip it"""
+        candidate = self.get_object()
+        candidate.status = 'dismissed'
+        candidate.save(update_fields=['status'])
+        return Response(self.get_serializer(candidate).data)
+
+class AuditPlanViewSet(CompanyScopedMixin, viewsets.ReadOnlyModelViewSet):
+    """Planned audits, maintained by the plan_audits job"""
+    company_field = 'asset__company_id'
+    queryset = AuditPlanEntry.objects.select_related('asset', 'auditor').all()
+    serializer_class = AuditPlanEntrySerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = {
+        'auditor': ['exact', 'isnull'],
+        'week': ['exact', 'gte', 'lte'],
+        'location': ['exact'],
+    }
+    ordering_fields = ['week', 'due_date', 'location']
+    ordering = ['week', 'location', 'asset']
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def mine(self, request):
+        """The current user's audits for a week (default: this week)"""
+        params = AuditWeekParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        week = week_start(params.validated_data.get('week') or date.today())
+        entries = self.filter_queryset(self.get_queryset()).filter(auditor=request.user, week=week)
+        page = self.paginate_queryset(entries)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def workload(self, request):
+        """Planned audits of your company per auditor and week"""
+        params = AuditWeekParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        start = week_start(params.validated_data.get('week') or date.today())
+        return Response(workload(self.get_queryset(), start, params.validated_data['weeks']))
@@ -0,0 +1,11 @@
+# The Celery app is created on first use rather than at startup, so web
+# processes and management commands that never queue a task do not import
+# Celery. Task modules bind to it through config.celery.
+__all__ = ('celery_app',)
+
+
+def __getattr__(name):
+    if name == 'celery_app':
+        from .celery import app
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,12 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# System checks run at deploy (manage.py check); repeating them in every
+# worker imports the whole URLconf, every view and DRF for nothing
+os.environ.setdefault('CELERY_SKIP_CHECKS', 'true')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
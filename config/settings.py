@@ -51,12 +51,14 @@ INSTALLED_APPS = [
     'users',
     'maintenance',
     'reports',
+    'notifications',
     'api',
 ]
 
 
 
 MIDDLEWARE = [
+    'core.middleware.SamplingProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -147,5 +149,46 @@ REST_FRAMEWORK = {
 
 # For premium features
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
+CELERY_BEAT_SCHEDULE = {
+    'notification-digests': {
+        'task': 'notifications.tasks.queue_notification_digests',
+        'schedule': 60 * 60 * 24,
+    },
+    'audit-plan': {
+        'task': 'assets.tasks.plan_audits_task',
+        'schedule': 60 * 60,
+    },
+    'archive-cold-data': {
+        'task': 'assets.tasks.archive_cold_data_task',
+        'schedule': 60 * 60 * 24,
+    },
+    'purge-report-jobs': {
+        'task': 'reports.tasks.purge_report_jobs_task',
+        'schedule': 60 * 60,
+    },
+    'close-chargeback-periods': {
+        'task': 'reports.tasks.close_chargeback_periods_task',
+        'schedule': 60 * 60 * 24,
+    },
+}
+
+# Notification digests; see notifications.providers for the provider paths
+NOTIFICATION_CHANNELS = ['email']
+TWILIO_ACCOUNT_SID = ''
+TWILIO_AUTH_TOKEN = ''
+TWILIO_FROM_NUMBER = ''
+
+# Sampling profiler (core.profiling); 0 disables it. Profiles go to PROFILE_DIR,
+# merge them with `manage.py profile_report`
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_COMMAND_SAMPLE_RATE = 0.0
+PROFILE_ENGINE = 'sampler'
+PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Cold start. `manage.py importtime --check` fails when a process type spends
+# longer than this many ms importing; `manage.py build_api_schema` prebuilds
+# the OpenAPI schema (served at api/schema/) at deploy time
+IMPORT_TIME_BUDGETS = {'setup': 500, 'web': 800, 'worker': 700}
+API_SCHEMA_FILE = BASE_DIR / 'api' / 'static' / 'api' / 'openapi.json'
 
 AUTH_USER_MODEL = 'users.User'
\ No newline at end of file
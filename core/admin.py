@@ -1,3 +1,34 @@
 from django.contrib import admin
+from .models import OutboxEvent, Tombstone
 
-# Register your models here.
+# ==================== OutboxEvent Admin ====================
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'aggregate', 'aggregate_id', 'event_type', 'created_at', 'attempts', 'delivered_at', 'dead_at'
+    )
+    list_filter = (
+        'aggregate', 'event_type',
+        ('delivered_at', admin.EmptyFieldListFilter), ('dead_at', admin.EmptyFieldListFilter),
+    )
+    search_fields = ('ordering_key',)
+    readonly_fields = [field.name for field in OutboxEvent._meta.fields]
+    list_per_page = 50
+    actions = ['requeue']
+
+    @admin.action(description='Retry the selected dead events')
+    def requeue(self, request, queryset):
+        count = queryset.filter(dead_at__isnull=False, delivered_at__isnull=True).update(
+            dead_at=None, attempts=0, next_attempt_at=None
+        )
+        self.message_user(request, f'{count} events queued again')
+
+
+# ==================== Tombstone Admin ====================
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('aggregate', 'object_id', 'company_id', 'rehomed', 'deleted_at')
+    list_filter = ('aggregate', 'rehomed')
+    search_fields = ('object_id',)
+    readonly_fields = ('aggregate', 'object_id', 'company_id', 'rehomed', 'deleted_at')
+    list_per_page = 50
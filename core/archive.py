@@ -0,0 +1,130 @@
+# core/archive.py
+"""
+Reading archived rows next to the hot ones.
+
+Archiving (see ``assets.archive``) moves cold rows out of their hot table
+into an ``ArchivedRow`` table, so default managers, filters, reports and
+admin changelists never scan them. Viewsets that mix in
+``ArchiveReadMixin`` read the archive only when asked to with
+``?include_archived=true``:
+
+- ``retrieve`` falls back to the archive when the hot table has no such row;
+- ``list`` pages over the matching hot rows followed by the matching
+  archived ones. The archive only understands the exact filters listed in
+  ``archive_filters``; any other filter is refused rather than ignored.
+
+Archived rows are rendered as the flat column values they had, marked with
+``archived`` and ``archived_at``.
+"""
+from django.http import Http404
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+INCLUDE_ARCHIVED_PARAM = 'include_archived'
+INCLUDE_ARCHIVED_TRUE_VALUES = ('1', 'true', 'yes')
+# Query params that shape the response rather than filter it
+NON_FILTER_PARAMS = ('page', 'page_size', 'format', 'ordering', INCLUDE_ARCHIVED_PARAM)
+
+
+class ChainedResults:
+    """Querysets read one after another, sliceable like one for the paginators"""
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._counts = None
+
+    def counts(self):
+        if self._counts is None:
+            self._counts = [queryset.count() for queryset in self.querysets]
+        return self._counts
+
+    def count(self):
+        return sum(self.counts())
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        for queryset in self.querysets:
+            yield from queryset
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, self.count() if key.stop is None else key.stop
+        items = []
+        offset = 0
+        for queryset, count in zip(self.querysets, self.counts()):
+            low, high = max(start - offset, 0), min(stop - offset, count)
+            if low < high:
+                items.extend(queryset[low:high])
+            offset += count
+        return items
+
+
+class ArchiveReadMixin:
+    """Serves archived rows on ``?include_archived=true`` (see module docstring)"""
+    archive_model = None
+    # {query param: archive lookup or function(queryset, value)} for the filters the archive can answer
+    archive_filters = {}
+    archive_ordering = ('-archived_at', '-id')
+
+    def include_archived(self):
+        value = self.request.query_params.get(INCLUDE_ARCHIVED_PARAM, '')
+        return value.lower() in INCLUDE_ARCHIVED_TRUE_VALUES
+
+    def get_archive_base_queryset(self):
+        """Every archived row the request may see, before any filter"""
+        return self.archive_model.objects.all()
+
+    def get_archive_queryset(self):
+        params = self.request.query_params
+        unsupported = sorted(
+            name for name, value in params.items()
+            if value and name not in NON_FILTER_PARAMS and name not in self.archive_filters
+        )
+        if unsupported:
+            raise ValidationError({
+                INCLUDE_ARCHIVED_PARAM: [
+                    f'Archived rows cannot be filtered by {", ".join(unsupported)}; '
+                    f'supported: {", ".join(self.archive_filters) or "none"}'
+                ]
+            })
+        queryset = self.get_archive_base_queryset().order_by(*self.archive_ordering)
+        for name, lookup in self.archive_filters.items():
+            if params.get(name):
+                if callable(lookup):
+                    queryset = lookup(queryset, params[name])
+                else:
+                    queryset = queryset.filter(**{lookup: params[name]})
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if not self.include_archived():
+            return super().list(request, *args, **kwargs)
+        results = ChainedResults(self.filter_queryset(self.get_queryset()), self.get_archive_queryset())
+        page = self.paginate_queryset(results)
+        data = self.archive_representation(page if page is not None else list(results))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            if not self.include_archived():
+                raise
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        archived = get_object_or_404(self.get_archive_base_queryset(), pk=self.kwargs[lookup_url_kwarg])
+        return Response(archived.as_dict())
+
+    def archive_representation(self, rows):
+        """Hot rows through the serializer (in one go), archived rows as stored"""
+        hot = [row for row in rows if not isinstance(row, self.archive_model)]
+        serialized = iter(self.get_serializer(hot, many=True).data)
+        return [
+            row.as_dict() if isinstance(row, self.archive_model) else next(serialized)
+            for row in rows
+        ]
@@ -0,0 +1,203 @@
+# core/batch.py
+"""
+Batched reads.
+
+``run_batch`` answers several GET requests to list and detail routes of the
+API's model viewsets in one round trip, e.g. everything an asset form
+needs. Each sub-request goes through its viewset's permissions, filters,
+pagination and serializer, so its data is what the route returns on its
+own. Authentication and the middleware run once for the whole batch.
+
+Related objects are not joined per query. The relations a viewset asks
+for with ``select_related`` are loaded by a ``DataLoader`` shared by all
+sub-requests instead: one ``pk__in`` query per model, and objects another
+sub-request already returned (the category list, say) are not fetched
+again.
+"""
+import copy
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.http import Http404, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.generics import GenericAPIView, get_object_or_404
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+BATCH_MAX_REQUESTS = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+BATCH_ACTIONS = ('list', 'retrieve')
+
+
+class DataLoader:
+    """
+    Resolves forward relations for many instances at once: keys are
+    collected per related model and fetched with one ``pk__in`` query per
+    model and level, skipping objects already primed or loaded.
+    """
+
+    def __init__(self):
+        self.cache = defaultdict(dict)
+
+    def prime(self, instances):
+        for obj in instances:
+            self.cache[type(obj)._meta.concrete_model].setdefault(obj.pk, obj)
+
+    def load(self, work):
+        """``work`` is a list of ``(instances, select_related tree)`` pairs"""
+        pending = [(instances, tree) for instances, tree in work if instances and tree]
+        while pending:
+            steps = []
+            wanted = defaultdict(set)
+            for instances, tree in pending:
+                opts = instances[0]._meta
+                for name, subtree in tree.items():
+                    field = opts.get_field(name)
+                    cache = self.cache[field.related_model._meta.concrete_model]
+                    for obj in instances:
+                        key = getattr(obj, field.attname)
+                        if key is not None and key not in cache and not field.is_cached(obj):
+                            wanted[field.related_model._meta.concrete_model].add(key)
+                    steps.append((instances, field, subtree))
+
+            for model, keys in wanted.items():
+                self.cache[model].update(model._base_manager.in_bulk(keys))
+
+            pending = []
+            for instances, field, subtree in steps:
+                cache = self.cache[field.related_model._meta.concrete_model]
+                related = {}
+                for obj in instances:
+                    if not field.is_cached(obj):
+                        key = getattr(obj, field.attname)
+                        field.set_cached_value(obj, cache.get(key) if key is not None else None)
+                    target = field.get_cached_value(obj)
+                    if target is not None:
+                        related[id(target)] = target
+                if subtree and related:
+                    pending.append((list(related.values()), subtree))
+
+
+def is_forward_tree(model, tree):
+    """Whether a ``select_related`` tree only follows forward foreign keys"""
+    for name, subtree in tree.items():
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        if not (field.concrete and (field.many_to_one or field.one_to_one)):
+            return False
+        if not is_forward_tree(field.related_model, subtree):
+            return False
+    return True
+
+
+class BatchItem:
+    """One sub-request: its viewset, the rows it read and how to render them"""
+
+    def __init__(self, request, path):
+        url = urlsplit(path)
+        url_path = url.path if url.path.startswith('/') else f'/{url.path}'
+        match = resolve(url_path)
+        actions = getattr(match.func, 'actions', None) or {}
+        viewset = getattr(match.func, 'cls', None)
+        self.action = actions.get('get')
+        if viewset is None or not issubclass(viewset, GenericAPIView) or self.action not in BATCH_ACTIONS:
+            raise Http404('Only list and detail routes can be batched')
+
+        http_request = copy.copy(request._request)
+        http_request.method = 'GET'
+        http_request.path = http_request.path_info = url_path
+        http_request.GET = QueryDict(url.query)
+        http_request.META = {
+            **http_request.META, 'REQUEST_METHOD': 'GET', 'PATH_INFO': url_path, 'QUERY_STRING': url.query
+        }
+        http_request.resolver_match = match
+        sub_request = Request(
+            http_request, parsers=request.parsers,
+            authenticators=request.authenticators, negotiator=request.negotiator,
+        )
+        sub_request.user = request.user
+        sub_request.auth = request.auth
+
+        view = viewset(**match.func.initkwargs)
+        view.action_map = actions
+        view.action = self.action
+        view.request = sub_request
+        view.args = match.args
+        view.kwargs = match.kwargs
+        view.headers = {}
+        view.format_kwarg = None
+        self.view = view
+        self.page = None
+        self.instances = []
+        self.tree = {}
+
+    def fetch(self):
+        view = self.view
+        view.initial(view.request, *view.args, **view.kwargs)
+        queryset = view.filter_queryset(view.get_queryset())
+        tree = queryset.query.select_related
+        if isinstance(tree, dict) and tree and is_forward_tree(queryset.model, tree):
+            # The loader resolves these for every sub-request together
+            queryset = queryset.select_related(None)
+            self.tree = tree
+
+        if self.action == 'retrieve':
+            lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+            instance = get_object_or_404(queryset, **{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+            view.check_object_permissions(view.request, instance)
+            self.instances = [instance]
+        else:
+            self.page = view.paginate_queryset(queryset)
+            self.instances = list(self.page if self.page is not None else queryset)
+
+    def data(self):
+        view = self.view
+        if self.action == 'retrieve':
+            return view.get_serializer(self.instances[0]).data
+        serializer = view.get_serializer(self.instances, many=True)
+        if self.page is not None:
+            return view.get_paginated_response(serializer.data).data
+        return serializer.data
+
+
+def _error(exc, item=None):
+    if isinstance(exc, Resolver404):
+        exc = Http404()
+    context = {'view': item.view if item else None, 'request': item.view.request if item else None}
+    response = exception_handler(exc, context)
+    if response is None:
+        raise exc
+    return {'status': response.status_code, 'data': response.data}
+
+
+def run_batch(request, paths):
+    """
+    Answer ``{name: path}`` GET requests; returns ``{name: {'status', 'data'}}``.
+    Failures (404, 403, invalid filters) are reported per request.
+    """
+    results = {}
+    items = {}
+    for name, path in paths.items():
+        item = None
+        try:
+            item = BatchItem(request, path)
+            item.fetch()
+        except Exception as exc:
+            results[name] = _error(exc, item)
+        else:
+            items[name] = item
+
+    loader = DataLoader()
+    for item in items.values():
+        loader.prime(item.instances)
+    loader.load([(item.instances, item.tree) for item in items.values()])
+
+    for name, item in items.items():
+        try:
+            results[name] = {'status': 200, 'data': item.data()}
+        except Exception as exc:
+            results[name] = _error(exc, item)
+    return {name: results[name] for name in paths}
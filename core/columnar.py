@@ -0,0 +1,248 @@
+# core/columnar.py
+"""
+Column-oriented list responses for bulk consumers.
+
+A view that mixes in ``ColumnarListMixin`` and declares ``columnar_columns``
+answers ``list`` requests for ``application/vnd.apache.arrow.stream`` or
+``application/x-msgpack`` (also ``?format=arrow`` / ``?format=msgpack``)
+without going through its serializer. Rows are read with ``values_list``
+in chunks and each column batch is sent as soon as it is encoded, through a
+streaming response, so memory holds one batch however many rows match.
+Related names are dictionary encoded, so each distinct name is sent once
+per response and rows only carry small integer indices.
+
+The msgpack stream is a sequence of top-level objects: a header
+``{'columns': [{'name', 'type'}, ...]}`` followed by batches
+``{'length': n, 'columns': {name: values}}``. Dictionary columns carry
+``{'dictionary': [new entries], 'indices': [...]}`` where indices refer to
+all entries sent so far. Dates and decimals are ISO strings, datetimes are
+msgpack timestamps. The Arrow stream uses native types, dictionary deltas
+and zstd body compression.
+"""
+import json
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+COLUMNAR_BATCH_SIZE = 10000
+# Body compression for Arrow streams; set to None for readers without codecs
+COLUMNAR_ARROW_COMPRESSION = getattr(settings, 'COLUMNAR_ARROW_COMPRESSION', 'zstd')
+COLUMN_TYPES = ('int', 'float', 'bool', 'str', 'dict', 'date', 'datetime', 'decimal')
+
+
+class Column:
+    """An output column read from ``lookup`` (defaults to ``name``)"""
+
+    def __init__(self, name, type, lookup=None):
+        if type not in COLUMN_TYPES:
+            raise ValueError(f"Unknown column type '{type}'")
+        self.name = name
+        self.type = type
+        self.lookup = lookup or name
+
+
+class ColumnarResult:
+    """Response data for the columnar renderers: columns plus a queryset"""
+
+    def __init__(self, columns, queryset, batch_size=COLUMNAR_BATCH_SIZE):
+        self.columns = columns
+        self.queryset = queryset
+        self.batch_size = batch_size
+
+    def batches(self):
+        """Yield one list of values per column for each chunk of rows"""
+        rows = self.queryset.values_list(*[column.lookup for column in self.columns])
+        batch = []
+        for row in rows.iterator(chunk_size=self.batch_size):
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield [list(values) for values in zip(*batch)]
+                batch = []
+        if batch:
+            yield [list(values) for values in zip(*batch)]
+
+
+class DictionaryEncoder:
+    """Maps values to indices into a dictionary that only grows"""
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def encode(self, values):
+        """Return ``(indices, new_entries)``; ``None`` stays ``None``"""
+        start = len(self.values)
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            position = self.index.get(value)
+            if position is None:
+                position = self.index[value] = len(self.values)
+                self.values.append(value)
+            indices.append(position)
+        return indices, self.values[start:]
+
+
+def _json_fallback(data, renderer_context):
+    """Errors and non-list payloads cannot be columnar; send them as JSON"""
+    response = (renderer_context or {}).get('response')
+    if response is not None:
+        response['Content-Type'] = 'application/json'
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class _Chunks:
+    """Write-only file for the Arrow writer; ``drain`` takes what it wrote so far"""
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+class MsgpackColumnarRenderer(BaseRenderer):
+    media_type = 'application/x-msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    @staticmethod
+    def _encode_values(column_type, values):
+        if column_type in ('date', 'decimal'):
+            return [None if value is None else str(value) for value in values]
+        if column_type == 'datetime':
+            # msgpack timestamps need an aware datetime
+            return [
+                value.replace(tzinfo=dt_timezone.utc) if value is not None and value.tzinfo is None else value
+                for value in values
+            ]
+        return values
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import msgpack
+
+        if not isinstance(data, ColumnarResult):
+            return msgpack.packb(data, default=str, datetime=True)
+        return b''.join(self.stream(data))
+
+    def stream(self, data):
+        """Yield the header, then one packed object per batch"""
+        import msgpack
+
+        packer = msgpack.Packer(datetime=True)
+        columns = data.columns
+        yield packer.pack({'columns': [{'name': c.name, 'type': c.type} for c in columns]})
+        dictionaries = {c.name: DictionaryEncoder() for c in columns if c.type == 'dict'}
+        for batch in data.batches():
+            encoded = {}
+            for column, values in zip(columns, batch):
+                if column.type == 'dict':
+                    indices, new = dictionaries[column.name].encode(values)
+                    encoded[column.name] = {'dictionary': new, 'indices': indices}
+                else:
+                    encoded[column.name] = self._encode_values(column.type, values)
+            yield packer.pack({'length': len(batch[0]), 'columns': encoded})
+
+
+class ArrowStreamRenderer(BaseRenderer):
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+    charset = None
+    render_style = 'binary'
+
+    @staticmethod
+    def _arrow_type(pa, column_type):
+        return {
+            'int': pa.int64(),
+            'float': pa.float64(),
+            'bool': pa.bool_(),
+            'str': pa.string(),
+            'dict': pa.dictionary(pa.int32(), pa.string()),
+            'date': pa.date32(),
+            'datetime': pa.timestamp('us', tz='UTC'),
+            'decimal': pa.decimal128(18, 2),
+        }[column_type]
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, ColumnarResult):
+            return _json_fallback(data, renderer_context)
+        return b''.join(self.stream(data))
+
+    def stream(self, data):
+        """Yield the IPC messages written for each record batch, then the end marker"""
+        import pyarrow as pa
+
+        columns = data.columns
+        schema = pa.schema([pa.field(c.name, self._arrow_type(pa, c.type)) for c in columns])
+        dictionaries = {c.name: DictionaryEncoder() for c in columns if c.type == 'dict'}
+        sink = _Chunks()
+        options = pa.ipc.IpcWriteOptions(
+            compression=COLUMNAR_ARROW_COMPRESSION, emit_dictionary_deltas=True
+        )
+        with pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema, options=options) as writer:
+            for batch in data.batches():
+                arrays = []
+                for column, field, values in zip(columns, schema, batch):
+                    if column.type == 'dict':
+                        encoder = dictionaries[column.name]
+                        indices, _ = encoder.encode(values)
+                        arrays.append(pa.DictionaryArray.from_arrays(
+                            pa.array(indices, type=pa.int32()),
+                            pa.array(encoder.values, type=pa.string()),
+                        ))
+                    elif column.type == 'decimal':
+                        arrays.append(pa.array(
+                            [None if value is None else Decimal(value).quantize(Decimal('0.01')) for value in values],
+                            type=field.type,
+                        ))
+                    else:
+                        arrays.append(pa.array(values, type=field.type))
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                yield sink.drain()
+        yield sink.drain()
+
+
+COLUMNAR_RENDERERS = [MsgpackColumnarRenderer, ArrowStreamRenderer]
+
+
+class ColumnarListMixin:
+    """
+    Offers the columnar renderers on a viewset. Columnar ``list`` responses
+    honour the view's filters and ordering but are not paginated; they are
+    streamed a batch at a time.
+    """
+    columnar_columns = ()
+    columnar_batch_size = COLUMNAR_BATCH_SIZE
+
+    def get_renderers(self):
+        return super().get_renderers() + [renderer() for renderer in COLUMNAR_RENDERERS]
+
+    def list(self, request, *args, **kwargs):
+        renderer = getattr(request, 'accepted_renderer', None)
+        if isinstance(renderer, tuple(COLUMNAR_RENDERERS)):
+            queryset = self.filter_queryset(self.get_queryset())
+            return StreamingHttpResponse(
+                renderer.stream(ColumnarResult(self.columnar_columns, queryset, self.columnar_batch_size)),
+                content_type=renderer.media_type,
+            )
+        return super().list(request, *args, **kwargs)
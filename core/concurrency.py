@@ -0,0 +1,153 @@
+# core/concurrency.py
+"""
+Optimistic concurrency control.
+
+``VersionedModel`` adds a ``version`` column. Saving an existing row issues
+``UPDATE ... WHERE id = %s AND version = <version the instance was read
+at>`` and bumps the version; if another writer got there first no row
+matches and ``VersionConflict`` is raised with the current row, instead of
+silently overwriting it. Nothing is locked while a user edits.
+
+Queryset ``update`` and ``bulk_update`` calls (admin actions, merges, scan
+ingestion) bump the version atomically with ``version = version + 1``, so
+every editor still holding the old version conflicts on their next save.
+Writes that only touch ``outbox_ignored_fields`` (e.g. scan sightings) do
+not count as edits and leave the version alone.
+"""
+from django.db import models, transaction
+from django.db.models import F
+
+
+class VersionConflict(Exception):
+    """The row changed since the instance was read"""
+
+    def __init__(self, instance, current):
+        self.instance = instance
+        self.current = current
+        super().__init__(
+            f'{type(instance).__name__} {instance.pk} was changed by someone else '
+            f'(now at version {current.version})'
+        )
+
+
+def version_bump():
+    return F('version') + 1
+
+
+def _is_edit(model, fields):
+    return bool(set(fields) - set(getattr(model, 'outbox_ignored_fields', ())))
+
+
+class VersionedModel(models.Model):
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            if not _is_edit(type(self), update_fields):
+                return super().save(*args, **kwargs)
+            kwargs['update_fields'] = set(update_fields) | {'version'}
+        expected = self.version
+        self._expected_version = expected
+        self.version = expected + 1
+        try:
+            super().save(*args, **kwargs)
+        except BaseException:
+            self.version = expected
+            raise
+        finally:
+            del self._expected_version
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if base_qs.filter(pk=pk_val, version=expected)._update(values) > 0:
+            return True
+        current = base_qs.filter(pk=pk_val).first()
+        if current is not None:
+            raise VersionConflict(self, current)
+        return False
+
+
+class VersionedQuerySet(models.QuerySet):
+    """Bumps ``version`` on the bulk write paths"""
+
+    def update(self, **kwargs):
+        if 'version' not in kwargs and _is_edit(self.model, kwargs):
+            kwargs['version'] = version_bump()
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if 'version' in fields or not _is_edit(self.model, fields):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            updated = super().bulk_update(objs, fields, *args, **kwargs)
+            # The base manager's plain queryset, so this is not another event
+            self.model._base_manager.using(self.db).filter(
+                pk__in=[obj.pk for obj in objs]
+            ).update(version=version_bump())
+        for obj in objs:
+            obj.version += 1
+        return updated
+
+
+def if_match_version(request):
+    """The version in an ``If-Match: "<version>"`` header, or None"""
+    value = request.headers.get('If-Match', '').strip().removeprefix('W/').strip('"')
+    return int(value) if value.isdigit() else None
+
+
+class VersionedUpdateMixin:
+    """
+    Viewset side of optimistic concurrency. Clients send the version they
+    edited (``version`` in the body or ``If-Match``); a conflict answers
+    409 with the current state. Responses carry the version as an ETag.
+    """
+    conflict_serializer_class = None
+
+    def conflict_response(self, conflict):
+        # Model modules import this one, so DRF stays off the django.setup() path
+        from rest_framework import status as http_status
+        from rest_framework.response import Response
+
+        serializer_class = self.conflict_serializer_class or self.get_serializer_class()
+        return Response(
+            {
+                'detail': str(conflict),
+                'current': serializer_class(conflict.current, context=self.get_serializer_context()).data,
+            },
+            status=http_status.HTTP_409_CONFLICT,
+        )
+
+    def perform_update(self, serializer):
+        expected = if_match_version(self.request)
+        if expected is not None and 'version' not in serializer.validated_data:
+            serializer.save(version=expected)
+        else:
+            serializer.save()
+
+    def update(self, request, *args, **kwargs):
+        try:
+            # A savepoint, so a conflict inside an outer transaction only undoes this write
+            with transaction.atomic():
+                response = super().update(request, *args, **kwargs)
+        except VersionConflict as conflict:
+            return self.conflict_response(conflict)
+        return self._with_etag(response)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._with_etag(super().retrieve(request, *args, **kwargs))
+
+    @staticmethod
+    def _with_etag(response):
+        version = response.data.get('version') if isinstance(response.data, dict) else None
+        if version is not None:
+            response['ETag'] = f'"{version}"'
+        return response
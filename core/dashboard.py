@@ -0,0 +1,134 @@
+# core/dashboard.py
+"""
+Landing page summary numbers.
+
+The summary is two conditional-aggregation queries (assets grouped by
+status, open maintenance grouped by priority) and is cached per company.
+Writes to Asset or MaintenanceRecord bump a shared generation number (see
+core.signals), which marks every cached summary stale; that includes
+queryset updates and bulk writes, through the outbox's ``bulk_write``
+signal. One request at a time recomputes an entry, holding a lock in the
+cache. Concurrent requests keep getting the previous value, or, when there
+is none yet, wait for the one being computed, so a burst of users never
+runs the aggregates in parallel.
+"""
+import time
+import uuid
+
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from assets.models import Asset, MaintenanceRecord, warranty_expiry_q
+
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60 * 15)
+WARRANTY_WINDOW_DAYS = 30
+GENERATION_KEY = 'core:dashboard:generation'
+LOCK_TIMEOUT = 30
+# How long a request without any cached value waits for another one computing it
+LOCK_WAIT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _cache_key(company_id):
+    return f"core:dashboard:{'all' if company_id is None else company_id}"
+
+
+def current_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, None)
+        generation = cache.get(GENERATION_KEY, 1)
+    return generation
+
+
+def invalidate_dashboard():
+    """Mark every cached dashboard stale"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 1, None)
+
+
+def compute_dashboard(company_id=None):
+    today = date.today()
+    assets = Asset.objects.all()
+    maintenance = MaintenanceRecord.objects.exclude(status__in=MaintenanceRecord.CLOSED_STATUSES)
+    if company_id is not None:
+        assets = assets.filter(company_id=company_id)
+        maintenance = maintenance.filter(company_id=company_id)
+
+    expiring = warranty_expiry_q(today, today + timedelta(days=WARRANTY_WINDOW_DAYS))
+    by_status = assets.order_by().values('status_id', 'status__name', 'status__color').annotate(
+        count=Count('id'),
+        unassigned=Count('id', filter=Q(assigned_to__isnull=True)),
+        warranty_expiring=Count('id', filter=expiring),
+    )
+    by_priority = maintenance.order_by().values('priority').annotate(
+        open=Count('id'),
+        overdue=Count('id', filter=Q(scheduled_date__lt=today)),
+    )
+
+    status_rows = sorted(by_status, key=lambda row: row['status__name'])
+    priority_rows = {row['priority']: row for row in by_priority}
+    return {
+        'company': company_id,
+        'generated_at': timezone.now(),
+        'assets_total': sum(row['count'] for row in status_rows),
+        'assets_by_status': [
+            {
+                'id': row['status_id'],
+                'name': row['status__name'],
+                'color': row['status__color'],
+                'count': row['count'],
+            }
+            for row in status_rows
+        ],
+        'unassigned': sum(row['unassigned'] for row in status_rows),
+        'warranty_expiring': sum(row['warranty_expiring'] for row in status_rows),
+        'maintenance_overdue': sum(row['overdue'] for row in priority_rows.values()),
+        'open_tickets_by_priority': {
+            priority: priority_rows.get(priority, {}).get('open', 0)
+            for priority, _ in MaintenanceRecord.PRIORITY_CHOICES
+        },
+    }
+
+
+def _wait_for(key):
+    """The entry another request is computing, or None if it does not show up in time"""
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    return None
+
+
+def get_dashboard(company_id=None):
+    """Cached dashboard for a company (or the whole fleet)"""
+    generation = current_generation()
+    key = _cache_key(company_id)
+    cached = cache.get(key)
+    if cached is not None and cached['generation'] == generation:
+        return cached['data']
+    lock, token = f'{key}:lock', uuid.uuid4().hex
+    if not cache.add(lock, token, LOCK_TIMEOUT):
+        # Another request is already refreshing this entry
+        if cached is None:
+            cached = _wait_for(key)
+        if cached is not None:
+            return cached['data']
+        # The other request failed or is stuck; answer without touching the cache
+        return compute_dashboard(company_id)
+    try:
+        data = compute_dashboard(company_id)
+        cache.set(key, {'generation': generation, 'data': data}, DASHBOARD_CACHE_TIMEOUT)
+    finally:
+        # Past LOCK_TIMEOUT the lock may belong to another request by now
+        if cache.get(lock) == token:
+            cache.delete(lock)
+    return data
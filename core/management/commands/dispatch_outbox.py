@@ -0,0 +1,41 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.outbox import OUTBOX_BATCH_SIZE, dispatch_pending, purge_delivered
+
+
+class Command(BaseCommand):
+    help = 'Delivers pending asset and maintenance change events to the downstream endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default=getattr(settings, 'OUTBOX_DELIVERY_URL', None),
+            help='Endpoint receiving event batches (default: settings.OUTBOX_DELIVERY_URL)'
+        )
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Seconds to sleep when there is nothing to deliver'
+        )
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+        parser.add_argument(
+            '--purge-days', type=int, default=None,
+            help='Delete delivered events older than this many days before starting'
+        )
+
+    def handle(self, *args, **options):
+        if not options['url']:
+            raise CommandError('No delivery URL; pass --url or set OUTBOX_DELIVERY_URL')
+        if options['purge_days'] is not None:
+            purged = purge_delivered(options['purge_days'])
+            self.stdout.write(f'Purged {purged} delivered events')
+
+        while True:
+            delivered, failed = dispatch_pending(options['url'], options['batch_size'])
+            if delivered or failed:
+                self.stdout.write(f'Delivered {delivered}, failed {failed}')
+            if delivered:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What each kind of process imports before it can do any work
+TARGETS = {
+    # Management commands and anything else that only needs the ORM
+    'setup': 'import django; django.setup()',
+    # A web worker answering its first request
+    'web': (
+        'import django; django.setup(); '
+        'from django.urls import get_resolver; get_resolver().url_patterns'
+    ),
+    # A Celery worker after task autodiscovery
+    'worker': (
+        'import django; django.setup(); '
+        'from config.celery import app; app.loader.import_default_modules()'
+    ),
+}
+
+def measure(code, settings_module):
+    """Run ``code`` in a fresh interpreter under -X importtime; returns {module: (self_us, cumulative_us)}"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        env=env, cwd=settings.BASE_DIR, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(own), int(cumulative))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the import time of a cold process (setup, web or worker) in a fresh '
+        'interpreter and compares it with IMPORT_TIME_BUDGETS (milliseconds)'
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f'Any of {", ".join(TARGETS)} (default: all)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per target; the fastest one counts')
+        parser.add_argument('--top', type=int, default=15, help='Packages and modules to list')
+        parser.add_argument('--check', action='store_true', help='Fail when a target is over its budget')
+
+    def handle(self, *args, **options):
+        budgets = getattr(settings, 'IMPORT_TIME_BUDGETS', {})
+        unknown = set(options['targets']) - set(TARGETS)
+        if unknown:
+            raise CommandError(f'Unknown targets: {", ".join(sorted(unknown))}')
+        over = []
+        for target in options['targets'] or TARGETS:
+            runs = [
+                measure(TARGETS[target], os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'))
+                for _ in range(max(options['repeat'], 1))
+            ]
+            modules = min(runs, key=lambda run: sum(own for own, _ in run.values()))
+            total = sum(own for own, _ in modules.values()) / 1000
+            budget = budgets.get(target)
+            style = self.style.ERROR if budget and total > budget else self.style.SUCCESS
+            self.stdout.write(style(f'{target}: {total:.0f} ms (budget {budget} ms, {len(modules)} modules)'))
+            if budget and total > budget:
+                over.append(target)
+
+            packages = Counter()
+            for name, (own, _) in modules.items():
+                packages[name.split('.')[0]] += own
+            self.stdout.write('  by package:')
+            for name, own in packages.most_common(options['top']):
+                self.stdout.write(f'    {own / 1000:8.1f} ms  {name}')
+            self.stdout.write('  slowest imports (cumulative):')
+            for name, (_, cumulative) in sorted(
+                modules.items(), key=lambda item: item[1][1], reverse=True
+            )[:options['top']]:
+                self.stdout.write(f'    {cumulative / 1000:8.1f} ms  {name}')
+
+        if options['check'] and over:
+            raise CommandError(f'Over the import time budget: {", ".join(over)}')
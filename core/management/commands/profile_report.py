@@ -0,0 +1,79 @@
+import io
+import os
+import pstats
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from core.profiling import PROFILE_DIR, PROFILE_SUFFIXES, read_folded, write_folded
+
+PER_PROCESS = re.compile(r'^(?P<key>.+)\.(?P<pid>\d+)(?P<suffix>\.folded|\.prof)$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Merges the per-process profiles written by the sampling profiler into one '
+        'flamegraph-ready file per endpoint or command, and lists the hottest frames'
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=str(PROFILE_DIR), help='Profile directory (default: PROFILE_DIR)')
+        parser.add_argument('--key', help='Only merge keys containing this text, e.g. asset-list')
+        parser.add_argument('--top', type=int, default=10, help='Frames to list per key')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete the per-process files once merged (running processes rewrite theirs on the next sample)'
+        )
+
+    def handle(self, *args, **options):
+        directory = Path(options['dir'])
+        if not directory.is_dir():
+            raise CommandError(f'No profiles in {directory}')
+
+        groups = defaultdict(list)
+        for path in directory.iterdir():
+            match = PER_PROCESS.match(path.name)
+            if match and (not options['key'] or options['key'] in match['key']):
+                groups[match['key'], match['suffix']].append(path)
+        if not groups:
+            self.stdout.write('No profiles recorded yet')
+            return
+
+        for (key, suffix), paths in sorted(groups.items()):
+            merged = directory / f'{key}{suffix}'
+            if suffix == PROFILE_SUFFIXES['cprofile']:
+                self._merge_cprofile(key, paths, merged, options['top'])
+            else:
+                self._merge_folded(key, paths, merged, options['top'])
+            if options['clear']:
+                for path in paths:
+                    os.remove(path)
+
+    def _merge_folded(self, key, paths, merged, top):
+        stacks = Counter()
+        for path in paths:
+            stacks.update(read_folded(path))
+        with open(merged, 'w') as out:
+            write_folded(stacks, out)
+
+        total = sum(stacks.values())
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{key}: {total} samples from {len(paths)} processes -> {merged}'
+        ))
+        for frame, count in leaves.most_common(top):
+            self.stdout.write(f'  {count / total:6.1%}  {frame}')
+
+    def _merge_cprofile(self, key, paths, merged, top):
+        # pstats prints piecewise, which OutputWrapper would break into lines
+        report = io.StringIO()
+        stats = pstats.Stats(*map(str, paths), stream=report)
+        stats.dump_stats(merged)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{key}: {stats.total_calls} calls from {len(paths)} processes -> {merged}'
+        ))
+        stats.sort_stats('tottime').print_stats(top)
+        self.stdout.write(report.getvalue())
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from core.feed import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Deletes change feed tombstones older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=90,
+            help='Consumers polling less often than this must do a full resync'
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_tombstones(options['days'])
+        self.stdout.write(f'Purged {purged} tombstones')
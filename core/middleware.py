@@ -0,0 +1,27 @@
+# core/middleware.py
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import profiling
+
+
+class SamplingProfilerMiddleware:
+    """
+    Profiles ``PROFILE_SAMPLE_RATE`` of requests, aggregated per method and
+    URL name (see core.profiling). Removes itself when the rate is 0.
+    Place it first so the whole middleware stack is included.
+    """
+
+    def __init__(self, get_response):
+        if profiling.PROFILE_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.should_sample(profiling.PROFILE_SAMPLE_RATE):
+            return self.get_response(request)
+        with profiling.profiled(f'{request.method} unresolved') as run:
+            response = self.get_response(request)
+            match = request.resolver_match
+            if match is not None:
+                run.key = f'{request.method} {match.view_name or match.route}'
+        return response
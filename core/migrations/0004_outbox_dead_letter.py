@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-19 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_outbox_archived_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='dead_at',
+            field=models.DateTimeField(blank=True, help_text='Set when the receiver kept refusing the event; it is no longer retried', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('delivered_at__isnull', True)), fields=['ordering_key', 'id'], name='core_outbox_key_pending_idx'),
+        ),
+    ]
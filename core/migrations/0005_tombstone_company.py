@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-19 06:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_outbox_dead_letter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tombstone',
+            name='company_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='rehomed',
+            field=models.BooleanField(default=False, help_text='The row still exists, under another company'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['aggregate', 'company_id', 'deleted_at', 'id'], name='core_tombst_aggrega_1d35ed_idx'),
+        ),
+    ]
@@ -1,3 +1,92 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+class OutboxEvent(models.Model):
+    EVENT_CHOICES = [
+        ('created', _('Created')),
+        ('updated', _('Updated')),
+        ('deleted', _('Deleted')),
+        ('archived', _('Archived')),
+    ]
+
+    aggregate = models.CharField(max_length=50)
+    aggregate_id = models.BigIntegerField(null=True)
+    ordering_key = models.CharField(
+        max_length=100,
+        help_text=_("Events sharing a key are delivered strictly in order")
+    )
+    event_type = models.CharField(max_length=10, choices=EVENT_CHOICES)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    dead_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text=_("Set when the receiver kept refusing the event; it is no longer retried")
+    )
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = _("Outbox Event")
+        verbose_name_plural = _("Outbox Events")
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(delivered_at__isnull=True),
+                name='core_outbox_pending_idx'
+            ),
+            models.Index(
+                fields=['ordering_key', 'id'],
+                condition=models.Q(delivered_at__isnull=True),
+                name='core_outbox_key_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.aggregate}:{self.aggregate_id} {self.event_type}"
+
+
+class Tombstone(models.Model):
+    """
+    Marks a deleted row so incremental consumers can drop it too, or a row
+    that moved to another company, for the consumers of the old one
+    """
+    aggregate = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    company_id = models.BigIntegerField(null=True, blank=True)
+    rehomed = models.BooleanField(
+        default=False,
+        help_text=_("The row still exists, under another company")
+    )
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Tombstone")
+        verbose_name_plural = _("Tombstones")
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['aggregate', 'deleted_at', 'id']),
+            models.Index(fields=['aggregate', 'company_id', 'deleted_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.aggregate}:{self.object_id} deleted {self.deleted_at}"
+
+
+class ArchivedRow(models.Model):
+    """
+    Abstract base of the archive tables: a row moved out of its hot table,
+    under its original primary key, with the column values it had
+    """
+    id = models.BigIntegerField(primary_key=True)
+    archived_at = models.DateTimeField(db_index=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        abstract = True
+
+    def as_dict(self):
+        return {**self.data, 'archived': True, 'archived_at': self.archived_at}
@@ -0,0 +1,360 @@
+# core/outbox.py
+"""
+Transactional outbox for change events.
+
+Models that inherit ``OutboxModel`` and use an ``OutboxQuerySet`` manager
+write an ``OutboxEvent`` row in the same transaction as every save, delete
+and bulk write, so an event exists if and only if the change committed.
+Writers never talk to the downstream systems; ``dispatch_pending`` (run by
+the ``dispatch_outbox`` command) delivers events later in batches, retrying
+with backoff and never letting an event overtake an earlier undelivered
+event with the same ordering key. Delivery is at least once: receivers
+should ignore event ids they have already seen.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from django.dispatch import Signal
+
+from .models import OutboxEvent
+
+OUTBOX_BATCH_SIZE = getattr(settings, 'OUTBOX_BATCH_SIZE', 100)
+OUTBOX_MAX_BACKOFF = getattr(settings, 'OUTBOX_MAX_BACKOFF', 3600)
+# Refusals before an event is given up on (marked dead)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 10)
+# Seconds a dispatcher owns the events it claimed
+OUTBOX_LEASE = getattr(settings, 'OUTBOX_LEASE', 300)
+WRITE_BATCH_SIZE = 1000
+
+# Sent with the model as sender after a queryset update, delete or bulk write
+# recorded its events (instance saves and deletes send the usual signals)
+bulk_write = Signal()
+
+
+def _field_values(obj, fields=None):
+    concrete = obj._meta.concrete_fields
+    if fields is not None:
+        names = set(fields)
+        concrete = [f for f in concrete if f.name in names or f.attname in names]
+    return {field.attname: field.value_from_object(obj) for field in concrete}
+
+
+def _event(model, event_type, aggregate_id, ordering_value, payload):
+    return OutboxEvent(
+        aggregate=model.outbox_aggregate,
+        aggregate_id=aggregate_id,
+        ordering_key=f'{model.outbox_ordering_aggregate or model.outbox_aggregate}:{ordering_value}',
+        event_type=event_type,
+        payload=payload,
+    )
+
+
+def _instance_event(obj, event_type, fields=None):
+    payload = {} if event_type == 'deleted' else _field_values(obj, fields)
+    ordering_value = getattr(obj, obj.outbox_ordering_field)
+    return _event(type(obj), event_type, obj.pk, ordering_value, payload)
+
+
+def record_events(events):
+    OutboxEvent.objects.bulk_create(events, batch_size=WRITE_BATCH_SIZE)
+
+
+def is_tracked_change(model, fields):
+    """False when a write only touches ``outbox_ignored_fields``"""
+    return fields is None or bool(set(fields) - set(model.outbox_ignored_fields))
+
+
+def _auto_now_fields(model):
+    return [field.name for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)]
+
+
+class OutboxQuerySet(models.QuerySet):
+    """Records outbox events for the bulk write paths"""
+
+    def _ordering_rows(self):
+        field = self.model.outbox_ordering_field
+        columns = ('pk',) if field == 'pk' else ('pk', field)
+        for row in self.order_by().values_list(*columns):
+            yield row[0], row[-1]
+
+    def _written(self):
+        bulk_write.send(sender=self.model, using=self.db)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            record_events(_instance_event(obj, 'created') for obj in created)
+            self._written()
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if not is_tracked_change(self.model, fields):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        # Unlike save(), bulk writes do not touch auto_now columns by themselves
+        now = timezone.now()
+        for name in _auto_now_fields(self.model):
+            if name not in fields:
+                for obj in objs:
+                    setattr(obj, name, now)
+                fields.append(name)
+        with transaction.atomic(using=self.db, savepoint=False):
+            # QuerySet.bulk_update() writes through self.update(), which would
+            # record every row a second time; the base manager's does not
+            updated = self.model._base_manager.using(self.db).bulk_update(objs, fields, *args, **kwargs)
+            record_events(_instance_event(obj, 'updated', fields) for obj in objs)
+            self._written()
+        return updated
+
+    def update(self, **kwargs):
+        if not is_tracked_change(self.model, kwargs):
+            return super().update(**kwargs)
+        for name in _auto_now_fields(self.model):
+            kwargs.setdefault(name, timezone.now())
+        with transaction.atomic(using=self.db, savepoint=False):
+            rows = list(self._ordering_rows())
+            updated = super().update(**kwargs)
+            # Values may be expressions, so consumers get the field names
+            payload = {'fields': sorted(kwargs)}
+            record_events(
+                _event(self.model, 'updated', pk, ordering_value, payload)
+                for pk, ordering_value in rows
+            )
+            self._written()
+        return updated
+
+    def delete(self):
+        return self.delete_with_event('deleted')
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def delete_with_event(self, event_type):
+        """Delete the rows, publishing ``event_type`` (e.g. ``archived``) for each"""
+        with transaction.atomic(using=self.db, savepoint=False):
+            rows = list(self._ordering_rows())
+            deleted = super().delete()
+            record_events(
+                _event(self.model, event_type, pk, ordering_value, {})
+                for pk, ordering_value in rows
+            )
+            self._written()
+        return deleted
+
+    delete_with_event.alters_data = True
+    delete_with_event.queryset_only = True
+
+
+class OutboxModel(models.Model):
+    """
+    Abstract base for models whose changes are published through the outbox.
+
+    ``outbox_aggregate`` names the event source, ``outbox_ordering_field``
+    is the attribute whose value orders delivery (e.g. the parent asset)
+    and ``outbox_ordering_aggregate`` is the aggregate that value belongs to
+    (defaults to ``outbox_aggregate``). Writes that only touch
+    ``outbox_ignored_fields`` (e.g. scan sightings) are not published and
+    do not bump ``auto_now`` columns on the bulk paths. Rows removed by a
+    cascade do not get their own events; consumers should treat them as
+    gone with the parent.
+    """
+    outbox_aggregate = None
+    outbox_ordering_field = 'pk'
+    outbox_ordering_aggregate = None
+    outbox_ignored_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def outbox_event(self, event_type, fields=None):
+        """Unsaved event for this instance; pass to record_events for bulk writes"""
+        return _instance_event(self, event_type, fields)
+
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+            update_fields = kwargs.get('update_fields')
+            if created or is_tracked_change(type(self), update_fields):
+                self.outbox_event('created' if created else 'updated', update_fields).save()
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            result = super().delete(*args, **kwargs)
+            self.pk = pk
+            self.outbox_event('deleted').save()
+            self.pk = None
+        return result
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(2 ** attempts, OUTBOX_MAX_BACKOFF))
+
+
+def _pending():
+    return OutboxEvent.objects.filter(delivered_at__isnull=True, dead_at__isnull=True)
+
+
+def _due(now):
+    return Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+
+
+def _claim(batch_size):
+    """
+    Lease up to ``batch_size`` events and return them in id order.
+
+    Only the oldest pending event of each ordering key can start a batch,
+    so a key waiting for a retry, or leased by another dispatcher, is
+    skipped in SQL. The events following a claimed one with the same key
+    join it while there is room. Claimed events get a lease in
+    ``next_attempt_at``, so they hold back their key until delivered or,
+    should the dispatcher die, the lease runs out.
+    """
+    now = timezone.now()
+    earlier = _pending().filter(ordering_key=OuterRef('ordering_key'), id__lt=OuterRef('id'))
+    heads = _pending().filter(_due(now)).exclude(Exists(earlier)).order_by('id')
+    followers = _pending().order_by('id')
+    if transaction.get_connection().features.has_select_for_update_skip_locked:
+        heads = heads.select_for_update(skip_locked=True)
+        followers = followers.select_for_update(skip_locked=True)
+    with transaction.atomic():
+        events = list(heads[:batch_size])
+        keys = {event.ordering_key for event in events}
+        if keys and len(events) < batch_size:
+            stopped = set()
+            claimed = {event.pk for event in events}
+            for event in followers.filter(ordering_key__in=keys, id__gt=min(claimed))[:batch_size * 5]:
+                if event.pk in claimed or event.ordering_key in stopped:
+                    continue
+                if event.next_attempt_at and event.next_attempt_at > now:
+                    stopped.add(event.ordering_key)
+                    continue
+                events.append(event)
+                if len(events) >= batch_size:
+                    break
+        events.sort(key=lambda event: event.pk)
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            next_attempt_at=now + timedelta(seconds=OUTBOX_LEASE)
+        )
+    return events
+
+
+def _serialize(event):
+    return {
+        'id': event.id,
+        'aggregate': event.aggregate,
+        'aggregate_id': event.aggregate_id,
+        'event_type': event.event_type,
+        'payload': event.payload,
+        'created_at': event.created_at,
+    }
+
+
+class DeliveryUnavailable(Exception):
+    """The endpoint could not be reached; the batch is retried as a whole"""
+
+
+def post_events(url, events, timeout=10, session=None):
+    """
+    Default transport: POST the batch as JSON, any 2xx counts as delivered.
+    Connection failures and timeouts raise DeliveryUnavailable.
+    """
+    import json
+    import requests
+    from django.core.serializers.json import DjangoJSONEncoder
+
+    body = json.dumps({'events': [_serialize(event) for event in events]}, cls=DjangoJSONEncoder)
+    try:
+        response = (session or requests).post(
+            url, data=body, timeout=timeout, headers={'Content-Type': 'application/json'}
+        )
+    except (requests.ConnectionError, requests.Timeout) as exc:
+        raise DeliveryUnavailable(str(exc)) from exc
+    response.raise_for_status()
+
+
+def _send(url, events, transport, delivered, rejected, held_keys):
+    """
+    Deliver ``events``, splitting a rejected batch in halves until the
+    events the receiver refuses are isolated. Events after a refused one
+    with the same ordering key are left out.
+    """
+    events = [event for event in events if event.ordering_key not in held_keys]
+    if not events:
+        return
+    try:
+        transport(url, events)
+    except DeliveryUnavailable:
+        raise
+    except Exception as exc:
+        if len(events) == 1:
+            rejected.append((events[0], exc))
+            held_keys.add(events[0].ordering_key)
+            return
+        middle = len(events) // 2
+        _send(url, events[:middle], transport, delivered, rejected, held_keys)
+        _send(url, events[middle:], transport, delivered, rejected, held_keys)
+        return
+    delivered.extend(events)
+
+
+def _failed(event, exc, now):
+    event.attempts += 1
+    event.next_attempt_at = now + _backoff(event.attempts)
+    event.last_error = str(exc)[:2000]
+
+
+def dispatch_pending(url, batch_size=OUTBOX_BATCH_SIZE, transport=post_events):
+    """
+    Deliver one batch of pending events. Returns ``(delivered, failed)``.
+
+    The events are claimed in a short transaction and sent after it has
+    committed, so no row lock is held while the endpoint answers. A batch
+    the receiver refuses is bisected to find the events it refuses; those
+    are retried with exponential backoff, holding back later events with
+    the same key, and marked dead after ``OUTBOX_MAX_ATTEMPTS``. Dead
+    events no longer block their key. An unreachable endpoint
+    (DeliveryUnavailable) retries the whole batch and never kills events.
+    """
+    events = _claim(batch_size)
+    if not events:
+        return 0, 0
+    delivered, rejected, held_keys = [], [], set()
+    try:
+        _send(url, events, transport, delivered, rejected, held_keys)
+    except DeliveryUnavailable as exc:
+        now = timezone.now()
+        for event in events:
+            _failed(event, exc, now)
+        OutboxEvent.objects.bulk_update(events, ['attempts', 'next_attempt_at', 'last_error'])
+        return 0, len(events)
+
+    now = timezone.now()
+    OutboxEvent.objects.filter(pk__in=[event.pk for event in delivered]).update(
+        delivered_at=now, next_attempt_at=None, last_error=''
+    )
+    for event, exc in rejected:
+        _failed(event, exc, now)
+        if event.attempts >= OUTBOX_MAX_ATTEMPTS:
+            event.dead_at = now
+    OutboxEvent.objects.bulk_update(
+        [event for event, _ in rejected], ['attempts', 'next_attempt_at', 'last_error', 'dead_at']
+    )
+    # Held back behind a refused event: release the lease
+    done = {event.pk for event in delivered} | {event.pk for event, _ in rejected}
+    OutboxEvent.objects.filter(pk__in=[event.pk for event in events if event.pk not in done]).update(
+        next_attempt_at=None
+    )
+    return len(delivered), len(rejected)
+
+
+def purge_delivered(older_than_days):
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = OutboxEvent.objects.filter(delivered_at__lt=cutoff).delete()
+    return deleted
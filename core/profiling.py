@@ -0,0 +1,228 @@
+# core/profiling.py
+"""
+Opt-in sampling profiler for requests and management commands.
+
+A fraction ``PROFILE_SAMPLE_RATE`` of requests (``SamplingProfilerMiddleware``)
+and ``PROFILE_COMMAND_SAMPLE_RATE`` of management command runs (manage.py)
+is profiled. With a rate of 0 the middleware removes itself, and an
+unsampled run costs one ``random()`` call.
+
+Engines (``PROFILE_ENGINE``):
+
+- ``sampler``: a background thread records the profiled thread's stack every
+  ``PROFILE_INTERVAL`` seconds. Overhead is small and does not depend on
+  how many calls the code makes. Stacks are kept in the folded format
+  (``frame;frame;frame count``) that flamegraph.pl, inferno and speedscope
+  read.
+- ``cprofile``: deterministic ``cProfile``, written as pstats dumps (snakeviz,
+  flameprof). Exact call counts, but it slows the profiled run noticeably.
+
+Profiles are aggregated per key (``GET asset-list``, ``command seed_data``).
+Each process rewrites ``PROFILE_DIR/<key>.<pid>.folded`` (or ``.prof``)
+after every profiled run. ``manage.py profile_report`` merges them per key.
+"""
+import cProfile
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+PROFILE_SAMPLE_RATE = getattr(settings, 'PROFILE_SAMPLE_RATE', 0.0)
+PROFILE_COMMAND_SAMPLE_RATE = getattr(settings, 'PROFILE_COMMAND_SAMPLE_RATE', PROFILE_SAMPLE_RATE)
+PROFILE_ENGINE = getattr(settings, 'PROFILE_ENGINE', 'sampler')
+PROFILE_INTERVAL = getattr(settings, 'PROFILE_INTERVAL', 0.005)
+PROFILE_DIR = Path(getattr(settings, 'PROFILE_DIR', Path(settings.BASE_DIR) / 'profiles'))
+# Long-running or interactive commands are not worth a single profile
+PROFILE_EXCLUDED_COMMANDS = getattr(
+    settings, 'PROFILE_EXCLUDED_COMMANDS',
+    ('runserver', 'shell', 'dbshell', 'dispatch_outbox', 'profile_report')
+)
+
+PROFILE_SUFFIXES = {'sampler': '.folded', 'cprofile': '.prof'}
+
+
+def should_sample(rate):
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+def profile_key(key):
+    """File-name safe form of a profile key"""
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', key).strip('_') or 'unknown'
+
+
+class StackSampler:
+    """Counts the folded stacks of one thread, sampled from another thread"""
+
+    def __init__(self, interval=None):
+        self.interval = interval or PROFILE_INTERVAL
+        self.stacks = Counter()
+        self._labels = {}
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        current_frames = sys._current_frames
+        while not self._stop.wait(self.interval):
+            frame = current_frames().get(self._thread_id)
+            # Once stop() is called the thread is only waiting for us
+            if frame is not None and not self._stop.is_set():
+                self.stacks[self._fold(frame)] += 1
+
+    def _fold(self, frame):
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = f'{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})'
+            labels.append(label)
+            frame = frame.f_back
+        return ';'.join(reversed(labels))
+
+
+class CProfileEngine:
+    def start(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        return pstats.Stats(self.profile)
+
+
+def _short_path(filename):
+    for prefix in _path_prefixes():
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+_prefixes = None
+
+
+def _path_prefixes():
+    global _prefixes
+    if _prefixes is None:
+        roots = {str(settings.BASE_DIR)} | {path for path in sys.path if path}
+        # Longest first, so site-packages wins over the prefix it lives in
+        _prefixes = sorted((os.path.join(root, '') for root in roots), key=len, reverse=True)
+    return _prefixes
+
+
+class ProfileStore:
+    """Per-process aggregate of the profiles taken for each key"""
+
+    def __init__(self, directory=None, engine=None):
+        self.directory = Path(directory or PROFILE_DIR)
+        self.engine = engine or PROFILE_ENGINE
+        self.profiles = {}
+        self.lock = threading.Lock()
+
+    def add(self, key, profile):
+        key = profile_key(key)
+        with self.lock:
+            if self.engine == 'cprofile':
+                if key in self.profiles:
+                    self.profiles[key].add(profile)
+                else:
+                    self.profiles[key] = profile
+            else:
+                self.profiles.setdefault(key, Counter()).update(profile)
+            self._write(key)
+
+    def path(self, key):
+        return self.directory / f'{key}.{os.getpid()}{PROFILE_SUFFIXES[self.engine]}'
+
+    def _write(self, key):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        partial = path.with_name(path.name + '.tmp')
+        if self.engine == 'cprofile':
+            self.profiles[key].dump_stats(partial)
+        else:
+            with open(partial, 'w') as out:
+                write_folded(self.profiles[key], out)
+        os.replace(partial, path)
+
+
+def write_folded(stacks, out):
+    for stack, count in stacks.most_common():
+        out.write(f'{stack} {count}\n')
+
+
+def read_folded(path):
+    stacks = Counter()
+    with open(path) as lines:
+        for line in lines:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = ProfileStore()
+    return _store
+
+
+class ProfiledRun:
+    def __init__(self, key):
+        self.key = key
+        self.engine = CProfileEngine() if PROFILE_ENGINE == 'cprofile' else StackSampler()
+
+
+@contextmanager
+def profiled(key):
+    """
+    Profile the enclosed block into the store under ``key``; the key may be
+    replaced via the yielded run before the block ends
+    """
+    run = ProfiledRun(key)
+    try:
+        run.engine.start()
+    except ValueError:
+        # Python 3.12+ allows one active cProfile per process; skip this run
+        yield run
+        return
+    try:
+        yield run
+    finally:
+        get_store().add(run.key, run.engine.stop())
+
+
+@contextmanager
+def profile_command(argv):
+    """Profile a sampled fraction of ``manage.py <command>`` runs"""
+    command = argv[1] if len(argv) > 1 else 'help'
+    if command in PROFILE_EXCLUDED_COMMANDS or not should_sample(PROFILE_COMMAND_SAMPLE_RATE):
+        yield
+        return
+    key = f'command {command}'
+    started = time.monotonic()
+    with profiled(key):
+        yield
+    sys.stderr.write(
+        f'Profiled {command} ({time.monotonic() - started:.1f}s): {get_store().path(profile_key(key))}\n'
+    )
@@ -0,0 +1,87 @@
+# core/scoping.py
+"""
+Row-level company scoping.
+
+Assets and maintenance records carry a denormalized, indexed ``company``
+(kept in step by assets.models), so limiting a queryset to one tenant is a
+single indexed predicate rather than a join through the assigned user.
+
+A user's scope is resolved once from the user row the authentication
+already loaded and kept on that user object, so every queryset of a
+request (including all the sub-requests of a batch) shares it:
+
+- staff and superusers see every company (``ALL_COMPANIES``);
+- other users see their own company, or nothing when they have none
+  (``NO_COMPANY``), as do anonymous requests.
+
+Viewsets mix in ``CompanyScopedMixin`` and name the column to filter on.
+"""
+from rest_framework.exceptions import ValidationError
+
+ALL_COMPANIES = None
+NO_COMPANY = 0
+
+
+def _resolve_scope(user):
+    if user is None or not user.is_authenticated:
+        return NO_COMPANY
+    if user.is_staff or user.is_superuser:
+        return ALL_COMPANIES
+    return user.company_id or NO_COMPANY
+
+
+def company_scope(user):
+    """``ALL_COMPANIES``, the id of the user's company or ``NO_COMPANY``"""
+    if user is None:
+        return NO_COMPANY
+    try:
+        return user._company_scope
+    except AttributeError:
+        user._company_scope = _resolve_scope(user)
+        return user._company_scope
+
+
+def scope_queryset(queryset, user, field='company_id'):
+    """``queryset`` limited to the rows ``user`` may see, matched on ``field``"""
+    scope = company_scope(user)
+    if scope is ALL_COMPANIES:
+        return queryset
+    if scope == NO_COMPANY:
+        return queryset.none()
+    return queryset.filter(**{field: scope})
+
+
+def in_scope(user, company_id):
+    scope = company_scope(user)
+    return scope is ALL_COMPANIES or (scope != NO_COMPANY and scope == company_id)
+
+
+def scoped_company_id(user, company_id):
+    """
+    The company a row written by ``user`` belongs to: ``company_id``, or the
+    user's own company when none is given. Raises ValidationError for a
+    company outside the user's scope.
+    """
+    scope = company_scope(user)
+    if scope is ALL_COMPANIES:
+        return company_id
+    if company_id is None and scope != NO_COMPANY:
+        return scope
+    if scope == NO_COMPANY or company_id != scope:
+        raise ValidationError({'company': ['You can only manage records of your own company']})
+    return company_id
+
+
+class CompanyScopedMixin:
+    """Limits a viewset's rows to the requesting user's company"""
+    company_field = 'company_id'
+
+    def scope(self, queryset, field=None):
+        return scope_queryset(queryset, getattr(self.request, 'user', None), field or self.company_field)
+
+    def get_queryset(self):
+        return self.scope(super().get_queryset())
+
+    def get_archive_base_queryset(self):
+        # For viewsets that also mix in core.archive.ArchiveReadMixin
+        return self.scope(super().get_archive_base_queryset())
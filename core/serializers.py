@@ -0,0 +1,76 @@
+# core/serializers.py
+from django.conf import settings
+from rest_framework import serializers
+
+SKIP_NOOP_WRITES = getattr(settings, 'SKIP_NOOP_WRITES', True)
+
+
+def auto_now_fields(model):
+    return [field.name for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)]
+
+
+class ChangedFieldsUpdateMixin:
+    """
+    ModelSerializer update that only writes the columns whose value changed,
+    via ``save(update_fields=...)``. When nothing changed the write (and the
+    ``auto_now`` bump) is skipped unless ``skip_noop_writes`` is off.
+    """
+    skip_noop_writes = SKIP_NOOP_WRITES
+
+    def update(self, instance, validated_data):
+        opts = instance._meta
+        if any(opts.get_field(name).many_to_many for name in validated_data):
+            return super().update(instance, validated_data)
+
+        changed = []
+        for name, value in validated_data.items():
+            field = opts.get_field(name)
+            new = value.pk if field.is_relation and value is not None else value
+            if getattr(instance, field.attname) != new:
+                setattr(instance, name, value)
+                changed.append(name)
+
+        if changed or not self.skip_noop_writes:
+            instance.save(update_fields=changed + [
+                name for name in auto_now_fields(type(instance)) if name not in changed
+            ])
+        return instance
+
+
+class CurrentPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Skips the lookup when an update submits the id the instance already
+    points at and the related object is already loaded (e.g. by
+    ``select_related``).
+    """
+
+    def to_internal_value(self, data):
+        instance = getattr(self.root, 'instance', None)
+        if hasattr(instance, '_meta') and data not in (None, ''):
+            field = instance._meta.get_field(self.source)
+            if str(getattr(instance, field.attname)) == str(data) and field.is_cached(instance):
+                return field.get_cached_value(instance)
+        return super().to_internal_value(data)
+
+
+class VersionedSerializerMixin(serializers.Serializer):
+    """
+    Accepts the ``version`` the client edited. Updates are then applied only
+    if the row is still at that version (see core.concurrency).
+    """
+    version = serializers.IntegerField(required=False, min_value=1)
+
+    def create(self, validated_data):
+        validated_data.pop('version', None)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        current = instance.version
+        expected = validated_data.pop('version', None)
+        if expected is not None:
+            instance.version = expected
+        instance = super().update(instance, validated_data)
+        if instance.version == expected:
+            # Nothing was written; report the stored version
+            instance.version = current
+        return instance
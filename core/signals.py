@@ -0,0 +1,26 @@
+# core/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from assets.models import Asset, AssetClosure, MaintenanceRecord
+from .dashboard import invalidate_dashboard
+from .feed import record_tombstone
+from .outbox import bulk_write
+
+
+@receiver([post_save, post_delete, bulk_write], sender=Asset)
+@receiver([post_save, post_delete, bulk_write], sender=MaintenanceRecord)
+def dashboard_source_changed(sender, using=None, **kwargs):
+    transaction.on_commit(invalidate_dashboard, using=using)
+
+
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=MaintenanceRecord)
+def change_feed_tombstone(sender, instance, **kwargs):
+    record_tombstone(sender.outbox_aggregate, instance.pk, instance.company_id)
+
+
+@receiver(pre_delete, sender=Asset)
+def asset_hierarchy_detach(sender, instance, using, **kwargs):
+    # Contents become top-level assets; their rows under the deleted asset's ancestors go too
+    AssetClosure.objects.using(using).detach_subtree(instance.pk)
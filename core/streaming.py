@@ -0,0 +1,58 @@
+# core/streaming.py
+"""
+Paginated or streamed list responses for custom list actions.
+
+``list_response`` paginates like the viewset's ``list``. With
+``?stream=true`` it instead returns the whole result as one JSON array,
+reading rows with a chunked iterator and serializing a chunk at a time, so
+memory stays flat however many rows match.
+"""
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+STREAM_CHUNK_SIZE = 2000
+STREAM_TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def stream_json_array(queryset, serialize, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the bytes of a JSON array of ``serialize(chunk)`` results"""
+    renderer = JSONRenderer()
+    separator = b''
+    yield b'['
+    chunk = []
+
+    def encode():
+        # Render the chunk as an array and splice its items into the stream
+        body = renderer.render(serialize(chunk))[1:-1]
+        return separator + body if body else b''
+
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) >= chunk_size:
+            yield encode()
+            separator = b','
+            chunk = []
+    if chunk:
+        yield encode()
+    yield b']'
+
+
+class StreamingListMixin:
+    """Adds ``list_response`` for list-style ``@action`` methods"""
+    stream_chunk_size = STREAM_CHUNK_SIZE
+
+    def list_response(self, queryset):
+        if self.request.query_params.get('stream', '').lower() in STREAM_TRUE_VALUES:
+            return StreamingHttpResponse(
+                stream_json_array(
+                    queryset,
+                    lambda chunk: self.get_serializer(chunk, many=True).data,
+                    self.stream_chunk_size,
+                ),
+                content_type='application/json',
+            )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
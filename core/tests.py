@@ -1,3 +1,529 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
 from django.test import TestCase
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from django.utils import timezone
+
+from assets.models import Asset, AssetCategory, AssetModel, AssetStatus, MaintenanceRecord, Manufacturer
+from assets.views import AssetViewSet
+from companies.models import Company
+from . import dashboard, profiling
+from .feed import change_feed
+from .models import OutboxEvent, Tombstone
+from .outbox import dispatch_pending, post_events
+
+
+class StandInReceiver:
+    """Local HTTP endpoint recording the event batches posted to it"""
+
+    def __init__(self):
+        self.batches = []
+        self.refused_ids = set()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                ids = [event['id'] for event in body['events']]
+                if receiver.refused_ids & set(ids):
+                    self.send_response(422)
+                else:
+                    receiver.batches.append(ids)
+                    self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/events'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def delivered(self):
+        return [event_id for batch in self.batches for event_id in batch]
+
+
+def make_events(*keys):
+    return [
+        OutboxEvent.objects.create(aggregate='asset', aggregate_id=index, ordering_key=key, event_type='updated')
+        for index, key in enumerate(keys)
+    ]
+
+
+def make_due():
+    OutboxEvent.objects.filter(delivered_at__isnull=True).update(next_attempt_at=None)
+
+
+class OutboxDispatchTests(TestCase):
+    def setUp(self):
+        self.receiver = StandInReceiver()
+        self.addCleanup(self.receiver.close)
+
+    def test_delivers_pending_events_in_batches(self):
+        events = make_events('asset:1', 'asset:2', 'asset:1', 'asset:3', 'asset:1')
+
+        self.assertEqual(dispatch_pending(self.receiver.url, batch_size=3), (3, 0))
+        self.assertEqual(dispatch_pending(self.receiver.url, batch_size=3), (2, 0))
+        self.assertEqual(dispatch_pending(self.receiver.url, batch_size=3), (0, 0))
+
+        self.assertEqual(sorted(self.receiver.delivered), [event.pk for event in events])
+        self.assertFalse(OutboxEvent.objects.filter(delivered_at__isnull=True).exists())
+
+    def test_events_of_one_key_are_delivered_in_order(self):
+        events = make_events(*['asset:1', 'asset:2'] * 10)
+
+        while dispatch_pending(self.receiver.url, batch_size=4)[0]:
+            pass
+
+        for key in ('asset:1', 'asset:2'):
+            expected = [event.pk for event in events if event.ordering_key == key]
+            self.assertEqual([pk for pk in self.receiver.delivered if pk in expected], expected)
+
+    def test_refused_event_is_isolated_and_holds_back_its_key(self):
+        events = make_events('asset:1', 'asset:2', 'asset:1', 'asset:3')
+        self.receiver.refused_ids = {events[0].pk}
+
+        self.assertEqual(dispatch_pending(self.receiver.url), (2, 1))
+
+        self.assertEqual(sorted(self.receiver.delivered), [events[1].pk, events[3].pk])
+        refused, held = OutboxEvent.objects.get(pk=events[0].pk), OutboxEvent.objects.get(pk=events[2].pk)
+        self.assertEqual(refused.attempts, 1)
+        self.assertIn('422', refused.last_error)
+        self.assertIsNone(held.delivered_at)
+        self.assertEqual(held.attempts, 0)
+        # The key stays blocked while the refused event waits for its retry
+        self.assertEqual(dispatch_pending(self.receiver.url), (0, 0))
+
+    @mock.patch('core.outbox.OUTBOX_MAX_ATTEMPTS', 2)
+    def test_event_refused_too_often_is_dead_and_unblocks_its_key(self):
+        events = make_events('asset:1', 'asset:1')
+        self.receiver.refused_ids = {events[0].pk}
+
+        self.assertEqual(dispatch_pending(self.receiver.url), (0, 1))
+        make_due()
+        self.assertEqual(dispatch_pending(self.receiver.url), (0, 1))
+        self.assertIsNotNone(OutboxEvent.objects.get(pk=events[0].pk).dead_at)
+
+        self.assertEqual(dispatch_pending(self.receiver.url), (1, 0))
+        self.assertEqual(self.receiver.delivered, [events[1].pk])
+        self.assertEqual(dispatch_pending(self.receiver.url), (0, 0))
+
+    @mock.patch('core.outbox.OUTBOX_MAX_ATTEMPTS', 1)
+    def test_unreachable_endpoint_retries_without_killing_events(self):
+        self.receiver.close()
+        make_events('asset:1', 'asset:2')
+
+        self.assertEqual(dispatch_pending(self.receiver.url), (0, 2))
+
+        self.assertFalse(OutboxEvent.objects.filter(dead_at__isnull=False).exists())
+        self.assertEqual(set(OutboxEvent.objects.values_list('attempts', flat=True)), {1})
+        self.assertFalse(OutboxEvent.objects.filter(next_attempt_at__lte=timezone.now()).exists())
+
+    def test_blocked_keys_do_not_starve_later_events(self):
+        make_events(*['asset:1'] * 60)
+        OutboxEvent.objects.update(attempts=1, next_attempt_at=timezone.now() + timedelta(hours=1))
+        later = make_events('asset:2')[0]
+
+        self.assertEqual(dispatch_pending(self.receiver.url, batch_size=5), (1, 0))
+        self.assertEqual(self.receiver.delivered, [later.pk])
+
+    def test_endpoint_is_called_outside_the_claiming_transaction(self):
+        make_events('asset:1')
+        depth = len(connection.savepoint_ids)
+        seen = []
+
+        def transport(url, events):
+            seen.append(len(connection.savepoint_ids))
+            post_events(url, events)
+
+        self.assertEqual(dispatch_pending(self.receiver.url, transport=transport), (1, 0))
+        self.assertEqual(seen, [depth])
+
+
+class OutboxWritePathTests(TestCase):
+    """Every write path records exactly one event per changed row, in the same transaction"""
+
+    def setUp(self):
+        self.model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'),
+            category=AssetCategory.objects.create(name='Laptops'),
+            name='Latitude',
+        )
+        self.status = AssetStatus.objects.create(name='Deployed')
+
+    def new_asset(self, tag):
+        return Asset(asset_tag=tag, model=self.model, status=self.status)
+
+    def events(self):
+        events = list(OutboxEvent.objects.order_by('id').values_list('aggregate', 'aggregate_id', 'event_type'))
+        OutboxEvent.objects.all().delete()
+        return events
+
+    def test_instance_save_and_delete(self):
+        asset = self.new_asset('A1')
+        asset.save()
+        asset.serial_number = 'SN1'
+        asset.save(update_fields=['serial_number'])
+        pk = asset.pk
+        asset.delete()
+
+        self.assertEqual(self.events(), [('asset', pk, 'created'), ('asset', pk, 'updated'), ('asset', pk, 'deleted')])
+
+    def test_bulk_create_update_and_bulk_update(self):
+        assets = Asset.objects.bulk_create([self.new_asset('A1'), self.new_asset('A2')])
+        self.assertEqual(self.events(), [('asset', asset.pk, 'created') for asset in assets])
+
+        for asset in assets:
+            asset.serial_number = f'SN-{asset.pk}'
+        Asset.objects.bulk_update(assets, ['serial_number'])
+        self.assertEqual(self.events(), [('asset', asset.pk, 'updated') for asset in assets])
+
+        Asset.objects.filter(pk=assets[0].pk).update(serial_number='SN')
+        self.assertEqual(self.events(), [('asset', assets[0].pk, 'updated')])
+
+        Asset.objects.all().delete()
+        self.assertEqual(sorted(self.events()), [('asset', asset.pk, 'deleted') for asset in assets])
+
+    def test_ignored_fields_are_not_published(self):
+        asset = self.new_asset('A1')
+        asset.save()
+        self.events()
+
+        Asset.objects.filter(pk=asset.pk).update(last_seen=timezone.now())
+        asset.last_seen = timezone.now()
+        asset.save(update_fields=['last_seen'])
+        Asset.objects.bulk_update([asset], ['last_seen'])
+
+        self.assertEqual(self.events(), [])
+
+    def test_child_events_are_ordered_by_their_asset(self):
+        asset = self.new_asset('A1')
+        asset.save()
+        record = MaintenanceRecord.objects.create(
+            asset=asset, title='Battery', description='Replaced', scheduled_date=timezone.now().date(),
+        )
+
+        self.assertEqual(OutboxEvent.objects.get(aggregate_id=record.pk, aggregate='maintenance_record').ordering_key,
+                         f'asset:{asset.pk}')
+
+    def test_rolled_back_writes_leave_no_events(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Asset.objects.bulk_create([self.new_asset('A1')])
+            raise RuntimeError
+
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'),
+            category=AssetCategory.objects.create(name='Laptops'),
+            name='Latitude',
+        )
+        self.status = AssetStatus.objects.create(name='Deployed')
+        Asset.objects.create(asset_tag='A1', model=model, status=self.status)
+
+    def test_cold_cache_waits_for_the_request_computing_it(self):
+        key = dashboard._cache_key(None)
+        cache.add(f'{key}:lock', 'someone-else', dashboard.LOCK_TIMEOUT)
+        entry = {'generation': dashboard.current_generation(), 'data': {'assets_total': 42}}
+        timer = threading.Timer(0.2, cache.set, args=(key, entry))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        with mock.patch.object(dashboard, 'compute_dashboard') as compute:
+            self.assertEqual(dashboard.get_dashboard(), {'assets_total': 42})
+        compute.assert_not_called()
+        self.assertEqual(cache.get(f'{key}:lock'), 'someone-else')
+
+    def test_stale_entry_is_served_while_another_request_refreshes(self):
+        self.assertEqual(dashboard.get_dashboard()['assets_total'], 1)
+        dashboard.invalidate_dashboard()
+        cache.add(f'{dashboard._cache_key(None)}:lock', 'someone-else', dashboard.LOCK_TIMEOUT)
+
+        with mock.patch.object(dashboard, 'compute_dashboard') as compute:
+            self.assertEqual(dashboard.get_dashboard()['assets_total'], 1)
+        compute.assert_not_called()
+
+    @mock.patch.object(dashboard, 'LOCK_WAIT', 0.1)
+    def test_cold_cache_computes_itself_when_the_other_request_never_finishes(self):
+        cache.add(f'{dashboard._cache_key(None)}:lock', 'someone-else', dashboard.LOCK_TIMEOUT)
+        self.assertEqual(dashboard.get_dashboard()['assets_total'], 1)
+
+    def test_queryset_writes_invalidate_the_dashboard(self):
+        self.assertEqual(dashboard.get_dashboard()['assets_total'], 1)
+        retired = AssetStatus.objects.create(name='Retired')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Asset.objects.update(status=retired)
+
+        self.assertEqual(dashboard.get_dashboard()['assets_by_status'][0]['name'], 'Retired')
+
+
+@mock.patch('core.feed.CHANGE_FEED_LAG', 0)
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.acme = Company.objects.create(name='Acme')
+        self.beta = Company.objects.create(name='Beta')
+        model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'),
+            category=AssetCategory.objects.create(name='Laptops'),
+            name='Latitude',
+        )
+        status = AssetStatus.objects.create(name='Deployed')
+        self.assets = [
+            Asset.objects.create(asset_tag=f'A{index}', model=model, status=status, company=self.acme)
+            for index in range(5)
+        ]
+        self.stamp = timezone.now() - timedelta(minutes=1)
+        # Rows sharing a timestamp are told apart by id
+        Asset.objects.update(updated_at=self.stamp)
+        self.assets = list(Asset.objects.order_by('pk'))
+
+    def walk(self, queryset=None, company=None, cursor=None, limit=2):
+        queryset = Asset.objects.all() if queryset is None else queryset
+        seen, deleted = [], []
+        while True:
+            rows, tombstones, cursor, has_more = change_feed(queryset, 'asset', cursor, limit, company)
+            seen += [row.pk for row in rows]
+            deleted += tombstones
+            if not has_more:
+                return seen, deleted, cursor
+
+    def test_keyset_pages_visit_every_row_once(self):
+        seen, _, cursor = self.walk()
+        self.assertEqual(seen, [asset.pk for asset in self.assets])
+
+        self.assets[1].save()
+        self.assertEqual(self.walk(cursor=cursor)[0], [self.assets[1].pk])
+        self.assertEqual(self.walk(cursor=cursor)[0], [self.assets[1].pk])
+
+    def test_timestamp_cursor_and_invalid_cursor(self):
+        later = self.stamp + timedelta(seconds=2)
+        Asset.objects.filter(pk=self.assets[4].pk).update(updated_at=later)
+
+        since = (self.stamp + timedelta(seconds=1)).isoformat()
+        self.assertEqual(self.walk(cursor=since)[0], [self.assets[4].pk])
+        with self.assertRaises(ValidationError):
+            change_feed(Asset.objects.all(), 'asset', 'not-a-cursor')
+
+    def test_rows_inside_the_lag_are_held_back(self):
+        _, _, cursor = self.walk()
+        self.assets[0].save()
+
+        with mock.patch('core.feed.CHANGE_FEED_LAG', 60):
+            self.assertEqual(self.walk(cursor=cursor)[0], [])
+        self.assertEqual(self.walk(cursor=cursor)[0], [self.assets[0].pk])
+
+    def test_deletes_leave_tombstones_for_their_company(self):
+        _, _, cursor = self.walk()
+        deleted = self.assets[0].pk
+        self.assets[0].delete()
+
+        self.assertEqual(self.walk(cursor=cursor, company=self.acme.pk)[1], [deleted])
+        self.assertEqual(self.walk(cursor=cursor, company=self.beta.pk)[1], [])
+        self.assertEqual(self.walk(cursor=cursor)[1], [deleted])
+
+    def test_moving_to_another_company_leaves_a_tombstone_for_the_old_one(self):
+        _, _, cursor = self.walk()
+        record = MaintenanceRecord.objects.create(
+            asset=self.assets[0], title='Battery', description='Replaced', scheduled_date=timezone.now().date(),
+        )
+        Asset.objects.filter(pk__in=[self.assets[0].pk, self.assets[1].pk]).update(company=self.beta)
+        self.assets[2].company = self.beta
+        self.assets[2].save()
+
+        moved = [asset.pk for asset in self.assets[:3]]
+        acme = Asset.objects.filter(company=self.acme)
+        self.assertEqual(sorted(self.walk(acme, self.acme.pk, cursor)[1]), moved)
+        self.assertEqual(
+            list(Tombstone.objects.filter(aggregate='maintenance_record').values_list('object_id', 'company_id')),
+            [(record.pk, self.acme.pk)],
+        )
+        # Consumers of every company still have those rows
+        self.assertEqual(self.walk(cursor=cursor)[1], [])
+
+    def test_api_tombstones_follow_the_requesters_scope(self):
+        user = get_user_model().objects.create_user('beta-user', company=self.beta)
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assets[0].delete()
+
+        self.assertEqual(client.get('/api/assets/changes/').json()['deleted'], [])
+
+
+class ScopedEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'),
+            category=AssetCategory.objects.create(name='Laptops'),
+            name='Latitude',
+        )
+        status = AssetStatus.objects.create(name='Deployed')
+        self.acme = Company.objects.create(name='Acme')
+        self.beta = Company.objects.create(name='Beta')
+        Asset.objects.create(asset_tag='A1', company=self.acme, model=model, status=status)
+        self.foreign = Asset.objects.create(asset_tag='B1', company=self.beta, model=model, status=status)
+        Asset.objects.create(asset_tag='B2', company=self.beta, model=model, status=status)
+        User = get_user_model()
+        self.user = User.objects.create_user('acme-user', company=self.acme)
+        User.objects.create_user('beta-user', company=self.beta)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_dashboard_only_counts_the_users_company(self):
+        self.assertEqual(self.client.get('/api/dashboard/').json()['assets_total'], 1)
+        self.assertEqual(self.client.get('/api/dashboard/', {'company': self.beta.pk}).json()['assets_total'], 1)
+
+    def test_users_only_lists_the_users_company(self):
+        usernames = [user['username'] for user in self.client.get('/api/users/').json()['results']]
+        self.assertEqual(usernames, ['acme-user'])
+
+    def test_batch_sub_requests_are_scoped(self):
+        response = self.client.post('/api/batch/', {'requests': {
+            'assets': '/api/assets/', 'foreign': f'/api/assets/{self.foreign.pk}/', 'users': '/api/users/',
+        }}, format='json').json()
+
+        self.assertEqual([asset['asset_tag'] for asset in response['assets']['data']['results']], ['A1'])
+        self.assertEqual(response['foreign']['status'], 404)
+        self.assertEqual([user['username'] for user in response['users']['data']['results']], ['acme-user'])
+
+
+class ColumnarRenderTests(TestCase):
+    def setUp(self):
+        dell = Manufacturer.objects.create(name='Dell')
+        laptops = AssetCategory.objects.create(name='Laptops')
+        latitude = AssetModel.objects.create(manufacturer=dell, category=laptops, name='Latitude')
+        precision = AssetModel.objects.create(manufacturer=dell, category=laptops, name='Precision')
+        status = AssetStatus.objects.create(name='Deployed')
+        company = Company.objects.create(name='Acme')
+        for number, model in enumerate([latitude, precision, latitude, latitude, precision]):
+            Asset.objects.create(
+                asset_tag=f'A{number}', company=company, model=model, status=status,
+                purchase_cost='1200.50', location='Depot' if number == 3 else 'HQ',
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('acme-user', company=company))
+        patcher = mock.patch.object(AssetViewSet, 'columnar_batch_size', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch(self, fmt):
+        response = self.client.get('/api/assets/', {'format': fmt})
+        self.assertTrue(response.streaming)
+        return response, list(response.streaming_content)
+
+    def test_msgpack_round_trip(self):
+        import msgpack
+
+        response, chunks = self.fetch('msgpack')
+
+        self.assertEqual(response['Content-Type'], 'application/x-msgpack')
+        header, *batches = msgpack.Unpacker(BytesIO(b''.join(chunks)), timestamp=3)
+        self.assertEqual(len(chunks), 4)
+        self.assertIn({'name': 'model', 'type': 'dict'}, header['columns'])
+        self.assertEqual([batch['length'] for batch in batches], [2, 2, 1])
+        dictionary, models = [], []
+        for batch in batches:
+            dictionary += batch['columns']['model']['dictionary']
+            models += [dictionary[index] for index in batch['columns']['model']['indices']]
+        self.assertEqual(models, ['Latitude', 'Precision', 'Latitude', 'Latitude', 'Precision'])
+        self.assertEqual(batches[0]['columns']['purchase_cost'], ['1200.50', '1200.50'])
+        self.assertEqual(batches[0]['columns']['asset_tag'], ['A0', 'A1'])
+
+    def test_arrow_round_trip(self):
+        import pyarrow as pa
+
+        response, chunks = self.fetch('arrow')
+
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.arrow.stream')
+        # Schema and first batch, one chunk per further batch, then the end marker
+        self.assertEqual(len(chunks), 4)
+        table = pa.ipc.open_stream(b''.join(chunks)).read_all()
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(table.column('asset_tag').to_pylist(), ['A0', 'A1', 'A2', 'A3', 'A4'])
+        self.assertEqual(
+            table.column('model').to_pylist(), ['Latitude', 'Precision', 'Latitude', 'Latitude', 'Precision']
+        )
+        self.assertEqual(table.column('location').to_pylist(), ['HQ', 'HQ', 'HQ', 'Depot', 'HQ'])
+        self.assertEqual(table.column('purchase_cost').to_pylist()[0], Decimal('1200.50'))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = mock.patch.object(profiling, '_store', profiling.ProfileStore(self.directory, 'sampler'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sampler_records_the_profiled_threads_stack(self):
+        def busy_loop():
+            deadline = time.monotonic() + 0.1
+            while time.monotonic() < deadline:
+                pass
+
+        sampler = profiling.StackSampler(interval=0.001)
+        sampler.start()
+        busy_loop()
+        stacks = sampler.stop()
+
+        self.assertTrue(stacks)
+        self.assertTrue(any(stack.rsplit(';', 1)[-1].startswith('busy_loop (') for stack in stacks))
+
+    def test_requests_are_profiled_per_route(self):
+        user = get_user_model().objects.create_user('profiled', company=Company.objects.create(name='Acme'))
+        with mock.patch.object(profiling, 'PROFILE_SAMPLE_RATE', 1), \
+                mock.patch.object(profiling, 'PROFILE_INTERVAL', 0.001):
+            client = APIClient()
+            client.force_authenticate(user)
+            self.assertEqual(client.get('/api/assets/').status_code, 200)
+
+        path = self.directory / f'GET_asset-list.{os.getpid()}.folded'
+        self.assertTrue(path.exists(), list(self.directory.iterdir()))
+
+    def test_report_merges_the_files_of_every_process(self):
+        for pid, count in ((101, 2), (102, 3)):
+            with open(self.directory / f'GET_asset-list.{pid}.folded', 'w') as out:
+                profiling.write_folded(Counter({'main;handler;query': count, 'main;render': 1}), out)
+
+        output = StringIO()
+        call_command('profile_report', dir=str(self.directory), clear=True, stdout=output)
+
+        self.assertIn('GET_asset-list: 7 samples from 2 processes', output.getvalue())
+        self.assertEqual(
+            profiling.read_folded(self.directory / 'GET_asset-list.folded'),
+            Counter({'main;handler;query': 5, 'main;render': 2}),
+        )
+        self.assertEqual([path.name for path in self.directory.iterdir()], ['GET_asset-list.folded'])
 
-# Create your tests here.
+    def test_keys_are_file_name_safe(self):
+        self.assertEqual(profiling.profile_key('GET api/assets/<pk>/'), 'GET_api_assets_pk')
+        self.assertEqual(profiling.profile_key('///'), 'unknown')
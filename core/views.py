@@ -1,3 +1,24 @@
-from django.shortcuts import render
+# core/views.py
+from rest_framework import viewsets
+from rest_framework.response import Response
+from .dashboard import get_dashboard
+from .scoping import ALL_COMPANIES, company_scope
 
-# Create your views here.
+
+class DashboardViewSet(viewsets.ViewSet):
+    """
+    Landing page summary for the user's company. Staff users may pass
+    `?company=<id>` or `?company=all`.
+    """
+
+    def list(self, request):
+        user = request.user
+        company_id = company_scope(user)
+        if company_id is ALL_COMPANIES:
+            company_id = getattr(user, 'company_id', None)
+            requested = request.query_params.get('company', '')
+            if requested == 'all':
+                company_id = None
+            elif requested.isdigit():
+                company_id = int(requested)
+        return Response(get_dashboard(company_id))
@@ -15,7 +15,9 @@ def main():
             "available on your PYTHONPATH environment variable? Did you "
             "forget to activate a virtual environment?"
         ) from exc
-    execute_from_command_line(sys.argv)
+    from core.profiling import profile_command
+    with profile_command(sys.argv):
+        execute_from_command_line(sys.argv)
 
 
 if __name__ == '__main__':
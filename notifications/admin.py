@@ -0,0 +1,12 @@
+from django.contrib import admin
+from .models import NotificationDigest
+
+# ==================== NotificationDigest Admin ====================
+@admin.register(NotificationDigest)
+class NotificationDigestAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'channel', 'sent_on', 'warranty_count', 'maintenance_count', 'status')
+    list_filter = ('channel', 'status', 'sent_on')
+    search_fields = ('recipient__username', 'address')
+    list_select_related = ('recipient',)
+    readonly_fields = [field.name for field in NotificationDigest._meta.fields]
+    list_per_page = 50
@@ -0,0 +1,107 @@
+# notifications/delivery.py
+"""
+Rate-limited delivery of digests.
+
+``deliver`` sends a batch through a thread pool and records the outcome of
+every digest in one bulk write. Celery workers call it per batch (see
+notifications.tasks); the management command can also run it in-process.
+
+Sends are limited to ``NOTIFICATION_RATE_LIMITS`` messages per second per
+channel by counters in the cache, so the limit holds across the threads of
+a batch and across every worker running batches at the same time. That
+needs a cache shared by the workers (Redis or Memcached); with the
+local-memory cache each process is limited on its own.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import NotificationDigest
+from .providers import get_provider
+
+NOTIFICATION_WORKERS = getattr(settings, 'NOTIFICATION_WORKERS', 8)
+NOTIFICATION_RATE_LIMITS = getattr(settings, 'NOTIFICATION_RATE_LIMITS', {'email': 20, 'sms': 1})
+NOTIFICATION_BATCH_SIZE = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 200)
+
+
+class RateLimiter:
+    """
+    At most ``rate`` calls per second on ``channel`` for everyone sharing
+    the cache. Calls count themselves into fixed windows (one second, or
+    ``1 / rate`` seconds for rates below one) and wait for the next window
+    once the current one is used up.
+    """
+
+    def __init__(self, channel, rate):
+        self.channel = channel
+        self.window = max(1.0, 1.0 / rate) if rate else 0
+        self.allowance = max(1, int(rate * self.window)) if rate else 0
+
+    def wait(self):
+        if not self.window:
+            return
+        while True:
+            now = time.time()
+            window = int(now // self.window)
+            key = f'notifications:rate:{self.channel}:{window}'
+            cache.add(key, 0, int(self.window) + 1)
+            try:
+                if cache.incr(key) <= self.allowance:
+                    return
+            except ValueError:
+                # The window expired between add and incr
+                continue
+            time.sleep(max(0, (window + 1) * self.window - now))
+
+
+def _send(provider, limiter, digest):
+    limiter.wait()
+    try:
+        provider.send(digest)
+    except Exception as exc:
+        return str(exc)[:2000] or exc.__class__.__name__
+    return ''
+
+
+def deliver(digests, sent_on=None, workers=NOTIFICATION_WORKERS, rate_limits=None):
+    """Send ``digests`` and record them; returns ``(sent, failed)``"""
+    sent_on = sent_on or date.today()
+    rate_limits = NOTIFICATION_RATE_LIMITS if rate_limits is None else rate_limits
+    channels = {digest.channel for digest in digests}
+    providers = {channel: get_provider(channel) for channel in channels}
+    limiters = {channel: RateLimiter(channel, rate_limits.get(channel)) for channel in channels}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        errors = list(pool.map(
+            lambda digest: _send(providers[digest.channel], limiters[digest.channel], digest),
+            digests
+        ))
+
+    NotificationDigest.objects.bulk_create(
+        [
+            NotificationDigest(
+                recipient_id=digest.recipient_id,
+                channel=digest.channel,
+                sent_on=sent_on,
+                address=digest.address,
+                warranty_count=len(digest.warranties),
+                maintenance_count=len(digest.maintenance),
+                status='failed' if error else 'sent',
+                error=error,
+            )
+            for digest, error in zip(digests, errors)
+        ],
+        update_conflicts=True,
+        unique_fields=['recipient', 'channel', 'sent_on'],
+        update_fields=['address', 'warranty_count', 'maintenance_count', 'status', 'error', 'attempted_at'],
+    )
+    failed = sum(1 for error in errors if error)
+    return len(digests) - failed, failed
+
+
+def batches(digests, size=NOTIFICATION_BATCH_SIZE):
+    for start in range(0, len(digests), size):
+        yield digests[start:start + size]
@@ -0,0 +1,140 @@
+# notifications/digests.py
+"""
+Daily warranty and maintenance digests.
+
+Everything due is read in two set-based queries: assets whose warranty
+ends inside the window, grouped by the assigned user, and open maintenance
+past its scheduled date, grouped by the user who opened the ticket (or the
+asset's user when the creator is gone). Recipients are then loaded in
+chunks and turned into one digest per user per channel, so the number of
+queries does not grow with the number of users.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.functions import Coalesce
+
+from assets.models import Asset, MaintenanceRecord
+from .models import NotificationDigest
+
+WARRANTY_WINDOW_DAYS = getattr(settings, 'NOTIFICATION_WARRANTY_DAYS', 30)
+NOTIFICATION_CHANNELS = getattr(settings, 'NOTIFICATION_CHANNELS', ['email'])
+RECIPIENT_CHUNK_SIZE = 2000
+CHANNEL_ADDRESS = {
+    'email': 'email',
+    'sms': 'phone',
+}
+
+
+@dataclass
+class Digest:
+    recipient_id: int
+    channel: str
+    address: str
+    name: str
+    warranties: list = field(default_factory=list)
+    maintenance: list = field(default_factory=list)
+
+    @property
+    def subject(self):
+        parts = []
+        if self.warranties:
+            parts.append(f'{len(self.warranties)} warranties expiring')
+        if self.maintenance:
+            parts.append(f'{len(self.maintenance)} maintenance tickets overdue')
+        return 'IT assets: ' + ', '.join(parts)
+
+    @property
+    def body(self):
+        lines = [f'Hello {self.name},', '']
+        if self.warranties:
+            lines.append('Warranties expiring soon:')
+            lines += [f'  {tag} ({model}): ends {ends}' for tag, model, ends in self.warranties]
+            lines.append('')
+        if self.maintenance:
+            lines.append('Overdue maintenance:')
+            lines += [
+                f'  {tag}: {title} (scheduled {scheduled}, {priority})'
+                for tag, title, scheduled, priority in self.maintenance
+            ]
+        return '\n'.join(lines).rstrip() + '\n'
+
+    def sms_body(self):
+        return self.subject + '. ' + ', '.join(
+            [tag for tag, _, _ in self.warranties] + [tag for tag, _, _, _ in self.maintenance]
+        )
+
+    def to_dict(self):
+        return {
+            'recipient_id': self.recipient_id,
+            'channel': self.channel,
+            'address': self.address,
+            'name': self.name,
+            'warranties': self.warranties,
+            'maintenance': self.maintenance,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def _due_items(today, window_days):
+    """
+    ``{user_id: (warranties, maintenance)}`` from two grouped scans. Dates
+    are kept as ISO strings so digests can be handed to Celery as JSON.
+    """
+    items = defaultdict(lambda: ([], []))
+    expiring = Asset.objects.warranty_expiring(
+        today, today + timedelta(days=window_days)
+    ).filter(assigned_to__isnull=False).order_by('assigned_to_id', 'purchase_date').values_list(
+        'assigned_to_id', 'asset_tag', 'model__name', 'purchase_date', 'warranty_months'
+    )
+    for user_id, tag, model, purchased, months in expiring.iterator(chunk_size=RECIPIENT_CHUNK_SIZE):
+        items[user_id][0].append((tag, model, (purchased + relativedelta(months=months)).isoformat()))
+
+    overdue = MaintenanceRecord.objects.exclude(
+        status__in=MaintenanceRecord.CLOSED_STATUSES
+    ).filter(scheduled_date__lt=today).annotate(
+        responsible=Coalesce('created_by_id', 'asset__assigned_to_id')
+    ).filter(responsible__isnull=False).order_by('responsible', 'scheduled_date').values_list(
+        'responsible', 'asset__asset_tag', 'title', 'scheduled_date', 'priority'
+    )
+    for user_id, tag, title, scheduled, priority in overdue.iterator(chunk_size=RECIPIENT_CHUNK_SIZE):
+        items[user_id][1].append((tag, title, scheduled.isoformat(), priority))
+    return items
+
+
+def build_digests(today=None, channels=None, window_days=WARRANTY_WINDOW_DAYS):
+    """
+    Digests due for ``today``, skipping users who already got that channel's
+    digest today. Inactive users and users without an address on a channel
+    are skipped.
+    """
+    today = today or date.today()
+    channels = channels or NOTIFICATION_CHANNELS
+    items = _due_items(today, window_days)
+    already_sent = set(
+        NotificationDigest.objects.filter(sent_on=today, status='sent').values_list('recipient_id', 'channel')
+    )
+
+    User = get_user_model()
+    user_ids = sorted(items)
+    address_fields = [CHANNEL_ADDRESS[channel] for channel in channels]
+    digests = []
+    for start in range(0, len(user_ids), RECIPIENT_CHUNK_SIZE):
+        users = User.objects.filter(
+            pk__in=user_ids[start:start + RECIPIENT_CHUNK_SIZE], is_active=True
+        ).values_list('pk', 'first_name', 'username', *address_fields)
+        for user_id, first_name, username, *addresses in users:
+            warranties, maintenance = items[user_id]
+            for channel, address in zip(channels, addresses):
+                if address and (user_id, channel) not in already_sent:
+                    digests.append(Digest(
+                        user_id, channel, address, first_name or username, warranties, maintenance
+                    ))
+    return digests
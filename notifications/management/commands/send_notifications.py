@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from notifications.delivery import NOTIFICATION_WORKERS, batches, deliver
+from notifications.digests import CHANNEL_ADDRESS, build_digests
+from notifications.providers import provider_channels
+from notifications.tasks import queue_notification_digests
+
+
+class Command(BaseCommand):
+    help = 'Sends the daily warranty and overdue maintenance digests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue', action='store_true',
+            help='Hand the batches to the Celery workers instead of sending in-process'
+        )
+        parser.add_argument(
+            '--channel', action='append', dest='channels',
+            choices=[channel for channel in provider_channels() if channel in CHANNEL_ADDRESS],
+            help='Limit to a channel (repeatable)'
+        )
+        parser.add_argument('--workers', type=int, default=NOTIFICATION_WORKERS)
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be sent')
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            result = queue_notification_digests.delay()
+            self.stdout.write(f'Queued digest build as task {result.id}')
+            return
+
+        digests = build_digests(channels=options['channels'])
+        if options['dry_run']:
+            for digest in digests:
+                self.stdout.write(f'{digest.channel} {digest.address}: {digest.subject}')
+            self.stdout.write(f'{len(digests)} digests due')
+            return
+
+        sent = failed = 0
+        for batch in batches(digests):
+            batch_sent, batch_failed = deliver(batch, workers=options['workers'])
+            sent += batch_sent
+            failed += batch_failed
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} digests, {failed} failed'))
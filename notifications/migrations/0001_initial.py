@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-19 05:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('sms', 'SMS')], max_length=10)),
+                ('sent_on', models.DateField()),
+                ('address', models.CharField(max_length=254)),
+                ('warranty_count', models.PositiveIntegerField(default=0)),
+                ('maintenance_count', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('sent', 'Sent'), ('failed', 'Failed')], max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('attempted_at', models.DateTimeField(auto_now=True)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_digests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notification Digest',
+                'verbose_name_plural': 'Notification Digests',
+                'ordering': ['-sent_on', 'recipient'],
+                'unique_together': {('recipient', 'channel', 'sent_on')},
+            },
+        ),
+    ]
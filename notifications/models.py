@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class NotificationDigest(models.Model):
+    """One digest sent (or attempted) to a user on a channel for a day"""
+    CHANNEL_CHOICES = [
+        ('email', _('Email')),
+        ('sms', _('SMS')),
+    ]
+    STATUS_CHOICES = [
+        ('sent', _('Sent')),
+        ('failed', _('Failed')),
+    ]
+
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notification_digests'
+    )
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    sent_on = models.DateField()
+    address = models.CharField(max_length=254)
+    warranty_count = models.PositiveIntegerField(default=0)
+    maintenance_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    error = models.TextField(blank=True)
+    attempted_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Notification Digest")
+        verbose_name_plural = _("Notification Digests")
+        ordering = ['-sent_on', 'recipient']
+        unique_together = ('recipient', 'channel', 'sent_on')
+
+    def __str__(self):
+        return f"{self.get_channel_display()} digest for {self.recipient_id} on {self.sent_on}"
@@ -0,0 +1,93 @@
+# notifications/providers.py
+"""
+Delivery providers, one per channel, configured with
+``NOTIFICATION_PROVIDERS = {'email': 'dotted.path.Class', ...}``.
+
+Providers are created once per delivery run and shared by the worker
+threads, so anything holding a connection keeps it per thread.
+"""
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_PROVIDERS = {
+    'email': 'notifications.providers.EmailProvider',
+    'sms': 'notifications.providers.TwilioSMSProvider',
+}
+
+
+class Provider:
+    """Base class; ``send`` raises on failure"""
+    channel = None
+
+    def send(self, digest):
+        raise NotImplementedError
+
+
+class EmailProvider(Provider):
+    """Sends through Django's configured email backend"""
+    channel = 'email'
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _connection(self):
+        from django.core.mail import get_connection
+        if not hasattr(self._local, 'connection'):
+            self._local.connection = get_connection()
+        return self._local.connection
+
+    def send(self, digest):
+        from django.core.mail import EmailMessage
+        EmailMessage(
+            subject=digest.subject,
+            body=digest.body,
+            to=[digest.address],
+            connection=self._connection(),
+        ).send()
+
+
+class TwilioSMSProvider(Provider):
+    """Sends SMS through Twilio using the TWILIO_* settings"""
+    channel = 'sms'
+    max_length = 1500
+
+    def __init__(self):
+        from twilio.rest import Client
+        self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        self.from_number = settings.TWILIO_FROM_NUMBER
+
+    def send(self, digest):
+        body = digest.sms_body()
+        if len(body) > self.max_length:
+            body = body[:self.max_length - 3] + '...'
+        self.client.messages.create(to=digest.address, from_=self.from_number, body=body)
+
+
+class FakeProvider(Provider):
+    """Keeps digests in ``FakeProvider.outbox`` instead of sending them"""
+    outbox = []
+    fail_addresses = set()
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def send(self, digest):
+        if digest.address in self.fail_addresses:
+            raise RuntimeError(f'Refused {digest.address}')
+        with self.lock:
+            self.outbox.append(digest)
+
+
+def _provider_paths():
+    return getattr(settings, 'NOTIFICATION_PROVIDERS', DEFAULT_PROVIDERS)
+
+
+def provider_channels():
+    """Channels with a configured provider"""
+    return list(_provider_paths())
+
+
+def get_provider(channel):
+    return import_string(_provider_paths()[channel])()
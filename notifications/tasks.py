@@ -0,0 +1,28 @@
+# notifications/tasks.py
+from datetime import date
+
+from config.celery import app
+
+from .delivery import batches, deliver
+from .digests import Digest, build_digests
+
+
+@app.task(rate_limit='30/m', acks_late=True)
+def send_digest_batch(digests, sent_on):
+    """Deliver one batch of serialized digests"""
+    sent, failed = deliver(
+        [Digest.from_dict(data) for data in digests], date.fromisoformat(sent_on)
+    )
+    return {'sent': sent, 'failed': failed}
+
+
+@app.task
+def queue_notification_digests():
+    """Build today's digests and fan them out to the workers in batches"""
+    today = date.today()
+    digests = build_digests(today)
+    queued = 0
+    for batch in batches(digests):
+        send_digest_batch.delay([digest.to_dict() for digest in batch], today.isoformat())
+        queued += 1
+    return {'digests': len(digests), 'batches': queued}
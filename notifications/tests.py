@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from assets.models import Asset, AssetCategory, AssetModel, AssetStatus, Manufacturer
+from .models import NotificationDigest
+from .providers import FakeProvider
+
+FAKE_PROVIDERS = {
+    'email': 'notifications.providers.FakeProvider',
+    'sms': 'notifications.providers.FakeProvider',
+}
+
+
+@override_settings(NOTIFICATION_PROVIDERS=FAKE_PROVIDERS)
+class SendNotificationsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        FakeProvider.outbox = []
+        FakeProvider.fail_addresses = set()
+        self.addCleanup(setattr, FakeProvider, 'outbox', [])
+        self.addCleanup(setattr, FakeProvider, 'fail_addresses', set())
+
+        model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'),
+            category=AssetCategory.objects.create(name='Laptops'),
+            name='Latitude',
+        )
+        status = AssetStatus.objects.create(name='Deployed')
+        User = get_user_model()
+        # A one year warranty that ends in about ten days
+        purchased = date.today() - timedelta(days=355)
+        for username, email in (('ada', 'ada@example.com'), ('bob', 'bob@example.com')):
+            Asset.objects.create(
+                asset_tag=username.upper(), model=model, status=status,
+                assigned_to=User.objects.create_user(username, email=email, phone='+15550100'),
+                purchase_date=purchased, warranty_months=12,
+            )
+
+    def call(self, *args):
+        out = StringIO()
+        call_command('send_notifications', *args, stdout=out)
+        return out.getvalue()
+
+    def test_digests_go_through_the_configured_provider(self):
+        FakeProvider.fail_addresses = {'bob@example.com'}
+
+        output = self.call('--channel', 'email', '--workers', '2')
+
+        self.assertIn('Sent 1 digests, 1 failed', output)
+        self.assertEqual([digest.address for digest in FakeProvider.outbox], ['ada@example.com'])
+        self.assertEqual(
+            dict(NotificationDigest.objects.values_list('recipient__username', 'status')),
+            {'ada': 'sent', 'bob': 'failed'},
+        )
+
+    def test_sent_digests_are_not_sent_again_the_same_day(self):
+        self.call('--channel', 'email')
+        FakeProvider.outbox = []
+
+        self.assertIn('Sent 0 digests', self.call('--channel', 'email'))
+        self.assertEqual(FakeProvider.outbox, [])
+
+    def test_dry_run_sends_nothing(self):
+        output = self.call('--channel', 'email', '--dry-run')
+
+        self.assertIn('2 digests due', output)
+        self.assertEqual(FakeProvider.outbox, [])
+        self.assertFalse(NotificationDigest.objects.exists())
+
+    def test_unknown_channel_is_refused(self):
+        with self.assertRaises(CommandError):
+            self.call('--channel', 'fax')
+
+    @override_settings(NOTIFICATION_PROVIDERS={'email': 'notifications.providers.FakeProvider'})
+    def test_channel_without_a_provider_is_refused(self):
+        with self.assertRaises(CommandError):
+            self.call('--channel', 'sms')
@@ -1,3 +1,51 @@
 from django.contrib import admin
+from .models import ChargebackEntry, ChargebackPeriod, FleetSnapshot, FleetSnapshotRun, ReportJob
 
-# Register your models here.
+# ==================== FleetSnapshot Admin ====================
+@admin.register(FleetSnapshotRun)
+class FleetSnapshotRunAdmin(admin.ModelAdmin):
+    list_display = ('date', 'taken_at', 'full', 'changed_assets')
+    list_filter = ('full',)
+    date_hierarchy = 'date'
+    list_per_page = 50
+
+@admin.register(FleetSnapshot)
+class FleetSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('date', 'dimension', 'label', 'asset_count', 'total_value')
+    list_filter = ('dimension',)
+    search_fields = ('label',)
+    date_hierarchy = 'date'
+    list_per_page = 50
+
+# ==================== ReportJob Admin ====================
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('report', 'status', 'requested_by', 'chunks_done', 'row_count', 'created_at', 'finished_at')
+    list_filter = ('report', 'status')
+    list_select_related = ('requested_by',)
+    readonly_fields = (
+        'report', 'params', 'key', 'status', 'requested_by', 'chunks', 'chunks_done', 'row_count',
+        'artifact', 'error', 'created_at', 'started_at', 'finished_at', 'expires_at',
+    )
+    date_hierarchy = 'created_at'
+    list_per_page = 50
+
+# ==================== Chargeback Admin ====================
+@admin.register(ChargebackPeriod)
+class ChargebackPeriodAdmin(admin.ModelAdmin):
+    list_display = ('period', 'closed_at', 'closed_by')
+    list_select_related = ('closed_by',)
+    readonly_fields = ('period', 'closed_at', 'closed_by')
+    date_hierarchy = 'period'
+    list_per_page = 50
+
+@admin.register(ChargebackEntry)
+class ChargebackEntryAdmin(admin.ModelAdmin):
+    list_display = ('period', 'company_id', 'cost_center', 'asset_count', 'depreciation', 'maintenance_cost')
+    list_filter = ('period',)
+    search_fields = ('cost_center',)
+    readonly_fields = (
+        'period', 'company_id', 'cost_center', 'asset_count', 'depreciation', 'maintenance_cost',
+    )
+    date_hierarchy = 'period'
+    list_per_page = 50
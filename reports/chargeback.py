@@ -0,0 +1,172 @@
+# reports/chargeback.py
+"""
+Monthly chargeback of asset cost to ``Department.cost_center``.
+
+Each cost center is charged for the assets assigned to its departments'
+users:
+
+- depreciation: the month's straight-line charge (see assets.depreciation),
+  the same one ``Asset.current_value`` is reduced by;
+- maintenance: the cost of maintenance completed in the month.
+
+A month is two grouped queries keyed on (company, cost center), one over
+the active assets and one over the month's maintenance, whatever the size
+of the fleet. The company is the owning one (``Asset.company`` and
+``MaintenanceRecord.company``, see core.scoping); the assigned user's
+department only gives the cost center. Cost of unassigned assets, and of departments without a
+cost center, is reported under an empty cost center.
+
+Asset assignments have no history, so a month is charged to whoever holds
+each asset when it is computed. ``close_period`` therefore writes each
+finished month into ``ChargebackEntry`` once; closed months are read from
+that ledger and never recomputed, so later reassignments leave them as
+they were charged.
+"""
+from datetime import date
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from assets.depreciation import monthly_charge_expression
+from assets.models import Asset, MaintenanceRecord
+from companies.models import Company
+from .models import ChargebackEntry, ChargebackPeriod
+
+CENT = Decimal('0.01')
+
+
+class PeriodClosed(Exception):
+    pass
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+def compute_period(period, company=None):
+    """
+    Charges for the month starting at ``period``, as
+    ``{(company id, cost center): {'asset_count', 'depreciation', 'maintenance_cost'}}``
+    """
+    end = period + relativedelta(months=1, days=-1)
+    assets = Asset.objects.filter(
+        status__is_active=True, purchase_date__lte=end, purchase_cost__gt=0
+    )
+    maintenance = MaintenanceRecord.objects.filter(
+        completed_date__gte=period, completed_date__lte=end, cost__isnull=False
+    )
+    if company is not None:
+        assets = assets.filter(company_id=company)
+        maintenance = maintenance.filter(company_id=company)
+
+    charges = {}
+
+    def entry(company_id, cost_center):
+        return charges.setdefault((company_id, cost_center or ''), {
+            'asset_count': 0, 'depreciation': Decimal('0.00'), 'maintenance_cost': Decimal('0.00'),
+        })
+
+    by_center = assets.order_by().values(
+        'company_id', 'assigned_to__department__cost_center'
+    ).annotate(asset_count=Count('id'), depreciation=Sum(monthly_charge_expression(period)))
+    for row in by_center:
+        charge = entry(row['company_id'], row['assigned_to__department__cost_center'])
+        charge['asset_count'] += row['asset_count']
+        charge['depreciation'] += _money(row['depreciation'])
+
+    by_center = maintenance.order_by().values(
+        'company_id', 'asset__assigned_to__department__cost_center'
+    ).annotate(maintenance_cost=Sum('cost'))
+    for row in by_center:
+        charge = entry(row['company_id'], row['asset__assigned_to__department__cost_center'])
+        charge['maintenance_cost'] += _money(row['maintenance_cost'])
+    return charges
+
+
+def close_period(period, user=None):
+    """Compute the month starting at ``period`` into the ledger; returns the ChargebackPeriod"""
+    period = month_start(period)
+    if period >= month_start(date.today()):
+        raise ValueError(f'{period:%Y-%m} has not ended yet')
+    with transaction.atomic():
+        if ChargebackPeriod.objects.select_for_update().filter(period=period).exists():
+            raise PeriodClosed(f'{period:%Y-%m} is already closed')
+        closed = ChargebackPeriod.objects.create(period=period, closed_at=timezone.now(), closed_by=user)
+        ChargebackEntry.objects.bulk_create([
+            ChargebackEntry(period=period, company_id=company_id, cost_center=cost_center, **charge)
+            for (company_id, cost_center), charge in compute_period(period).items()
+        ])
+    return closed
+
+
+def close_due_periods(today=None):
+    """
+    Close every finished month after the last closed one (only last month
+    when nothing is closed yet); returns the periods closed
+    """
+    current = month_start(today or date.today())
+    last = ChargebackPeriod.objects.order_by('-period').values_list('period', flat=True).first()
+    period = last + relativedelta(months=1) if last else current - relativedelta(months=1)
+    closed = []
+    while period < current:
+        try:
+            closed.append(close_period(period).period)
+        except PeriodClosed:
+            pass
+        period += relativedelta(months=1)
+    return closed
+
+
+def chargeback(period, company=None):
+    """
+    Charges per cost center for the month starting at ``period``: read from
+    the ledger once the month is closed, computed live before that
+    """
+    period = month_start(period)
+    closed = ChargebackPeriod.objects.filter(period=period).first()
+    if closed is not None:
+        entries = ChargebackEntry.objects.filter(period=period)
+        if company is not None:
+            entries = entries.filter(company_id=company)
+        charges = {
+            (company_id, cost_center): {
+                'asset_count': asset_count, 'depreciation': depreciation, 'maintenance_cost': maintenance_cost,
+            }
+            for company_id, cost_center, asset_count, depreciation, maintenance_cost in entries.values_list(
+                'company_id', 'cost_center', 'asset_count', 'depreciation', 'maintenance_cost'
+            )
+        }
+    else:
+        charges = compute_period(period, company)
+
+    names = dict(Company.objects.filter(
+        pk__in={company_id for company_id, _ in charges if company_id is not None}
+    ).values_list('pk', 'name'))
+    cost_centers = [
+        {
+            'company': {'id': company_id, 'name': names.get(company_id, '')} if company_id else None,
+            'cost_center': cost_center,
+            **charge,
+            'total': charge['depreciation'] + charge['maintenance_cost'],
+        }
+        for (company_id, cost_center), charge in sorted(
+            charges.items(), key=lambda item: (names.get(item[0][0], ''), item[0][1])
+        )
+    ]
+    return {
+        'period': f'{period:%Y-%m}',
+        'closed': closed is not None,
+        'closed_at': closed.closed_at if closed else None,
+        'cost_centers': cost_centers,
+        'totals': {
+            name: sum((row[name] for row in cost_centers), Decimal('0.00'))
+            for name in ('depreciation', 'maintenance_cost', 'total')
+        },
+    }
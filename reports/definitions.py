@@ -0,0 +1,127 @@
+# reports/definitions.py
+"""
+Reports that can run as background jobs (see reports.jobs). ``params``
+always carries the ``company`` the job is limited to.
+"""
+from decimal import Decimal
+
+from assets.models import Asset, AssetCategory, AssetModel
+from .chargeback import chargeback
+from .jobs import ReportDefinition, pk_ranges, register
+from .serializers import ChargebackParamsSerializer, TCOReportParamsSerializer, ValuationParamsSerializer
+from .tco import tco_queryset
+
+TCO_LEVEL_MODELS = {'asset': Asset, 'model': AssetModel, 'category': AssetCategory}
+
+
+def _sort_value(value):
+    # Decimals come back from the chunk rows as strings
+    return Decimal(str(value)) if isinstance(value, (str, int, float)) else value
+
+
+@register
+class TCOReport(ReportDefinition):
+    """The TCO report at any level, every row rather than one page"""
+    name = 'tco'
+    params_serializer = TCOReportParamsSerializer
+
+    def columns(self, params):
+        query = self._queryset(params).query
+        return [*query.values_select, *query.annotation_select]
+
+    def _queryset(self, params):
+        return tco_queryset(params['level'], params['as_of'], params['ordering'], params['company'])
+
+    def chunks(self, params):
+        queryset = TCO_LEVEL_MODELS[params['level']].objects.all()
+        if params['level'] == 'asset' and params['company'] is not None:
+            queryset = queryset.filter(company_id=params['company'])
+        return pk_ranges(queryset)
+
+    def rows(self, params, chunk):
+        first, last = chunk
+        return list(self._queryset(params).filter(pk__gte=first, pk__lte=last))
+
+    def finish(self, params, rows):
+        ordering = params['ordering']
+        field = ordering.lstrip('-')
+        present = [row for row in rows if row[field] is not None]
+        missing = [row for row in rows if row[field] is None]
+        present.sort(key=lambda row: row['id'])
+        present.sort(key=lambda row: _sort_value(row[field]), reverse=ordering.startswith('-'))
+        missing.sort(key=lambda row: row['id'])
+        return present + missing
+
+
+@register
+class ValuationReport(ReportDefinition):
+    """Book value of every asset"""
+    name = 'valuation'
+    params_serializer = ValuationParamsSerializer
+
+    def columns(self, params):
+        return [
+            'id', 'asset_tag', 'category', 'status', 'site', 'purchase_date', 'purchase_cost',
+            'depreciation_rate', 'residual_value', 'age_in_months', 'current_value',
+        ]
+
+    def _assets(self, params):
+        assets = Asset.objects.all()
+        if params['active_only']:
+            assets = assets.filter(status__is_active=True)
+        if params['company'] is not None:
+            assets = assets.filter(company_id=params['company'])
+        return assets
+
+    def chunks(self, params):
+        return pk_ranges(self._assets(params))
+
+    def rows(self, params, chunk):
+        first, last = chunk
+        assets = self._assets(params).filter(pk__gte=first, pk__lte=last).select_related(
+            'model__category', 'status', 'site'
+        ).only(
+            'id', 'asset_tag', 'purchase_date', 'purchase_cost', 'depreciation_rate', 'residual_value',
+            'model__category__name', 'status__name', 'site__name',
+        ).order_by('pk')
+        return [
+            {
+                'id': asset.pk,
+                'asset_tag': asset.asset_tag,
+                'category': asset.model.category.name,
+                'status': asset.status.name,
+                'site': asset.site.name if asset.site_id else '',
+                'purchase_date': asset.purchase_date,
+                'purchase_cost': asset.purchase_cost,
+                'depreciation_rate': asset.depreciation_rate,
+                'residual_value': asset.residual_value,
+                'age_in_months': asset.age_in_months,
+                'current_value': round(Decimal(str(asset.current_value)), 2),
+            }
+            for asset in assets
+        ]
+
+
+@register
+class ChargebackReport(ReportDefinition):
+    """One month's chargeback per cost center (see reports.chargeback)"""
+    name = 'chargeback'
+    params_serializer = ChargebackParamsSerializer
+
+    def columns(self, params):
+        return [
+            'period', 'company_id', 'company', 'cost_center', 'asset_count', 'depreciation',
+            'maintenance_cost', 'total',
+        ]
+
+    def rows(self, params, chunk):
+        report = chargeback(params['period'], params['company'])
+        return [
+            {
+                **row,
+                'period': report['period'],
+                'company_id': row['company']['id'] if row['company'] else None,
+                'company': row['company']['name'] if row['company'] else '',
+            }
+            for row in report['cost_centers']
+        ]
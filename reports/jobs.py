@@ -0,0 +1,291 @@
+# reports/jobs.py
+"""
+Background report jobs.
+
+Reports too heavy for a request are registered here as a
+``ReportDefinition``: a parameter serializer, a way to split the work into
+chunks (usually primary key ranges) and the rows of one chunk. A job:
+
+1. ``submit_job`` hashes the report, its validated parameters and the
+   company the requester is limited to (``params['company']``, see
+   core.scoping). A pending, running or unexpired finished job with the
+   same key is returned as is, so identical requests within a company
+   share one computation and one artifact.
+2. ``start_job`` works out the chunks and hands them to the backend.
+3. Each chunk runs on its own (``run_chunk``) and stores its rows. The
+   chunk that completes the set assembles them and writes the CSV artifact.
+
+Backends (``REPORT_JOB_BACKEND``):
+
+- ``celery``: every chunk is a task, so chunks run in parallel on all
+  worker processes;
+- ``thread``: a background thread per job, chunks on a pool of
+  ``REPORT_JOB_WORKERS`` threads (the queries release the GIL), for
+  running without a broker;
+- ``eager``: everything inline, in the request; for tests and development.
+
+Artifacts expire after ``REPORT_ARTIFACT_TTL`` seconds and are removed by
+``purge_report_jobs``.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from core.scoping import ALL_COMPANIES
+from .models import ReportJob, ReportJobChunk
+
+REPORT_JOB_BACKEND = getattr(settings, 'REPORT_JOB_BACKEND', 'celery')
+REPORT_JOB_WORKERS = getattr(settings, 'REPORT_JOB_WORKERS', os.cpu_count() or 2)
+REPORT_CHUNK_SIZE = getattr(settings, 'REPORT_CHUNK_SIZE', 2000)
+REPORT_ARTIFACT_TTL = getattr(settings, 'REPORT_ARTIFACT_TTL', 60 * 60 * 24)
+# Jobs running longer than this are taken for dead and no longer shared
+REPORT_JOB_TIMEOUT = getattr(settings, 'REPORT_JOB_TIMEOUT', 60 * 60)
+
+REPORTS = {}
+
+
+class ReportDefinition:
+    """A report that can run as a job; subclasses are added with ``register``"""
+    name = None
+    params_serializer = None
+
+    def columns(self, params):
+        """CSV header"""
+        raise NotImplementedError
+
+    def chunks(self, params):
+        """JSON-serializable work units; one chunk by default"""
+        return [None]
+
+    def rows(self, params, chunk):
+        """Rows (dicts keyed by ``columns``) for one chunk"""
+        raise NotImplementedError
+
+    def finish(self, params, rows):
+        """Final rows from all the chunks' rows, in chunk order"""
+        return rows
+
+    def validate(self, data):
+        serializer = self.params_serializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+
+def register(definition):
+    REPORTS[definition.name] = definition()
+    return definition
+
+
+def get_reports():
+    """Registered reports by name"""
+    # Imported late so django.setup() does not load every report's queries
+    from . import definitions  # noqa: F401
+    return REPORTS
+
+
+def pk_ranges(queryset, size=None):
+    """``[first, last]`` primary key pairs splitting ``queryset`` into chunks of ``size`` rows"""
+    size = size or REPORT_CHUNK_SIZE
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    return [[ids[start], ids[min(start + size, len(ids)) - 1]] for start in range(0, len(ids), size)]
+
+
+def job_params(definition, params):
+    """Validated parameters of a stored job, with the company it is limited to"""
+    return {**definition.validate(params), 'company': params.get('company')}
+
+
+def job_key(report, params):
+    canonical = json.dumps(params, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(f'{report}:{canonical}'.encode()).hexdigest()
+
+
+def _stale(job):
+    if job.status == 'done':
+        return job.is_expired
+    if job.status == 'running' and job.started_at:
+        return job.started_at < timezone.now() - timedelta(seconds=REPORT_JOB_TIMEOUT)
+    return False
+
+
+def submit_job(report, data, user=None, company=ALL_COMPANIES):
+    """
+    Job for ``report`` with the raw parameters ``data``, limited to
+    ``company``; returns ``(job, created)``. Raises the serializer's
+    ValidationError for bad parameters.
+    """
+    definition = get_reports()[report]
+    params = json.loads(json.dumps({**definition.validate(data), 'company': company}, cls=DjangoJSONEncoder))
+    key = job_key(report, params)
+    existing = ReportJob.objects.filter(key=key, status__in=ReportJob.ACTIVE_STATUSES).first()
+    if existing is not None:
+        if not _stale(existing):
+            return existing, False
+        expire_job(existing)
+
+    try:
+        with transaction.atomic():
+            job = ReportJob.objects.create(report=report, params=params, key=key, requested_by=user)
+    except IntegrityError:
+        # Submitted concurrently by someone else
+        return ReportJob.objects.get(key=key, status__in=ReportJob.ACTIVE_STATUSES), False
+    transaction.on_commit(lambda: dispatch_job(job.pk))
+    return job, True
+
+
+def dispatch_job(job_id):
+    if REPORT_JOB_BACKEND == 'celery':
+        from .tasks import start_report_job
+        start_report_job.delay(job_id)
+    elif REPORT_JOB_BACKEND == 'thread':
+        threading.Thread(
+            target=_in_thread(_quietly(start_job)), args=(job_id,), name=f'report-job-{job_id}', daemon=True
+        ).start()
+    else:
+        _quietly(start_job)(job_id)
+
+
+def _quietly(func):
+    """For the local backends: failures are recorded on the job, the request or pool carries on"""
+    def run(*args):
+        try:
+            return func(*args)
+        except Exception:
+            return None
+    return run
+
+
+def _in_thread(func):
+    """Wrap ``func`` for a worker thread, which must close its own connection"""
+    def run(*args):
+        try:
+            return func(*args)
+        finally:
+            connection.close()
+    return run
+
+
+def _fail(job_id, exc):
+    ReportJob.objects.filter(pk=job_id, status__in=('pending', 'running')).update(
+        status='failed', error=f'{type(exc).__name__}: {exc}', finished_at=timezone.now()
+    )
+
+
+def start_job(job_id):
+    """Split the job into chunks and run them on the configured backend"""
+    job = ReportJob.objects.get(pk=job_id)
+    if job.status != 'pending':
+        return
+    definition = get_reports()[job.report]
+    try:
+        params = job_params(definition, job.params)
+        job.chunks = definition.chunks(params)
+    except Exception as exc:
+        _fail(job_id, exc)
+        raise
+    job.status = 'running'
+    job.started_at = timezone.now()
+    job.save(update_fields=['chunks', 'status', 'started_at'])
+
+    indexes = range(len(job.chunks))
+    if not job.chunks:
+        assemble_job(job_id)
+    elif REPORT_JOB_BACKEND == 'celery':
+        from .tasks import run_report_chunk
+        for index in indexes:
+            run_report_chunk.delay(job_id, index)
+    elif REPORT_JOB_BACKEND == 'thread':
+        with ThreadPoolExecutor(max_workers=REPORT_JOB_WORKERS, thread_name_prefix=f'report-{job_id}') as pool:
+            list(pool.map(_in_thread(_quietly(run_chunk)), [job_id] * len(indexes), indexes))
+    else:
+        for index in indexes:
+            _quietly(run_chunk)(job_id, index)
+
+
+def run_chunk(job_id, index):
+    """Compute one chunk; the chunk completing the job assembles the artifact"""
+    job = ReportJob.objects.get(pk=job_id)
+    if job.status != 'running':
+        return
+    definition = get_reports()[job.report]
+    try:
+        rows = definition.rows(job_params(definition, job.params), job.chunks[index])
+    except Exception as exc:
+        _fail(job_id, exc)
+        raise
+
+    with transaction.atomic():
+        job = ReportJob.objects.select_for_update().get(pk=job_id)
+        ReportJobChunk.objects.update_or_create(job=job, index=index, defaults={'rows': rows})
+        job.chunks_done = job.chunk_results.count()
+        job.save(update_fields=['chunks_done'])
+    if job.chunks_done == len(job.chunks):
+        assemble_job(job_id)
+
+
+def write_csv(columns, rows):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode()
+
+
+def assemble_job(job_id):
+    job = ReportJob.objects.get(pk=job_id)
+    if job.status != 'running':
+        return
+    definition = get_reports()[job.report]
+    try:
+        rows = []
+        for chunk_rows in job.chunk_results.order_by('index').values_list('rows', flat=True):
+            rows.extend(chunk_rows)
+        params = job_params(definition, job.params)
+        rows = definition.finish(params, rows)
+        job.artifact.save(
+            f'{job.report}-{job.pk}.csv', ContentFile(write_csv(definition.columns(params), rows)), save=False
+        )
+    except Exception as exc:
+        _fail(job_id, exc)
+        raise
+    now = timezone.now()
+    job.status = 'done'
+    job.row_count = len(rows)
+    job.finished_at = now
+    job.expires_at = now + timedelta(seconds=REPORT_ARTIFACT_TTL)
+    job.save(update_fields=['artifact', 'status', 'row_count', 'finished_at', 'expires_at'])
+    job.chunk_results.all().delete()
+
+
+def expire_job(job):
+    if job.artifact:
+        job.artifact.delete(save=False)
+    job.status = 'expired' if job.status == 'done' else 'failed'
+    if job.status == 'failed' and not job.error:
+        job.error = 'Timed out'
+    job.save(update_fields=['artifact', 'status', 'error'])
+    job.chunk_results.all().delete()
+
+
+def purge_report_jobs():
+    """Expire finished jobs past their TTL and jobs stuck running; returns how many"""
+    now = timezone.now()
+    stale = ReportJob.objects.filter(status='done', expires_at__lte=now) | ReportJob.objects.filter(
+        status='running', started_at__lt=now - timedelta(seconds=REPORT_JOB_TIMEOUT)
+    )
+    count = 0
+    for job in stale:
+        expire_job(job)
+        count += 1
+    return count
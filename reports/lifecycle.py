@@ -0,0 +1,120 @@
+# reports/lifecycle.py
+"""
+Replacement forecast from ``AssetModel.typical_lifespan``.
+
+The fleet is read as one grouped query keyed on (group, model, purchase
+month, lifespan), which collapses thousands of identical assets into a
+single row. End-of-life months and replacement costs are then worked out
+per row in Python, so the cost of the forecast depends on the number of
+distinct purchase batches rather than on the number of assets.
+
+With a ``company`` (see core.scoping) only that company's assets are
+forecast and priced.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from assets.models import Asset, AssetModel
+
+FORECAST_GROUPS = {
+    'category': ('model__category_id', 'model__category__name', 'Uncategorised'),
+    'department': ('assigned_to__department_id', 'assigned_to__department__name', 'Unassigned'),
+}
+# Purchases younger than this set the expected replacement price of a model
+RECENT_PRICE_MONTHS = 24
+
+
+def _month_index(year, month):
+    return year * 12 + month - 1
+
+
+def _month_label(index):
+    return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+def replacement_prices(as_of, company=None):
+    """Average purchase cost per model, preferring recent purchases"""
+    cutoff = as_of - relativedelta(months=RECENT_PRICE_MONTHS)
+    owned = Q() if company is None else Q(assets__company_id=company)
+    rows = AssetModel.objects.annotate(
+        recent=Avg('assets__purchase_cost', filter=owned & Q(assets__purchase_date__gte=cutoff)),
+        overall=Avg('assets__purchase_cost', filter=owned),
+    ).values_list('id', 'recent', 'overall')
+    return {
+        model_id: Decimal(recent if recent is not None else overall or 0).quantize(Decimal('0.01'))
+        for model_id, recent, overall in rows
+    }
+
+
+def replacement_forecast(group_by='category', horizon=60, as_of=None, company=None):
+    """
+    Bucket every active asset by the month it reaches end of life.
+
+    Assets already past end of life are reported under ``overdue``; active
+    assets without a purchase date or model lifespan are only counted.
+    """
+    as_of = as_of or date.today()
+    key_field, name_field, default_name = FORECAST_GROUPS[group_by]
+    start = _month_index(as_of.year, as_of.month)
+    end = start + horizon
+
+    active = Asset.objects.filter(status__is_active=True)
+    if company is not None:
+        active = active.filter(company_id=company)
+    batches = active.filter(
+        purchase_date__isnull=False, model__typical_lifespan__isnull=False
+    ).order_by().values(
+        key_field, name_field, 'model_id', 'model__typical_lifespan',
+        year=ExtractYear('purchase_date'), month=ExtractMonth('purchase_date'),
+    ).annotate(count=Count('id'), book_cost=Sum('purchase_cost'))
+    prices = replacement_prices(as_of, company)
+
+    months = defaultdict(lambda: defaultdict(lambda: [0, Decimal('0.00')]))
+    overdue = defaultdict(lambda: [0, Decimal('0.00')])
+    names = {}
+    for row in batches:
+        eol = _month_index(row['year'], row['month']) + row['model__typical_lifespan']
+        if eol >= end:
+            continue
+        key = row[key_field]
+        names[key] = row[name_field] or default_name
+        bucket = overdue[key] if eol < start else months[eol][key]
+        bucket[0] += row['count']
+        bucket[1] += prices.get(row['model_id'], Decimal('0.00')) * row['count']
+
+    def groups(totals):
+        return sorted(
+            (
+                {'id': key, 'name': names[key], 'count': count, 'replacement_cost': cost}
+                for key, (count, cost) in totals.items()
+            ),
+            key=lambda group: group['replacement_cost'],
+            reverse=True
+        )
+
+    def summary(totals):
+        return {
+            'count': sum(count for count, _ in totals.values()),
+            'replacement_cost': sum((cost for _, cost in totals.values()), Decimal('0.00')),
+            'groups': groups(totals),
+        }
+
+    return {
+        'as_of': as_of,
+        'horizon_months': horizon,
+        'group_by': group_by,
+        'overdue': summary(overdue),
+        'months': [
+            dict(month=_month_label(index), **summary(months[index]))
+            for index in range(start, end)
+            if index in months
+        ],
+        'unknown_lifespan': active.filter(
+            Q(purchase_date__isnull=True) | Q(model__typical_lifespan__isnull=True)
+        ).count(),
+    }
@@ -0,0 +1,30 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from reports.chargeback import PeriodClosed, close_due_periods, close_period
+
+
+class Command(BaseCommand):
+    help = 'Closes finished months into the chargeback ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period',
+            help='Month to close (YYYY-MM); default every finished month after the last closed one'
+        )
+
+    def handle(self, *args, **options):
+        if not options['period']:
+            closed = close_due_periods()
+            self.stdout.write(self.style.SUCCESS(
+                f"Closed {', '.join(f'{period:%Y-%m}' for period in closed) or 'nothing'}"
+            ))
+            return
+        try:
+            period = date.fromisoformat(f"{options['period']}-01")
+        except ValueError:
+            raise CommandError(f"Invalid period '{options['period']}'")
+        try:
+            closed = close_period(period)
+        except (PeriodClosed, ValueError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'Closed {closed.period:%Y-%m}'))
@@ -0,0 +1,25 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from reports.snapshots import take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Writes the daily fleet snapshot used by the trend charts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Snapshot date (YYYY-MM-DD), default today')
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Rebuild from every asset instead of applying changes since the last run'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError:
+            raise CommandError(f"Invalid date '{options['date']}'")
+        run = take_snapshot(day, full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {run.date}: {'full' if run.full else 'incremental'}, "
+            f"{run.changed_assets} assets read"
+        ))
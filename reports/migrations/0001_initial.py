@@ -0,0 +1,64 @@
+# Generated by Django 5.2 on 2026-10-19 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FleetSnapshotRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('taken_at', models.DateTimeField()),
+                ('full', models.BooleanField(default=False)),
+                ('changed_assets', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Fleet Snapshot Run',
+                'verbose_name_plural': 'Fleet Snapshot Runs',
+                'ordering': ['-date'],
+                'get_latest_by': 'taken_at',
+            },
+        ),
+        migrations.CreateModel(
+            name='SnapshotAssetState',
+            fields=[
+                ('asset_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status_id', models.BigIntegerField(null=True)),
+                ('category_id', models.BigIntegerField(null=True)),
+                ('manufacturer_id', models.BigIntegerField(null=True)),
+                ('company_id', models.BigIntegerField(null=True)),
+                ('purchase_cost', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+            ],
+            options={
+                'verbose_name': 'Snapshot Asset State',
+                'verbose_name_plural': 'Snapshot Asset States',
+            },
+        ),
+        migrations.CreateModel(
+            name='FleetSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('dimension', models.CharField(choices=[('status', 'Status'), ('category', 'Category'), ('manufacturer', 'Manufacturer'), ('company', 'Company')], max_length=20)),
+                ('key', models.BigIntegerField(blank=True, null=True)),
+                ('label', models.CharField(blank=True, max_length=100)),
+                ('asset_count', models.PositiveIntegerField(default=0)),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Fleet Snapshot',
+                'verbose_name_plural': 'Fleet Snapshots',
+                'ordering': ['date', 'dimension', 'key'],
+                'indexes': [models.Index(fields=['dimension', 'date'], name='reports_fle_dimensi_d1b43e_idx')],
+                'unique_together': {('date', 'dimension', 'key')},
+            },
+        ),
+    ]
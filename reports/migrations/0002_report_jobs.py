@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-19 06:07
+
+import django.core.serializers.json
+import django.db.models.deletion
+import reports.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report', models.CharField(max_length=50)),
+                ('params', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('key', models.CharField(help_text='Hash of the report and its parameters', max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'), ('expired', 'Expired')], default='pending', max_length=10)),
+                ('chunks', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Work units, run in parallel')),
+                ('chunks_done', models.PositiveIntegerField(default=0)),
+                ('row_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('artifact', models.FileField(blank=True, storage=reports.models.artifact_storage, upload_to='jobs/')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Report Job',
+                'verbose_name_plural': 'Report Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportJobChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('rows', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunk_results', to='reports.reportjob')),
+            ],
+            options={
+                'verbose_name': 'Report Job Chunk',
+                'verbose_name_plural': 'Report Job Chunks',
+                'ordering': ['job', 'index'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reportjob',
+            index=models.Index(fields=['status', 'expires_at'], name='reports_rep_status_7c3798_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running', 'done'])), fields=('key',), name='unique_active_report_job'),
+        ),
+        migrations.AddConstraint(
+            model_name='reportjobchunk',
+            constraint=models.UniqueConstraint(fields=('job', 'index'), name='unique_report_job_chunk'),
+        ),
+    ]
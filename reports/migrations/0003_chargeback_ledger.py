@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-19 06:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_report_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChargebackEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('company_id', models.BigIntegerField(null=True)),
+                ('cost_center', models.CharField(blank=True, help_text='Empty for unallocated cost', max_length=50)),
+                ('asset_count', models.PositiveIntegerField(default=0)),
+                ('depreciation', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('maintenance_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Chargeback Entry',
+                'verbose_name_plural': 'Chargeback Entries',
+                'ordering': ['period', 'company_id', 'cost_center'],
+                'indexes': [models.Index(fields=['company_id', 'period'], name='reports_cha_company_871fa9_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'company_id', 'cost_center'), name='unique_chargeback_entry')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChargebackPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(help_text='First day of the month', unique=True)),
+                ('closed_at', models.DateTimeField()),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Chargeback Period',
+                'verbose_name_plural': 'Chargeback Periods',
+                'ordering': ['-period'],
+                'get_latest_by': 'period',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 06:32
+
+from django.db import migrations, models
+
+
+def reset_asset_states(apps, schema_editor):
+    # Earlier totals were not split by company; the next run rebuilds them
+    apps.get_model('reports', 'SnapshotAssetState').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_chargeback_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='fleetsnapshot',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='fleetsnapshot',
+            name='company_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='fleetsnapshot',
+            unique_together={('date', 'dimension', 'company_id', 'key')},
+        ),
+        migrations.RunPython(reset_asset_states, migrations.RunPython.noop),
+    ]
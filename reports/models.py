@@ -1,3 +1,188 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+REPORT_ARTIFACT_DIR = getattr(settings, 'REPORT_ARTIFACT_DIR', settings.BASE_DIR / 'report_artifacts')
+
+
+def artifact_storage():
+    return FileSystemStorage(location=REPORT_ARTIFACT_DIR)
+
+class FleetSnapshotRun(models.Model):
+    date = models.DateField(unique=True)
+    taken_at = models.DateTimeField()
+    full = models.BooleanField(default=False)
+    changed_assets = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Fleet Snapshot Run")
+        verbose_name_plural = _("Fleet Snapshot Runs")
+        ordering = ['-date']
+        get_latest_by = 'taken_at'
+
+    def __str__(self):
+        return f"{self.date} ({'full' if self.full else 'incremental'})"
+
+class FleetSnapshot(models.Model):
+    DIMENSION_CHOICES = [
+        ('status', _('Status')),
+        ('category', _('Category')),
+        ('manufacturer', _('Manufacturer')),
+        ('company', _('Company')),
+    ]
+
+    date = models.DateField()
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    # Totals are kept per company so company-limited users get their own series
+    company_id = models.BigIntegerField(null=True, blank=True)
+    key = models.BigIntegerField(null=True, blank=True)
+    label = models.CharField(max_length=100, blank=True)
+    asset_count = models.PositiveIntegerField(default=0)
+    total_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = _("Fleet Snapshot")
+        verbose_name_plural = _("Fleet Snapshots")
+        ordering = ['date', 'dimension', 'key']
+        unique_together = ('date', 'dimension', 'company_id', 'key')
+        indexes = [models.Index(fields=['dimension', 'date'])]
+
+    def __str__(self):
+        return f"{self.date} {self.dimension}={self.label}: {self.asset_count}"
+
+class SnapshotAssetState(models.Model):
+    """The dimensions of each asset as of the last snapshot run"""
+    asset_id = models.BigIntegerField(primary_key=True)
+    status_id = models.BigIntegerField(null=True)
+    category_id = models.BigIntegerField(null=True)
+    manufacturer_id = models.BigIntegerField(null=True)
+    company_id = models.BigIntegerField(null=True)
+    purchase_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = _("Snapshot Asset State")
+        verbose_name_plural = _("Snapshot Asset States")
+
+class ReportJob(models.Model):
+    """
+    One run of a background report (see reports.jobs). ``key`` identifies the
+    report and its parameters, so an identical request is answered with the
+    job already queued, running or finished.
+    """
+    STATUS_CHOICES = [
+        ('pending', _('Pending')),
+        ('running', _('Running')),
+        ('done', _('Done')),
+        ('failed', _('Failed')),
+        ('expired', _('Expired')),
+    ]
+    ACTIVE_STATUSES = ('pending', 'running', 'done')
+
+    report = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    key = models.CharField(max_length=64, help_text=_("Hash of the report and its parameters"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='report_jobs'
+    )
+    chunks = models.JSONField(default=list, encoder=DjangoJSONEncoder, help_text=_("Work units, run in parallel"))
+    chunks_done = models.PositiveIntegerField(default=0)
+    row_count = models.PositiveIntegerField(null=True, blank=True)
+    artifact = models.FileField(upload_to='jobs/', storage=artifact_storage, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Report Job")
+        verbose_name_plural = _("Report Jobs")
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status__in=['pending', 'running', 'done']),
+                name='unique_active_report_job'
+            ),
+        ]
+        indexes = [models.Index(fields=['status', 'expires_at'])]
+
+    def __str__(self):
+        return f"{self.report} #{self.pk} ({self.status})"
+
+    @property
+    def is_expired(self):
+        return self.expires_at is not None and self.expires_at <= timezone.now()
+
+class ReportJobChunk(models.Model):
+    """Rows computed for one chunk of a job, kept until the artifact is written"""
+    job = models.ForeignKey(ReportJob, on_delete=models.CASCADE, related_name='chunk_results')
+    index = models.PositiveIntegerField()
+    rows = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        verbose_name = _("Report Job Chunk")
+        verbose_name_plural = _("Report Job Chunks")
+        ordering = ['job', 'index']
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'index'], name='unique_report_job_chunk'),
+        ]
+
+    def __str__(self):
+        return f"{self.job_id}[{self.index}]"
+
+class ChargebackPeriod(models.Model):
+    """A month closed into the chargeback ledger (see reports.chargeback)"""
+    period = models.DateField(unique=True, help_text=_("First day of the month"))
+    closed_at = models.DateTimeField()
+    closed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    class Meta:
+        verbose_name = _("Chargeback Period")
+        verbose_name_plural = _("Chargeback Periods")
+        ordering = ['-period']
+        get_latest_by = 'period'
+
+    def __str__(self):
+        return f"{self.period:%Y-%m}"
+
+class ChargebackEntry(models.Model):
+    """What one cost center was charged for a closed month"""
+    period = models.DateField()
+    company_id = models.BigIntegerField(null=True)
+    cost_center = models.CharField(max_length=50, blank=True, help_text=_("Empty for unallocated cost"))
+    asset_count = models.PositiveIntegerField(default=0)
+    depreciation = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    maintenance_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = _("Chargeback Entry")
+        verbose_name_plural = _("Chargeback Entries")
+        ordering = ['period', 'company_id', 'cost_center']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'company_id', 'cost_center'], name='unique_chargeback_entry'
+            ),
+        ]
+        indexes = [models.Index(fields=['company_id', 'period'])]
+
+    def __str__(self):
+        return f"{self.period:%Y-%m} {self.cost_center or 'unallocated'}: {self.total}"
+
+    @property
+    def total(self):
+        return self.depreciation + self.maintenance_cost
@@ -0,0 +1,108 @@
+# reports/serializers.py
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from django.urls import reverse
+from rest_framework import serializers
+from .lifecycle import FORECAST_GROUPS
+from .models import ReportJob
+from .snapshots import DIMENSIONS
+from .tco import TCO_LEVELS, TCO_ORDERING_FIELDS
+
+
+class TCOReportParamsSerializer(serializers.Serializer):
+    level = serializers.ChoiceField(choices=TCO_LEVELS, default='asset')
+    as_of = serializers.DateField(default=date.today)
+    ordering = serializers.ChoiceField(
+        choices=[f'{prefix}{field}' for field in TCO_ORDERING_FIELDS for prefix in ('', '-')],
+        default='-tco'
+    )
+
+
+class TCORowSerializer(serializers.Serializer):
+    """Columns shared by every TCO level; each level adds its own name columns"""
+    id = serializers.IntegerField()
+    purchase_total = serializers.DecimalField(max_digits=14, decimal_places=2, allow_null=True)
+    maintenance_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+    months_in_service = serializers.IntegerField(allow_null=True)
+    tco = serializers.DecimalField(max_digits=14, decimal_places=2)
+    tco_per_month = serializers.FloatField(allow_null=True)
+
+
+class ReplacementForecastParamsSerializer(serializers.Serializer):
+    group_by = serializers.ChoiceField(choices=list(FORECAST_GROUPS), default='category')
+    horizon = serializers.IntegerField(min_value=1, max_value=240, default=60)
+    as_of = serializers.DateField(default=date.today)
+
+
+class FleetTrendParamsSerializer(serializers.Serializer):
+    dimension = serializers.ChoiceField(choices=list(DIMENSIONS))
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(default=date.today)
+    interval = serializers.ChoiceField(choices=['day', 'month'], default='day')
+
+    def validate(self, attrs):
+        if 'start' not in attrs:
+            attrs['start'] = attrs['end'] - relativedelta(years=1)
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': 'Must not be after end'})
+        return attrs
+
+
+class SiteRollupParamsSerializer(serializers.Serializer):
+    company = serializers.IntegerField(required=False, min_value=1)
+    as_of = serializers.DateField(default=date.today)
+
+
+class ChargebackParamsSerializer(serializers.Serializer):
+    period = serializers.DateField(input_formats=['%Y-%m', 'iso-8601'], default=date.today)
+
+    def validate_period(self, value):
+        if value.replace(day=1) > date.today():
+            raise serializers.ValidationError('Must not be in the future')
+        return value.replace(day=1)
+
+
+class ChargebackCloseSerializer(serializers.Serializer):
+    period = serializers.DateField(input_formats=['%Y-%m', 'iso-8601'])
+
+    def validate_period(self, value):
+        if value.replace(day=1) >= date.today().replace(day=1):
+            raise serializers.ValidationError('Only finished months can be closed')
+        return value.replace(day=1)
+
+
+class ValuationParamsSerializer(serializers.Serializer):
+    active_only = serializers.BooleanField(default=True)
+
+
+class ReportJobRequestSerializer(serializers.Serializer):
+    report = serializers.ChoiceField(choices=[])
+    params = serializers.DictField(required=False, default=dict)
+
+    def __init__(self, *args, **kwargs):
+        from .jobs import get_reports
+        super().__init__(*args, **kwargs)
+        self.fields['report'].choices = sorted(get_reports())
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    requested_by = serializers.StringRelatedField()
+    chunk_count = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'report', 'params', 'status', 'requested_by', 'chunk_count', 'chunks_done', 'row_count',
+            'error', 'created_at', 'started_at', 'finished_at', 'expires_at', 'download_url',
+        ]
+
+    def get_chunk_count(self, job):
+        return len(job.chunks)
+
+    def get_download_url(self, job):
+        if job.status != 'done':
+            return None
+        url = reverse('report-job-download', args=[job.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
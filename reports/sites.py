@@ -0,0 +1,100 @@
+# reports/sites.py
+"""
+Per-site rollups: asset count and value by status, and audit coverage.
+
+The assets are read as one query grouped on the integer (site, status)
+pair, served by the ``(site, status)`` index. Site, company and status
+names are looked up separately and joined in Python.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from assets.audits import AUDIT_CYCLE_DAYS
+from assets.models import Asset, AssetStatus
+from companies.models import Site
+
+
+def _empty_totals():
+    return {'asset_count': 0, 'total_value': Decimal('0.00'), 'active_count': 0, 'audited': 0}
+
+
+def _add(totals, row, is_active):
+    totals['asset_count'] += row['count']
+    totals['total_value'] += row['value'] or Decimal('0.00')
+    if is_active:
+        totals['active_count'] += row['count']
+        totals['audited'] += row['audited']
+
+
+def _coverage(totals):
+    """Share of active assets audited within the audit cycle"""
+    if not totals['active_count']:
+        return None
+    return round(totals['audited'] / totals['active_count'], 4)
+
+
+def site_rollup(company=None, site=None, as_of=None):
+    """
+    Rollup of every site (of ``company``, or only ``site``). Assets without
+    a site are summed under ``unlinked`` when no filter is given.
+    """
+    as_of = as_of or date.today()
+    audited_since = as_of - timedelta(days=AUDIT_CYCLE_DAYS)
+
+    sites = Site.objects.order_by('company__name', 'name')
+    assets = Asset.objects.all()
+    if company is not None:
+        sites = sites.filter(company_id=company)
+        assets = assets.filter(company_id=company)
+    if site is not None:
+        sites = sites.filter(pk=site)
+        assets = assets.filter(site_id=site)
+
+    rows = assets.order_by().values('site_id', 'status_id').annotate(
+        count=Count('id'),
+        value=Sum('purchase_cost'),
+        audited=Count('id', filter=Q(last_audit__gte=audited_since)),
+    )
+    statuses = {
+        status_id: (name, is_active)
+        for status_id, name, is_active in AssetStatus.objects.values_list('id', 'name', 'is_active')
+    }
+
+    totals = defaultdict(_empty_totals)
+    by_status = defaultdict(dict)
+    for row in rows:
+        name, is_active = statuses[row['status_id']]
+        _add(totals[row['site_id']], row, is_active)
+        by_status[row['site_id']][row['status_id']] = {
+            'id': row['status_id'], 'name': name, 'count': row['count'], 'value': row['value'] or Decimal('0.00'),
+        }
+
+    def summary(key):
+        site_totals = totals[key]
+        return {
+            **site_totals,
+            'audit_coverage': _coverage(site_totals),
+            'statuses': sorted(by_status[key].values(), key=lambda status: -status['count']),
+        }
+
+    result = {
+        'as_of': as_of,
+        'audit_cycle_days': AUDIT_CYCLE_DAYS,
+        'sites': [
+            {
+                'id': site_id,
+                'name': name,
+                'company': {'id': company_id, 'name': company_name},
+                **summary(site_id),
+            }
+            for site_id, name, company_id, company_name in sites.values_list(
+                'id', 'name', 'company_id', 'company__name'
+            )
+        ],
+    }
+    if company is None and site is None:
+        result['unlinked'] = summary(None)
+    return result
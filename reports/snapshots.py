@@ -0,0 +1,204 @@
+# reports/snapshots.py
+"""
+Daily fleet snapshots.
+
+Each run writes one row per day, dimension and key with the asset count and
+total purchase value. ``SnapshotAssetState`` remembers the dimensions every
+asset had at the previous run, so an incremental run only reads assets whose
+``updated_at`` moved since then and the change feed's tombstones of assets
+deleted since then, and applies the difference to the previous totals. A
+full run rebuilds the state from scratch; use it after bulk changes that
+bypass ``updated_at`` such as re-categorising a model. Runs more than
+``SNAPSHOT_INCREMENTAL_MAX_DAYS`` apart are full as well, since older
+tombstones may already have been purged.
+
+Totals are kept per company as well as per key, so ``fleet_trend`` can
+serve a single company's series or add them up for the whole fleet.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from assets.models import Asset, AssetCategory, AssetStatus, Manufacturer
+from companies.models import Company
+from core.models import Tombstone
+from .models import FleetSnapshot, FleetSnapshotRun, SnapshotAssetState
+
+# dimension -> (SnapshotAssetState column, Asset lookup, model holding labels)
+DIMENSIONS = {
+    'status': ('status_id', 'status_id', AssetStatus),
+    'category': ('category_id', 'model__category_id', AssetCategory),
+    'manufacturer': ('manufacturer_id', 'model__manufacturer_id', Manufacturer),
+    'company': ('company_id', 'company_id', Company),
+}
+STATE_FIELDS = [column for column, _, _ in DIMENSIONS.values()] + ['purchase_cost']
+CHUNK_SIZE = 2000
+SNAPSHOT_INCREMENTAL_MAX_DAYS = getattr(settings, 'SNAPSHOT_INCREMENTAL_MAX_DAYS', 30)
+
+
+def _asset_states(queryset):
+    """Yield unsaved SnapshotAssetState rows for the assets in ``queryset``"""
+    lookups = [lookup for _, lookup, _ in DIMENSIONS.values()]
+    rows = queryset.order_by().values_list('id', *lookups, 'purchase_cost')
+    for asset_id, *keys, cost in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield SnapshotAssetState(
+            asset_id=asset_id,
+            purchase_cost=cost or Decimal('0.00'),
+            **dict(zip(STATE_FIELDS, keys)),
+        )
+
+
+def _apply(totals, state, sign):
+    for dimension, (column, _, _) in DIMENSIONS.items():
+        bucket = totals[dimension][(state.company_id, getattr(state, column))]
+        bucket[0] += sign
+        bucket[1] += sign * state.purchase_cost
+
+
+def _empty_totals():
+    return {dimension: defaultdict(lambda: [0, Decimal('0.00')]) for dimension in DIMENSIONS}
+
+
+def _full_rebuild(totals):
+    SnapshotAssetState.objects.all().delete()
+    batch = []
+    count = 0
+    for state in _asset_states(Asset.objects.all()):
+        _apply(totals, state, 1)
+        batch.append(state)
+        if len(batch) >= CHUNK_SIZE:
+            SnapshotAssetState.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    SnapshotAssetState.objects.bulk_create(batch)
+    return count + len(batch)
+
+
+def _incremental(totals, last_run):
+    for row in FleetSnapshot.objects.filter(date=last_run.date):
+        totals[row.dimension][(row.company_id, row.key)] = [row.asset_count, row.total_value]
+
+    changed = 0
+    # Deleted assets: those tombstoned since the last run that still have a state row
+    deleted_ids = list(Tombstone.objects.filter(
+        aggregate=Asset.outbox_aggregate, rehomed=False, deleted_at__gte=last_run.taken_at
+    ).order_by().values_list('object_id', flat=True).distinct())
+    for start in range(0, len(deleted_ids), CHUNK_SIZE):
+        chunk = deleted_ids[start:start + CHUNK_SIZE]
+        gone = SnapshotAssetState.objects.filter(asset_id__in=chunk).exclude(
+            asset_id__in=Asset.objects.filter(pk__in=chunk).values('id')
+        )
+        gone_ids = []
+        for state in gone:
+            _apply(totals, state, -1)
+            gone_ids.append(state.asset_id)
+        SnapshotAssetState.objects.filter(asset_id__in=gone_ids).delete()
+        changed += len(gone_ids)
+
+    # New and modified assets: swap their old contribution for the new one
+    batch = []
+
+    def flush():
+        previous = SnapshotAssetState.objects.in_bulk([state.asset_id for state in batch])
+        for state in batch:
+            if state.asset_id in previous:
+                _apply(totals, previous[state.asset_id], -1)
+            _apply(totals, state, 1)
+        SnapshotAssetState.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['asset_id'],
+            update_fields=STATE_FIELDS,
+        )
+
+    for state in _asset_states(Asset.objects.filter(updated_at__gte=last_run.taken_at)):
+        batch.append(state)
+        if len(batch) >= CHUNK_SIZE:
+            flush()
+            changed += len(batch)
+            batch = []
+    if batch:
+        flush()
+        changed += len(batch)
+    return changed
+
+
+def _labels(dimension, keys):
+    model = DIMENSIONS[dimension][2]
+    names = dict(model.objects.filter(pk__in=[key for key in keys if key is not None]).values_list('pk', 'name'))
+    names[None] = 'Unassigned' if dimension == 'company' else 'None'
+    return names
+
+
+def take_snapshot(day=None, full=False):
+    """Write the snapshot rows for ``day`` (default today) and return the run"""
+    day = day or date.today()
+    taken_at = timezone.now()
+    last_run = FleetSnapshotRun.objects.order_by('-taken_at').first()
+    # Without asset states (e.g. after they were reset) there is nothing to diff against
+    full = (
+        full or last_run is None or not SnapshotAssetState.objects.exists()
+        or taken_at - last_run.taken_at > timedelta(days=SNAPSHOT_INCREMENTAL_MAX_DAYS)
+    )
+    totals = _empty_totals()
+
+    with transaction.atomic():
+        changed = _full_rebuild(totals) if full else _incremental(totals, last_run)
+
+        rows = []
+        for dimension, buckets in totals.items():
+            names = _labels(dimension, {key for _, key in buckets})
+            for (company_id, key), (count, value) in buckets.items():
+                if count:
+                    rows.append(FleetSnapshot(
+                        date=day, dimension=dimension, company_id=company_id, key=key,
+                        label=names.get(key, ''), asset_count=count, total_value=value,
+                    ))
+        FleetSnapshot.objects.filter(date=day).delete()
+        FleetSnapshot.objects.bulk_create(rows)
+        run, _ = FleetSnapshotRun.objects.update_or_create(
+            date=day,
+            defaults={'taken_at': taken_at, 'full': full, 'changed_assets': changed},
+        )
+    return run
+
+
+def fleet_trend(dimension, start, end, interval='day', company=None):
+    """
+    Snapshot series for ``dimension`` between ``start`` and ``end``, for
+    one ``company`` or the whole fleet. With ``interval='month'`` only the
+    last snapshot of each month is used.
+    """
+    runs = FleetSnapshotRun.objects.filter(date__gte=start, date__lte=end).order_by('date')
+    dates = list(runs.values_list('date', flat=True))
+    if interval == 'month':
+        last_per_month = {}
+        for day in dates:
+            last_per_month[(day.year, day.month)] = day
+        dates = sorted(last_per_month.values())
+
+    rows = FleetSnapshot.objects.filter(dimension=dimension, date__gte=start, date__lte=end)
+    if interval == 'month':
+        rows = rows.filter(date__in=dates)
+    if company is not None:
+        rows = rows.filter(company_id=company)
+
+    series = {}
+    rows = rows.values('key', 'date').annotate(
+        name=Max('label'), count=Sum('asset_count'), value=Sum('total_value')
+    ).values_list('key', 'name', 'date', 'count', 'value').order_by('key', 'date')
+    for key, label, day, count, value in rows:
+        entry = series.setdefault(key, {'key': key, 'label': label, 'points': []})
+        entry['label'] = label
+        entry['points'].append([day, count, value])
+    return {
+        'dimension': dimension,
+        'interval': interval,
+        'dates': dates,
+        'series': list(series.values()),
+    }
@@ -0,0 +1,29 @@
+# reports/tasks.py
+from config.celery import app
+
+from .chargeback import close_due_periods
+from .jobs import purge_report_jobs, run_chunk, start_job
+
+
+@app.task
+def start_report_job(job_id):
+    """Plan a report job and fan its chunks out to the workers"""
+    start_job(job_id)
+
+
+@app.task(acks_late=True)
+def run_report_chunk(job_id, index):
+    """Compute one chunk of a report job"""
+    run_chunk(job_id, index)
+
+
+@app.task
+def purge_report_jobs_task():
+    """Drop expired report artifacts"""
+    return purge_report_jobs()
+
+
+@app.task
+def close_chargeback_periods_task():
+    """Close finished months into the chargeback ledger"""
+    return [f'{period:%Y-%m}' for period in close_due_periods()]
@@ -0,0 +1,151 @@
+# reports/tco.py
+"""
+Total cost of ownership: purchase cost plus completed maintenance cost, and
+that total spread over the months each asset has been in service.
+
+Every grouping level is a single SQL statement. Maintenance cost is summed
+in a correlated subquery rather than through a join, so purchase costs are
+not multiplied by the number of maintenance rows, and the computed columns
+can be sorted and paginated by the database.
+
+Every level takes a ``company`` (see core.scoping): ``None`` for the whole
+fleet, otherwise only that company's assets and maintenance are counted.
+"""
+from decimal import Decimal
+
+from django.db.models import (
+    Count, DecimalField, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value,
+)
+from django.db.models.functions import Cast, Coalesce, ExtractMonth, ExtractYear, Greatest
+
+from assets.models import Asset, AssetCategory, AssetModel, MaintenanceRecord
+
+TCO_LEVELS = ('asset', 'model', 'category')
+TCO_ORDERING_FIELDS = (
+    'tco', 'tco_per_month', 'purchase_total', 'maintenance_total', 'months_in_service',
+)
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+ZERO = Value(Decimal('0.00'), output_field=MONEY)
+
+
+def months_in_service(as_of):
+    """Whole calendar months from purchase to ``as_of``, at least one"""
+    return Greatest(
+        Value(as_of.year * 12 + as_of.month)
+        - ExtractYear('purchase_date') * 12
+        - ExtractMonth('purchase_date'),
+        Value(1),
+        output_field=IntegerField()
+    )
+
+
+def _sum_subquery(queryset, group_by, field):
+    """Aggregate ``field`` over ``queryset`` grouped on the outer row"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values(group_by).annotate(total=Sum(field)).values('total'),
+            output_field=MONEY
+        ),
+        ZERO
+    )
+
+
+def _with_totals(queryset):
+    return queryset.annotate(
+        tco=ExpressionWrapper(
+            Coalesce(F('purchase_total'), ZERO) + F('maintenance_total'),
+            output_field=MONEY
+        ),
+    ).annotate(
+        # Cast first so SQLite does not fall back to integer division
+        tco_per_month=ExpressionWrapper(
+            Cast('tco', FloatField()) / F('months_in_service'),
+            output_field=FloatField()
+        ),
+    )
+
+
+def _in_service(as_of):
+    return Q(purchase_date__isnull=True) | Q(purchase_date__lte=as_of)
+
+
+def _scoped(queryset, company):
+    return queryset if company is None else queryset.filter(company_id=company)
+
+
+def _maintenance(as_of, company=None):
+    return _scoped(MaintenanceRecord.objects.filter(
+        completed_date__lte=as_of, cost__isnull=False
+    ), company)
+
+
+def asset_tco(as_of, company=None):
+    queryset = _scoped(Asset.objects.filter(_in_service(as_of)), company).annotate(
+        purchase_total=F('purchase_cost'),
+        maintenance_total=_sum_subquery(
+            _maintenance(as_of).filter(asset=OuterRef('pk')), 'asset', 'cost'
+        ),
+        months_in_service=months_in_service(as_of),
+    )
+    return _with_totals(queryset).values(
+        'id', 'asset_tag', 'model_id', 'model__name', 'model__category__name',
+        'purchase_date', 'purchase_total', 'maintenance_total', 'months_in_service',
+        'tco', 'tco_per_month',
+    )
+
+
+def _grouped_tco(queryset, asset_key, maintenance_key, as_of, company=None):
+    assets = _scoped(Asset.objects.filter(_in_service(as_of), **{asset_key: OuterRef('pk')}), company)
+    queryset = queryset.annotate(
+        asset_count=Subquery(
+            assets.order_by().values(asset_key).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ),
+        purchase_total=_sum_subquery(assets, asset_key, 'purchase_cost'),
+        maintenance_total=_sum_subquery(
+            _maintenance(as_of, company).filter(**{maintenance_key: OuterRef('pk')}),
+            maintenance_key, 'cost'
+        ),
+        months_in_service=Subquery(
+            assets.filter(purchase_date__isnull=False).order_by().values(asset_key).annotate(
+                total=Sum(months_in_service(as_of))
+            ).values('total'),
+            output_field=IntegerField()
+        ),
+    ).filter(asset_count__gt=0)
+    return _with_totals(queryset)
+
+
+def model_tco(as_of, company=None):
+    return _grouped_tco(
+        AssetModel.objects.all(), 'model', 'asset__model', as_of, company
+    ).values(
+        'id', 'name', 'manufacturer__name', 'category__name', 'asset_count',
+        'purchase_total', 'maintenance_total', 'months_in_service', 'tco', 'tco_per_month',
+    )
+
+
+def category_tco(as_of, company=None):
+    return _grouped_tco(
+        AssetCategory.objects.all(), 'model__category', 'asset__model__category', as_of, company
+    ).values(
+        'id', 'name', 'asset_count',
+        'purchase_total', 'maintenance_total', 'months_in_service', 'tco', 'tco_per_month',
+    )
+
+
+TCO_QUERIES = {
+    'asset': asset_tco,
+    'model': model_tco,
+    'category': category_tco,
+}
+
+
+def tco_queryset(level, as_of, ordering='-tco', company=None):
+    """TCO rows for a grouping level, ordered by a computed column"""
+    field = ordering.lstrip('-')
+    if field not in TCO_ORDERING_FIELDS:
+        raise ValueError(f"Cannot order by '{field}'")
+    order = F(field).desc(nulls_last=True) if ordering.startswith('-') else F(field).asc(nulls_last=True)
+    return TCO_QUERIES[level](as_of, company).order_by(order, 'id')
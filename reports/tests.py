@@ -1,3 +1,352 @@
-from django.test import TestCase
+import csv
+import io
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from assets.models import Asset, AssetCategory, AssetModel, AssetStatus, MaintenanceRecord, Manufacturer
+from companies.models import Company, Department, Site
+from . import jobs
+from .chargeback import compute_period
+from .lifecycle import replacement_forecast
+from .models import FleetSnapshot, FleetSnapshotRun, ReportJob, SnapshotAssetState
+from .snapshots import take_snapshot
+from .serializers import FleetTrendParamsSerializer
+
+
+class FleetTrendParamsTests(SimpleTestCase):
+    def test_default_start_is_a_year_before_end(self):
+        params = FleetTrendParamsSerializer(data={'dimension': 'status', 'end': '2025-06-15'})
+        self.assertTrue(params.is_valid(), params.errors)
+        self.assertEqual(params.validated_data['start'], date(2024, 6, 15))
+
+    def test_default_start_from_leap_day(self):
+        params = FleetTrendParamsSerializer(data={'dimension': 'status', 'end': '2024-02-29'})
+        self.assertTrue(params.is_valid(), params.errors)
+        self.assertEqual(params.validated_data['start'], date(2023, 2, 28))
+
+
+@override_settings(ALLOWED_HOSTS=['a.example.com', 'b.example.com'])
+class TCOReportCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'),
+            category=AssetCategory.objects.create(name='Laptops'),
+            name='Latitude',
+        )
+        status = AssetStatus.objects.create(name='Deployed')
+        for index in range(25):
+            Asset.objects.create(
+                asset_tag=f'A{index}', model=model, status=status,
+                purchase_date=date(2024, 1, 15), purchase_cost=100 + index,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_superuser('root', 'root@example.com', 'pw'))
+
+    def test_cached_page_links_follow_the_requesting_host(self):
+        params = {'as_of': '2026-01-01', 'page': 2}
+        first = self.client.get('/api/reports/tco/', params, HTTP_HOST='a.example.com').json()
+        second = self.client.get('/api/reports/tco/', params, HTTP_HOST='b.example.com').json()
+
+        self.assertEqual(first['results'], second['results'])
+        self.assertEqual((second['count'], len(second['results']), second['next']), (25, 5, None))
+        self.assertEqual(second['previous'], 'http://b.example.com/api/reports/tco/?as_of=2026-01-01')
+
+
+class ChargebackTests(TestCase):
+    def setUp(self):
+        self.owner = Company.objects.create(name='Acme')
+        self.other = Company.objects.create(name='Beta')
+        user = get_user_model().objects.create_user(
+            'lent', company=self.other,
+            department=Department.objects.create(company=self.other, name='IT', cost_center='CC-IT'),
+        )
+        self.asset = Asset.objects.create(
+            asset_tag='A1', company=self.owner, assigned_to=user,
+            model=AssetModel.objects.create(
+                manufacturer=Manufacturer.objects.create(name='Dell'),
+                category=AssetCategory.objects.create(name='Laptops'),
+                name='Latitude',
+            ),
+            status=AssetStatus.objects.create(name='Deployed', is_active=True),
+            purchase_date=date(2025, 1, 10), purchase_cost=1200, depreciation_rate=10,
+        )
+        MaintenanceRecord.objects.create(
+            asset=self.asset, title='Battery', description='Replaced',
+            scheduled_date=date(2025, 3, 5), completed_date=date(2025, 3, 5), cost=80, status='completed',
+        )
+
+    def test_charges_belong_to_the_owning_company(self):
+        charges = compute_period(date(2025, 3, 1))
+
+        self.assertEqual(list(charges), [(self.owner.pk, 'CC-IT')])
+        self.assertEqual(charges[self.owner.pk, 'CC-IT']['maintenance_cost'], 80)
+        self.assertEqual(list(compute_period(date(2025, 3, 1), self.owner.pk)), [(self.owner.pk, 'CC-IT')])
+        self.assertEqual(compute_period(date(2025, 3, 1), self.other.pk), {})
+
+    def test_charged_depreciation_matches_the_current_value(self):
+        period, this_month = date(2025, 1, 1), date.today().replace(day=1)
+        charged = Decimal('0.00')
+        while period < this_month:
+            charged += sum(charge['depreciation'] for charge in compute_period(period).values())
+            period += relativedelta(months=1)
+
+        self.assertEqual(compute_period(date(2025, 1, 1))[self.owner.pk, 'CC-IT']['depreciation'], 10)
+        self.assertEqual(self.asset.current_value, self.asset.purchase_cost - charged)
+
+
+class ReplacementForecastTests(TestCase):
+    def setUp(self):
+        laptops = AssetCategory.objects.create(name='Laptops')
+        self.model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'), category=laptops,
+            name='Latitude', typical_lifespan=36,
+        )
+        self.deployed = AssetStatus.objects.create(name='Deployed', is_active=True)
+        retired = AssetStatus.objects.create(name='Retired', is_active=False)
+        for tag, purchased, cost, status in (
+            ('OLD', date(2023, 3, 10), 1000, self.deployed),
+            ('MID1', date(2024, 1, 15), 1200, self.deployed),
+            ('MID2', date(2024, 1, 20), 1200, self.deployed),
+            ('NEW', date(2025, 2, 1), 1500, self.deployed),
+            ('GONE', date(2023, 3, 10), 1000, retired),
+            ('UNDATED', None, 900, self.deployed),
+        ):
+            Asset.objects.create(
+                asset_tag=tag, model=self.model, status=status, purchase_date=purchased, purchase_cost=cost,
+            )
+
+    def test_assets_are_bucketed_by_end_of_life_month(self):
+        forecast = replacement_forecast(horizon=12, as_of=date(2026, 6, 15))
+
+        # Priced at the recent purchases (NEW) rather than the overall average
+        self.assertEqual((forecast['overdue']['count'], forecast['overdue']['replacement_cost']), (1, 1500))
+        self.assertEqual(
+            [(month['month'], month['count'], month['replacement_cost']) for month in forecast['months']],
+            [('2027-01', 2, 3000)],
+        )
+        self.assertEqual(forecast['months'][0]['groups'][0]['name'], 'Laptops')
+        self.assertEqual(forecast['unknown_lifespan'], 1)
+
+    def test_horizon_reaches_later_purchases(self):
+        forecast = replacement_forecast(horizon=24, as_of=date(2026, 6, 15))
+        self.assertEqual([month['month'] for month in forecast['months']], ['2027-01', '2028-02'])
+
+    def test_api_validates_its_parameters(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user('admin', is_staff=True))
+
+        self.assertEqual(client.get('/api/reports/replacement-forecast/', {'horizon': 0}).status_code, 400)
+        self.assertEqual(client.get('/api/reports/replacement-forecast/', {'group_by': 'site'}).status_code, 400)
+        response = client.get('/api/reports/replacement-forecast/', {'group_by': 'department', 'as_of': '2026-06-15'})
+        self.assertEqual(response.json()['overdue']['groups'][0]['name'], 'Unassigned')
+
+
+class FleetSnapshotTests(TestCase):
+    def setUp(self):
+        self.acme = Company.objects.create(name='Acme')
+        self.model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'),
+            category=AssetCategory.objects.create(name='Laptops'),
+            name='Latitude',
+        )
+        self.deployed = AssetStatus.objects.create(name='Deployed')
+        self.stock = AssetStatus.objects.create(name='In stock')
+        self.assets = [
+            Asset.objects.create(
+                asset_tag=f'A{number}', company=self.acme, model=self.model, status=self.deployed, purchase_cost=100,
+            )
+            for number in range(5)
+        ]
+
+    def status_counts(self, day):
+        return dict(FleetSnapshot.objects.filter(date=day, dimension='status').values_list('label', 'asset_count'))
+
+    def test_incremental_run_only_reads_what_changed_since_the_last_run(self):
+        take_snapshot(date(2026, 1, 1))
+        moved, deleted = self.assets[0], self.assets[1]
+        moved.status = self.stock
+        moved.save()
+        deleted.delete()
+        Asset.objects.create(asset_tag='A9', company=self.acme, model=self.model, status=self.stock)
+
+        run = take_snapshot(date(2026, 1, 2))
+
+        self.assertFalse(run.full)
+        self.assertEqual(run.changed_assets, 3)
+        self.assertEqual(self.status_counts(date(2026, 1, 2)), {'Deployed': 3, 'In stock': 2})
+        self.assertFalse(SnapshotAssetState.objects.filter(asset_id=deleted.pk).exists())
+
+        take_snapshot(date(2026, 1, 3), full=True)
+        self.assertEqual(self.status_counts(date(2026, 1, 3)), self.status_counts(date(2026, 1, 2)))
+
+    def test_run_long_after_the_last_one_is_full(self):
+        first = take_snapshot(date(2026, 1, 1))
+        FleetSnapshotRun.objects.filter(pk=first.pk).update(taken_at=first.taken_at - timedelta(days=365))
+
+        self.assertTrue(take_snapshot(date(2026, 1, 2)).full)
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for patcher in (
+            mock.patch.object(jobs, 'REPORT_JOB_BACKEND', 'eager'),
+            mock.patch.object(jobs, 'REPORT_CHUNK_SIZE', 2),
+            mock.patch.object(ReportJob._meta.get_field('artifact'), 'storage', FileSystemStorage(directory)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        company = Company.objects.create(name='Acme')
+        model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'),
+            category=AssetCategory.objects.create(name='Laptops'),
+            name='Latitude',
+        )
+        status = AssetStatus.objects.create(name='Deployed', is_active=True)
+        for number in range(5):
+            Asset.objects.create(
+                asset_tag=f'A{number}', company=company, model=model, status=status,
+                purchase_date=date(2025, 1, 10), purchase_cost=1200, depreciation_rate=10,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('acme-user', company=company))
+
+    def submit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/reports/jobs/', {'report': 'valuation'}, format='json')
+
+    def test_job_runs_in_chunks_and_serves_its_csv(self):
+        response = self.submit()
+        self.assertEqual(response.status_code, 202)
+
+        job = self.client.get(f'/api/reports/jobs/{response.json()["id"]}/').json()
+        self.assertEqual((job['status'], job['row_count']), ('done', 5))
+        ids = list(Asset.objects.order_by('pk').values_list('pk', flat=True))
+        self.assertEqual(
+            ReportJob.objects.get(pk=job['id']).chunks, [[ids[0], ids[1]], [ids[2], ids[3]], [ids[4], ids[4]]]
+        )
+        download = self.client.get(f'/api/reports/jobs/{job["id"]}/download/')
+        rows = list(csv.DictReader(io.StringIO(b''.join(download.streaming_content).decode())))
+        self.assertEqual([row['asset_tag'] for row in rows], ['A0', 'A1', 'A2', 'A3', 'A4'])
+        self.assertEqual(rows[0]['current_value'], str(Asset.objects.get(asset_tag='A0').current_value))
+
+    def test_identical_request_shares_the_job_until_it_expires(self):
+        first = self.submit().json()
+        again = self.submit()
+        self.assertEqual((again.status_code, again.json()['id']), (200, first['id']))
+
+        ReportJob.objects.filter(pk=first['id']).update(expires_at=timezone.now())
+        self.assertEqual(jobs.purge_report_jobs(), 1)
+        self.assertEqual(self.client.get(f'/api/reports/jobs/{first["id"]}/download/').status_code, 409)
+        self.assertNotEqual(self.submit().json()['id'], first['id'])
+
+    def test_failures_are_recorded_on_the_job(self):
+        with mock.patch.object(jobs.get_reports()['valuation'], 'rows', side_effect=RuntimeError('disk full')):
+            job = self.submit().json()
+
+        job = ReportJob.objects.get(pk=job['id'])
+        self.assertEqual((job.status, job.error), ('failed', 'RuntimeError: disk full'))
+
+
+class ReportScopingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.acme = Company.objects.create(name='Acme')
+        self.beta = Company.objects.create(name='Beta')
+        model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'),
+            category=AssetCategory.objects.create(name='Laptops'),
+            name='Latitude',
+        )
+        status = AssetStatus.objects.create(name='Deployed')
+        self.acme_site = Site.objects.create(company=self.acme, name='HQ', address='1 Main St')
+        self.beta_site = Site.objects.create(company=self.beta, name='Depot', address='2 Side St')
+        for tag, company, site, cost in (
+            ('A1', self.acme, self.acme_site, 100),
+            ('A2', self.acme, self.acme_site, 200),
+            ('B1', self.beta, self.beta_site, 5000),
+        ):
+            Asset.objects.create(
+                asset_tag=tag, company=company, site=site, model=model, status=status,
+                purchase_date=date(2024, 1, 15), purchase_cost=cost,
+            )
+        User = get_user_model()
+        self.acme_user = User.objects.create_user('acme-user', company=self.acme)
+        self.beta_user = User.objects.create_user('beta-user', company=self.beta)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_tco_only_counts_the_users_company(self):
+        for user, expected in ((self.acme_user, ['A1', 'A2']), (self.beta_user, ['B1'])):
+            rows = self.client_for(user).get('/api/reports/tco/', {'as_of': '2026-01-01'}).json()['results']
+            self.assertEqual(sorted(row['asset_tag'] for row in rows), expected)
+
+        rows = self.client_for(self.acme_user).get(
+            '/api/reports/tco/', {'as_of': '2026-01-01', 'level': 'category'}
+        ).json()['results']
+        self.assertEqual([(row['asset_count'], float(row['purchase_total'])) for row in rows], [(2, 300)])
+
+    def test_identical_jobs_of_two_companies_are_kept_apart(self):
+        acme, beta = self.client_for(self.acme_user), self.client_for(self.beta_user)
+        request = {'report': 'tco', 'params': {'level': 'asset'}}
+
+        acme_job = acme.post('/api/reports/jobs/', request, format='json').json()
+        beta_job = beta.post('/api/reports/jobs/', request, format='json').json()
+
+        self.assertNotEqual(acme_job['id'], beta_job['id'])
+        self.assertEqual(ReportJob.objects.get(pk=acme_job['id']).params['company'], self.acme.pk)
+        self.assertEqual(acme.get(f'/api/reports/jobs/{beta_job["id"]}/').status_code, 404)
+        self.assertEqual([job['id'] for job in acme.get('/api/reports/jobs/').json()['results']], [acme_job['id']])
+
+    def test_jobs_need_a_login(self):
+        response = APIClient().post('/api/reports/jobs/', {'report': 'tco'}, format='json')
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_replacement_forecast_only_counts_the_users_company(self):
+        forecast = self.client_for(self.acme_user).get('/api/reports/replacement-forecast/').json()
+        self.assertEqual(forecast['unknown_lifespan'], 2)
+
+    def test_fleet_trend_only_shows_the_users_company(self):
+        take_snapshot(date(2026, 1, 1))
+        trend = self.client_for(self.beta_user).get(
+            '/api/reports/fleet-trend/', {'dimension': 'company', 'start': '2026-01-01', 'end': '2026-01-01'}
+        ).json()
+        self.assertEqual([(series['key'], series['points'][0][1]) for series in trend['series']], [(self.beta.pk, 1)])
+
+    def test_site_rollup_only_shows_the_users_sites(self):
+        client = self.client_for(self.acme_user)
+
+        sites = client.get('/api/reports/sites/').json()['sites']
+        self.assertEqual([(site['name'], site['asset_count']) for site in sites], [('HQ', 2)])
+        self.assertEqual(client.get(f'/api/reports/sites/{self.acme_site.pk}/').status_code, 200)
+        self.assertEqual(client.get(f'/api/reports/sites/{self.beta_site.pk}/').status_code, 404)
+
+    def test_chargeback_only_charges_the_users_company(self):
+        report = self.client_for(self.beta_user).get('/api/reports/chargeback/', {'period': '2025-03'}).json()
+        self.assertEqual({row['company']['id'] for row in report['cost_centers']}, {self.beta.pk})
+
+    def test_site_rollup_counts_assets_by_their_own_company(self):
+        # A Beta asset lent to Acme's site is Beta's, not Acme's
+        Asset.objects.filter(asset_tag='B1').update(site=self.acme_site)
+
+        acme_sites = self.client_for(self.acme_user).get('/api/reports/sites/').json()['sites']
+        self.assertEqual([site['asset_count'] for site in acme_sites], [2])
+        self.assertEqual(self.client_for(self.beta_user).get('/api/reports/sites/').json()['sites'][0]['asset_count'], 0)
@@ -1,3 +1,221 @@
-from django.shortcuts import render
+# reports/views.py
+from datetime import date
+from math import ceil
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, Http404
+from rest_framework import mixins, status as http_status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from companies.models import Site
+from core.scoping import ALL_COMPANIES, company_scope, scope_queryset
+from .chargeback import PeriodClosed, chargeback, close_period
+from .jobs import submit_job
+from .lifecycle import replacement_forecast
+from .models import ReportJob
+from .serializers import (
+    ChargebackCloseSerializer, ChargebackParamsSerializer, FleetTrendParamsSerializer,
+    ReplacementForecastParamsSerializer, ReportJobRequestSerializer, ReportJobSerializer,
+    SiteRollupParamsSerializer, TCOReportParamsSerializer, TCORowSerializer
+)
+from .sites import site_rollup
+from .snapshots import fleet_trend
+from .tco import tco_queryset
 
-# Create your views here.
+# Past dates only change when history is backdated, so they are kept longer
+REPORT_CACHE_TIMEOUT = getattr(settings, 'REPORT_CACHE_TIMEOUT', 300)
+REPORT_HISTORY_CACHE_TIMEOUT = getattr(settings, 'REPORT_HISTORY_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+class TCOReportViewSet(viewsets.GenericViewSet):
+    """
+    Total cost of ownership per asset, model or category.
+
+    Query params: `level` (asset|model|category), `as_of` (YYYY-MM-DD,
+    default today), `ordering` (e.g. `-tco`, `tco_per_month`), `page`.
+    Users limited to their company only see its assets.
+    """
+    serializer_class = TCORowSerializer
+
+    def list(self, request):
+        params = TCOReportParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        level = params.validated_data['level']
+        as_of = params.validated_data['as_of']
+        ordering = params.validated_data['ordering']
+        company = company_scope(request.user)
+
+        cache_key = 'reports:tco:{}:{}:{}:{}:{}'.format(
+            'all' if company is ALL_COMPANIES else company,
+            level, as_of.isoformat(), ordering, request.query_params.get('page', '1')
+        )
+        # Only the rows and count are cached; the links depend on the request's host
+        data = cache.get(cache_key)
+        if data is None:
+            rows = self.paginate_queryset(tco_queryset(level, as_of, ordering, company))
+            page = self.paginator.page
+            data = {'count': page.paginator.count, 'page': page.number, 'results': list(rows)}
+            timeout = REPORT_CACHE_TIMEOUT if as_of >= date.today() else REPORT_HISTORY_CACHE_TIMEOUT
+            cache.set(cache_key, data, timeout)
+        return Response(self._paginated(request, data))
+
+    def _paginated(self, request, data):
+        """The cached page with next/previous links built like PageNumberPagination's"""
+        url = request.build_absolute_uri()
+        param = self.paginator.page_query_param
+        number, pages = data['page'], max(ceil(data['count'] / self.paginator.page_size), 1)
+        if number == 1:
+            previous = None
+        elif number == 2:
+            previous = remove_query_param(url, param)
+        else:
+            previous = replace_query_param(url, param, number - 1)
+        return {
+            'count': data['count'],
+            'next': replace_query_param(url, param, number + 1) if number < pages else None,
+            'previous': previous,
+            'results': data['results'],
+        }
+
+
+class ReplacementForecastViewSet(viewsets.ViewSet):
+    """
+    Active assets bucketed by the month they reach end of life, with
+    projected replacement cost.
+
+    Query params: `group_by` (category|department), `horizon` (months,
+    default 60), `as_of` (YYYY-MM-DD, default today). Users limited to
+    their company only see its assets.
+    """
+
+    def list(self, request):
+        params = ReplacementForecastParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(replacement_forecast(**params.validated_data, company=company_scope(request.user)))
+
+
+class FleetTrendViewSet(viewsets.ViewSet):
+    """
+    Pre-aggregated fleet series from the daily snapshots. Each point is
+    `[date, asset_count, total_value]`.
+
+    Query params: `dimension` (status|category|manufacturer|company),
+    `start`, `end` (YYYY-MM-DD, default the last year), `interval`
+    (day|month). Users limited to their company only see its series.
+    """
+
+    def list(self, request):
+        params = FleetTrendParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(fleet_trend(**params.validated_data, company=company_scope(request.user)))
+
+
+class SiteRollupViewSet(viewsets.ViewSet):
+    """
+    Per-site asset counts and value by status, and the share of active
+    assets audited within the audit cycle.
+
+    Query params: `company` (id), `as_of` (YYYY-MM-DD, default today).
+    Users limited to their company only see its sites.
+    """
+
+    def list(self, request):
+        params = SiteRollupParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        scope = company_scope(request.user)
+        if scope is not ALL_COMPANIES:
+            return Response(site_rollup(**{**params.validated_data, 'company': scope}))
+        return Response(site_rollup(**params.validated_data))
+
+    def retrieve(self, request, pk=None):
+        params = SiteRollupParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        if not str(pk).isdigit() or not scope_queryset(Site.objects.filter(pk=pk), request.user).exists():
+            raise Http404
+        data = site_rollup(site=int(pk), as_of=params.validated_data['as_of'])
+        return Response(data['sites'][0])
+
+
+class ChargebackViewSet(viewsets.ViewSet):
+    """
+    Monthly depreciation and maintenance cost per department cost center.
+
+    Query params: `period` (YYYY-MM, default this month). Closed months are
+    read from the ledger, others computed live. Staff close a finished
+    month with POST `close` `{"period": "YYYY-MM"}`.
+    """
+
+    def list(self, request):
+        params = ChargebackParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        scope = company_scope(request.user)
+        company = None if scope is ALL_COMPANIES else scope
+        return Response(chargeback(params.validated_data['period'], company))
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def close(self, request):
+        params = ChargebackCloseSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        try:
+            closed = close_period(params.validated_data['period'], request.user)
+        except PeriodClosed as exc:
+            return Response({'detail': str(exc)}, status=http_status.HTTP_409_CONFLICT)
+        return Response(chargeback(closed.period), status=http_status.HTTP_201_CREATED)
+
+
+class ReportJobViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Heavy reports, computed in the background and downloaded as CSV.
+
+    POST `{"report": "tco", "params": {"level": "asset"}}` answers 202 with
+    the new job, or 200 with the job that already has (or is computing)
+    the same report and parameters. Poll the job until `status` is `done`,
+    then fetch `download_url`. The list shows your own jobs; jobs are only
+    ever visible within the company they were computed for.
+    """
+    queryset = ReportJob.objects.select_related('requested_by')
+    serializer_class = ReportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Schema generation (build_api_schema) runs without a request
+        if getattr(self, 'swagger_fake_view', False):
+            return queryset.none()
+        scope = company_scope(self.request.user)
+        if scope is not ALL_COMPANIES:
+            # Identical requests from one company share a job (see reports.jobs)
+            queryset = queryset.filter(params__company=scope)
+        if self.action == 'list' and not self.request.user.is_staff:
+            queryset = queryset.filter(requested_by=self.request.user)
+        return queryset
+
+    def create(self, request):
+        submission = ReportJobRequestSerializer(data=request.data)
+        submission.is_valid(raise_exception=True)
+        job, created = submit_job(
+            submission.validated_data['report'],
+            submission.validated_data['params'],
+            request.user,
+            company_scope(request.user),
+        )
+        job.refresh_from_db()
+        return Response(
+            self.get_serializer(job).data,
+            status=http_status.HTTP_202_ACCEPTED if created else http_status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'done' or job.is_expired:
+            return Response(
+                {'detail': f'The report is {job.status}', 'status': job.status},
+                status=http_status.HTTP_409_CONFLICT
+            )
+        return FileResponse(
+            job.artifact.open('rb'), as_attachment=True,
+            filename=f'{job.report}-{job.pk}.csv', content_type='text/csv'
+        )
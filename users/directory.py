@@ -0,0 +1,189 @@
+# users/directory.py
+"""
+User directory sync.
+
+Takes a CSV or JSON export of the staff directory (username, email, names,
+phone, company, department and optionally ``active``) and brings
+``users.User`` in line with it:
+
+- the whole user table is read once into memory and diffed against the
+  export, so the number of queries depends on the number of changes
+  divided by the batch size, not on the size of the directory;
+- new users are written with ``bulk_create`` (with unusable passwords),
+  changed ones with ``bulk_update_values``;
+- departments the export names that do not exist yet are created, while
+  companies must already exist and are matched by name;
+- users marked inactive, and with ``deactivate_missing`` every active
+  non-staff user absent from the export, are deactivated. With
+  ``unassign`` their assets are then unassigned with set-based UPDATEs.
+"""
+import csv
+import io
+import secrets
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db import transaction
+
+from assets.models import Asset
+from companies.models import Company, Department
+from core.db import bulk_update_values
+
+User = get_user_model()
+
+DIRECTORY_FORMATS = ('csv', 'json')
+SYNC_FIELDS = ['email', 'first_name', 'last_name', 'phone', 'company_id', 'department_id', 'is_active']
+WRITE_BATCH_SIZE = 1000
+FALSE_VALUES = ('0', 'false', 'no', 'n', 'inactive', 'disabled')
+
+
+def _clean(value):
+    return str(value).strip() if value is not None else ''
+
+
+def _entry(row):
+    row = {_clean(key).lower(): value for key, value in row.items()}
+    active = row.get('active', row.get('is_active'))
+    return {
+        'username': _clean(row.get('username')),
+        'email': _clean(row.get('email')),
+        'first_name': _clean(row.get('first_name')),
+        'last_name': _clean(row.get('last_name')),
+        'phone': _clean(row.get('phone')) or None,
+        'company': _clean(row.get('company')),
+        'department': _clean(row.get('department')),
+        'is_active': active is not False and _clean(active).lower() not in FALSE_VALUES,
+    }
+
+
+def parse_directory(data, fmt='csv'):
+    """
+    Parse a directory export into entry dicts.
+
+    ``data`` is text for csv and a list of dicts for json.
+    """
+    if fmt == 'csv':
+        return (_entry(row) for row in csv.DictReader(io.StringIO(data)))
+    if fmt == 'json':
+        return (_entry(row) for row in data)
+    raise ValueError(f"Unknown directory format '{fmt}', expected one of {', '.join(DIRECTORY_FORMATS)}")
+
+
+def _unusable_password():
+    # What make_password(None) stores, without its per-character random choice
+    return UNUSABLE_PASSWORD_PREFIX + secrets.token_hex(20)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def sync_directory(entries, deactivate_missing=False, unassign=False, dry_run=False, report_errors_limit=1000):
+    """
+    Apply a directory export to the user table; returns counts of what
+    changed (or would change, with ``dry_run``) and the rejected entries.
+    """
+    companies = {name.casefold(): pk for pk, name in Company.objects.values_list('pk', 'name')}
+    departments = {
+        (company_id, name.casefold()): pk
+        for pk, company_id, name in Department.objects.values_list('pk', 'company_id', 'name')
+    }
+
+    wanted = {}
+    new_departments = {}
+    errors = []
+    total = rejected = 0
+
+    def reject(entry, reason):
+        if len(errors) < report_errors_limit:
+            errors.append({'username': entry['username'], 'error': reason})
+
+    for entry in entries:
+        total += 1
+        company_id = companies.get(entry['company'].casefold()) if entry['company'] else None
+        if not entry['username']:
+            reject(entry, 'Missing username')
+        elif entry['company'] and company_id is None:
+            reject(entry, f"Unknown company '{entry['company']}'")
+        elif entry['department'] and company_id is None:
+            reject(entry, 'A department needs a company')
+        else:
+            if entry['department'] and (company_id, entry['department'].casefold()) not in departments:
+                new_departments.setdefault((company_id, entry['department'].casefold()), entry['department'])
+            entry['company_id'] = company_id
+            # The last entry for a username wins
+            wanted[entry['username']] = entry
+            continue
+        rejected += 1
+
+    if new_departments and not dry_run:
+        created = Department.objects.bulk_create(
+            [Department(company_id=company_id, name=name) for (company_id, _), name in new_departments.items()],
+            batch_size=WRITE_BATCH_SIZE,
+        )
+        departments.update({(dept.company_id, dept.name.casefold()): dept.pk for dept in created})
+
+    existing = {}
+    rows = User.objects.values_list('username', 'pk', 'is_staff', 'is_superuser', *SYNC_FIELDS)
+    for username, pk, is_staff, is_superuser, *values in rows.iterator(chunk_size=WRITE_BATCH_SIZE):
+        values = dict(zip(SYNC_FIELDS, values))
+        values['phone'] = values['phone'] or None
+        existing[username] = (pk, is_staff or is_superuser, values)
+
+    creates = []
+    updates = []
+    deactivated = []
+    for username, entry in wanted.items():
+        values = {name: entry[name] for name in SYNC_FIELDS if name in entry}
+        values['department_id'] = None
+        if entry['department']:
+            # A department only created on a real run never matches in a dry run
+            values['department_id'] = departments.get((entry['company_id'], entry['department'].casefold()), 'new')
+        if username not in existing:
+            creates.append(User(username=username, password=_unusable_password(), **values))
+            continue
+        pk, _, current = existing[username]
+        if current != values:
+            updates.append(User(pk=pk, **values))
+            if current['is_active'] and not values['is_active']:
+                deactivated.append(pk)
+
+    if deactivate_missing:
+        deactivated += [
+            pk for username, (pk, is_staff, current) in existing.items()
+            if username not in wanted and current['is_active'] and not is_staff
+        ]
+
+    result = {
+        'entries': total,
+        'created': len(creates),
+        'updated': len(updates),
+        'unchanged': len(wanted) - len(creates) - len(updates),
+        'deactivated': len(deactivated),
+        'departments_created': len(new_departments),
+        'assets_unassigned': 0,
+        'duplicates': total - rejected - len(wanted),
+        'errors_count': rejected,
+        'errors': errors,
+    }
+    if dry_run:
+        if unassign:
+            result['assets_unassigned'] = sum(
+                Asset.objects.filter(assigned_to_id__in=chunk).count()
+                for chunk in _chunks(deactivated, WRITE_BATCH_SIZE)
+            )
+        return result
+
+    with transaction.atomic():
+        User.objects.bulk_create(creates, batch_size=WRITE_BATCH_SIZE)
+        bulk_update_values(User, updates, SYNC_FIELDS, batch_size=WRITE_BATCH_SIZE)
+        updated = {user.pk for user in updates}
+        for chunk in _chunks([pk for pk in deactivated if pk not in updated], WRITE_BATCH_SIZE):
+            User.objects.filter(pk__in=chunk).update(is_active=False)
+        if unassign:
+            for chunk in _chunks(deactivated, WRITE_BATCH_SIZE):
+                result['assets_unassigned'] += Asset.objects.filter(assigned_to_id__in=chunk).update(
+                    assigned_to=None
+                )
+    return result
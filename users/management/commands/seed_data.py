@@ -204,6 +204,7 @@ class Command(BaseCommand):
         assets = []
         for i in range(50):
             purchase_date = fake.date_between(start_date='-5y', end_date='today')
+            site = random.choice(sites) if random.random() > 0.2 else None
             asset = Asset.objects.create(
                 asset_tag=f"AST-{1000 + i}",
                 serial_number=fake.uuid4()[:10].upper(),
@@ -213,7 +214,8 @@ class Command(BaseCommand):
                 purchase_cost=round(random.uniform(500, 3000), 2),
                 warranty_months=random.choice([12, 24, 36]),
                 assigned_to=random.choice(users) if random.random() > 0.3 else None,
-                location=random.choice(sites).name if random.random() > 0.2 else '',
+                site=site,
+                location=site.name if site else '',
                 ip_address=fake.ipv4() if random.random() > 0.5 else None
             )
             assets.append(asset)
@@ -0,0 +1,57 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from users.directory import DIRECTORY_FORMATS, parse_directory, sync_directory
+
+
+class Command(BaseCommand):
+    help = 'Creates, updates and deactivates users from a staff directory export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the export file')
+        parser.add_argument(
+            '--format', dest='fmt', choices=DIRECTORY_FORMATS, default='csv',
+            help='Export format (default: csv)'
+        )
+        parser.add_argument(
+            '--deactivate-missing', action='store_true',
+            help='Deactivate non-staff users that are not in the export'
+        )
+        parser.add_argument(
+            '--unassign', action='store_true',
+            help='Unassign the assets of deactivated users'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would change without writing anything'
+        )
+        parser.add_argument(
+            '--show-errors', action='store_true',
+            help='List the rejected entries'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8') as fh:
+                data = json.load(fh) if options['fmt'] == 'json' else fh.read()
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read {options['path']}: {exc}")
+        if options['fmt'] == 'json' and not isinstance(data, list):
+            raise CommandError('A JSON export must be a list of users')
+
+        result = sync_directory(
+            parse_directory(data, options['fmt']),
+            deactivate_missing=options['deactivate_missing'],
+            unassign=options['unassign'],
+            dry_run=options['dry_run'],
+        )
+
+        prefix = 'Dry run, nothing written. ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{result['entries']} entries: {result['created']} created, "
+            f"{result['updated']} updated, {result['unchanged']} unchanged, "
+            f"{result['deactivated']} deactivated, {result['departments_created']} new departments, "
+            f"{result['assets_unassigned']} assets unassigned, {result['errors_count']} rejected"
+        ))
+        if options['show_errors']:
+            for error in result['errors']:
+                self.stdout.write(f"  {error['username'] or '-'}: {error['error']}")
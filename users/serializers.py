@@ -0,0 +1,11 @@
+# users/serializers.py
+from rest_framework import serializers
+
+from .directory import DIRECTORY_FORMATS
+
+
+class DirectorySyncParamsSerializer(serializers.Serializer):
+    format = serializers.ChoiceField(choices=DIRECTORY_FORMATS, required=False)
+    deactivate_missing = serializers.BooleanField(default=False)
+    unassign = serializers.BooleanField(default=False)
+    dry_run = serializers.BooleanField(default=False)
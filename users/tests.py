@@ -1,3 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from assets.models import Asset, AssetCategory, AssetModel, AssetStatus, Manufacturer
+from companies.models import Company, Department
+
+User = get_user_model()
+
+EXPORT = '''username,email,first_name,last_name,company,department,active
+ada,ada@example.com,Ada,Lovelace,Acme,IT,
+bob,bob@example.com,Bob,,Acme,IT,no
+dan,dan@example.com,Dan,,acme,Sales,yes
+eve,eve@example.com,Eve,,Nowhere,,
+,nobody@example.com,,,Acme,,
+'''
+
+
+class DirectorySyncTests(TestCase):
+    def setUp(self):
+        self.acme = Company.objects.create(name='Acme')
+        it = Department.objects.create(company=self.acme, name='IT')
+        User.objects.create_user('ada', email='ada@old.example.com', company=self.acme, department=it)
+        bob = User.objects.create_user(
+            'bob', email='bob@example.com', first_name='Bob', company=self.acme, department=it
+        )
+        carl = User.objects.create_user('carl', company=self.acme)
+        self.admin = User.objects.create_user('root', is_staff=True)
+        model = AssetModel.objects.create(
+            manufacturer=Manufacturer.objects.create(name='Dell'),
+            category=AssetCategory.objects.create(name='Laptops'),
+            name='Latitude',
+        )
+        status = AssetStatus.objects.create(name='Deployed')
+        for tag, user in (('B1', bob), ('C1', carl), ('C2', carl)):
+            Asset.objects.create(asset_tag=tag, company=self.acme, model=model, status=status, assigned_to=user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def sync(self, **options):
+        response = self.client.post('/api/users/sync/', {
+            'file': SimpleUploadedFile('directory.csv', EXPORT.encode()), **options
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def counts(self, result):
+        return {key: value for key, value in result.items() if key != 'errors'}
+
+    def test_dry_run_reports_without_writing(self):
+        result = self.sync(deactivate_missing=True, unassign=True, dry_run=True)
+
+        self.assertEqual(self.counts(result), {
+            'entries': 5, 'created': 1, 'updated': 2, 'unchanged': 0, 'deactivated': 2,
+            'departments_created': 1, 'assets_unassigned': 3, 'duplicates': 0, 'errors_count': 2,
+        })
+        self.assertFalse(User.objects.filter(username='dan').exists())
+        self.assertFalse(Department.objects.filter(name='Sales').exists())
+        self.assertEqual(Asset.objects.filter(assigned_to__isnull=True).count(), 0)
+
+    def test_sync_creates_updates_deactivates_and_unassigns(self):
+        result = self.sync(deactivate_missing=True, unassign=True)
+
+        self.assertEqual(
+            (result['created'], result['updated'], result['deactivated'], result['departments_created']),
+            (1, 2, 2, 1),
+        )
+        self.assertEqual(sorted(error['error'] for error in result['errors']), [
+            'Missing username', "Unknown company 'Nowhere'",
+        ])
+        dan = User.objects.get(username='dan')
+        self.assertEqual((dan.company, dan.department.name), (self.acme, 'Sales'))
+        self.assertFalse(dan.has_usable_password())
+        self.assertEqual(User.objects.get(username='ada').email, 'ada@example.com')
+        self.assertEqual(
+            dict(User.objects.values_list('username', 'is_active')),
+            {'ada': True, 'bob': False, 'carl': False, 'dan': True, 'root': True},
+        )
+        self.assertEqual(Asset.objects.filter(assigned_to__isnull=False).count(), 0)
+        self.assertEqual(result['assets_unassigned'], 3)
+
+        again = self.sync(deactivate_missing=True, unassign=True)
+        self.assertEqual((again['created'], again['updated'], again['unchanged']), (0, 0, 3))
+
+    def test_missing_users_stay_active_unless_asked(self):
+        result = self.sync()
+
+        self.assertEqual((result['deactivated'], result['assets_unassigned']), (1, 0))
+        self.assertTrue(User.objects.get(username='carl').is_active)
+        self.assertEqual(Asset.objects.filter(assigned_to__username='bob').count(), 1)
+
+    def test_json_export_and_admin_only(self):
+        users = [{'username': 'fay', 'email': 'fay@example.com', 'company': 'Acme'}]
+        response = self.client.post('/api/users/sync/', {'users': users}, format='json')
+        self.assertEqual(response.json()['created'], 1)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='ada'))
+        self.assertEqual(client.post('/api/users/sync/', {'users': users}, format='json').status_code, 403)
@@ -1,3 +1,44 @@
-from django.shortcuts import render
+# users/views.py
+from django.contrib.auth import get_user_model
+from rest_framework import filters, status as http_status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from assets.serializers import UserSerializer
+from core.scoping import CompanyScopedMixin
+from .directory import parse_directory, sync_directory
+from .serializers import DirectorySyncParamsSerializer
 
-# Create your views here.
+User = get_user_model()
+
+
+class UserViewSet(CompanyScopedMixin, viewsets.ReadOnlyModelViewSet):
+    """Active users of the requester's company, e.g. for assignment pickers"""
+    queryset = User.objects.filter(is_active=True).order_by('username')
+    serializer_class = UserSerializer
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['username', 'first_name', 'last_name', 'email']
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def sync(self, request):
+        """Apply a staff directory export: a CSV `file` upload or a JSON list of `users`"""
+        params = DirectorySyncParamsSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        options = dict(params.validated_data)
+        fmt = options.pop('format', 'json' if 'users' in request.data else 'csv')
+        if fmt == 'json':
+            data = request.data.get('users')
+            if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+                return Response(
+                    {'users': 'Expected a list of {username, email, company, department, ...} objects'},
+                    status=http_status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response(
+                    {'file': 'A directory export file is required'},
+                    status=http_status.HTTP_400_BAD_REQUEST
+                )
+            data = upload.read().decode('utf-8', errors='replace')
+        return Response(sync_directory(parse_directory(data, fmt), **options))